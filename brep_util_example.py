@@ -2,10 +2,10 @@ from OCC.Core.gp import gp_Pnt
 from OCC.Display.SimpleGui import init_display
 
 from src.brep.brep_util import STPFileReader
-from src.brep.brep_util import ShapeToMeshConvertor
+from src.brep.brep_util import ShapeToMeshConvertor, STPRootReader
 
 def display_occ_file_read():
-    cabinet_shape = STPFileReader.read_stp_file_by_occ('CABINET.step')
+    cabinet_shape = STPFileReader.read_stp_file_by_occ('CABINET.step', use_brep_cache=True)
     display, start_display, _, _ = init_display()
 
     display.DisplayShape(cabinet_shape, update=True)    
@@ -13,17 +13,26 @@ def display_occ_file_read():
     return
 
 def display_point_clouds(): 
-    cabinet_shape = STPFileReader.read_stp_file_by_occ('CABINET.step')
+    cabinet_shape = STPFileReader.read_stp_file_by_occ('CABINET.step', use_brep_cache=True)
     point_clouds = ShapeToMeshConvertor.convert_to_point_clouds(cabinet_shape)
     display, start_display, _, _ = init_display()
     
     display.DisplayShape(cabinet_shape)    
-    for pnt in point_clouds:
+    for pnt in point_clouds.tolist():
         display.DisplayShape(gp_Pnt(*pnt))
     
     start_display()
     return  
 
+def display_first_root_shape():
+    # only the first root of the STEP file is transferred
+    root_reader = STPRootReader('CABINET.step', use_brep_cache=True)
+    display, start_display, _, _ = init_display()
+
+    display.DisplayShape(root_reader.get_root_shape(0), update=True)
+    start_display()
+    return
+
 
 # display_occ_file_read()
 display_point_clouds()
\ No newline at end of file
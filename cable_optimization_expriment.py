@@ -7,7 +7,7 @@ from OCC.Core.Quantity import (
 from src.cabinet import Cabinet 
 
 
-cabinet = Cabinet("cabinet_grid_map.npy")
+cabinet = Cabinet("cabinet_grid_map.npy", route_cache_dir="route_cache")
 print("cabient is created")
 display, start_display, _, _ = init_display()   
 display.View.SetBgGradientColors(
@@ -18,9 +18,8 @@ display.View.SetBgGradientColors(
 )
 
 
-for node in cabinet.grids:
-    if node.is_obstacle:
-        display.DisplayShape(node.get_box_shape(), color="black", transparency=0.9)  
+for node in cabinet.grids.iter_obstacle_nodes():
+    display.DisplayShape(node.get_box_shape(), color="black", transparency=0.9)  
 
 cables = cabinet.cables
 for cable in cables:
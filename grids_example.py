@@ -26,9 +26,8 @@ def display_grids3d():
             grids.map_size - 1, 
             grids.map_size - 1].is_obstacle = True
 
-    for node in grids:
-        if node.is_obstacle:
-            display.DisplayShape(node.get_box_shape(), update=True, color = "red")
+    for node in grids.iter_obstacle_nodes():
+        display.DisplayShape(node.get_box_shape(), update=True, color = "red")
     
     grids_shape = grids.get_box_shape()
     display.DisplayShape(grids_shape, update=True, color = "blue", transparency=0.5)  
@@ -9,7 +9,7 @@ from src.brep.brep_util import STPFileReader
 
 
 def display_voxelization():
-    cabinet_shape: TopoDS_Shape = STPFileReader.read_stp_file_by_occ("CABINET.step")  
+    cabinet_shape: TopoDS_Shape = STPFileReader.read_stp_file_by_occ("CABINET.step", use_brep_cache=True)  
     grids = Grids3D(
         corner_max=gp_Pnt(200, 200, 200),
         corner_min=gp_Pnt(-200, -200, -200), 
@@ -21,9 +21,8 @@ def display_voxelization():
 
     display, start_display, add_menu, add_function_to_menu = init_display() 
 
-    for node in grids:
-        if node.is_obstacle:
-            display.DisplayShape(node.get_box_shape()) 
+    for node in grids.iter_obstacle_nodes():
+        display.DisplayShape(node.get_box_shape()) 
             
     display.FitAll()
     start_display()
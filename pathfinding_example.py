@@ -6,7 +6,7 @@ from src.cabinet import Cabinet
 from src.pathfinding import JumpPointSearch, AstarAlgorithmOp, GridAlgorithm, JumpPointSearchTheta
 from src.line.spline import Spline
 
-cabinet = Cabinet("cabinet_grid_map.npy")
+cabinet = Cabinet("cabinet_grid_map.npy", route_cache_dir="route_cache")
 grids = cabinet.grids   
 map_size = grids.map_size   
 
@@ -40,8 +40,7 @@ if jps.search():
 else:
     print("No path found")
 
-for node in cabinet.grids:
-    if node.is_obstacle:
-        display.DisplayShape(node.get_box_shape(), color="black")
+for node in cabinet.grids.iter_obstacle_nodes():
+    display.DisplayShape(node.get_box_shape(), color="black")
 
 start_display()
\ No newline at end of file
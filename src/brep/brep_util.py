@@ -1,4 +1,8 @@
 import os
+import hashlib
+import tempfile
+from typing import Dict, List, Tuple, Optional
+import numpy as np
 from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
 from OCC.Core.BRep import BRep_Tool
 from OCC.Core.BRepTools import breptools
@@ -8,52 +12,349 @@ from OCC.Core.TopLoc import TopLoc_Location
 from OCC.Core.BRepBndLib import brepbndlib
 from OCC.Core.Bnd import Bnd_Box
 from OCC.Core.Graphic3d import Graphic3d_Vec3d
-from OCC.Core.TopAbs import TopAbs_FACE
+from OCC.Core.TopAbs import TopAbs_FACE, TopAbs_SOLID, TopAbs_REVERSED
 from OCC.Core.Prs3d import prs3d
 from OCC.Core.Precision import precision
 from OCC.Core.Bnd import Bnd_Box 
 from OCC.Core.TopoDS import TopoDS_Compound
 from OCC.Extend.DataExchange import STEPControl_Reader
-import torch
-from pytorch3d.structures import Meshes
-from pytorch3d.ops import sample_points_from_meshes
+from OCC.Core.BinTools import bintools
+from OCC.Core.IFSelect import IFSelect_RetDone
 
 
 class STPFileReader:
+    """
+    description:
+        reads STEP files of ./brep_model. with use_brep_cache the transferred shape is saved
+        in OCC's binary BRep format under cache_dir, named by the hash of the STEP file contents,
+        and loaded instead of parsing the STEP file again. a changed file has a new hash.
+    """
+    BREP_CACHE_DIR: str = "./brep_cache"
+    FILE_CHUNK_SIZE: int = 1 << 20
+    
     @classmethod  
-    def read_stp_file_by_occ(cls, file_name:str) -> TopoDS_Compound:
-        dir_name = "./brep_model"
-        file_path = os.path.join(dir_name, file_name)  
+    def read_stp_file_by_occ(cls, file_name:str, use_brep_cache: bool = False, 
+                             cache_dir: str = BREP_CACHE_DIR) -> TopoDS_Compound:
+        file_path = cls.get_file_path(file_name)  
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"STPFileReader: STP 파일이 존재하지 않습니다: {file_path}")
-        step_reader = STEPControl_Reader()
-        step_reader.ReadFile(file_path)
+        if use_brep_cache:
+            brep_file_path = cls.get_brep_file_path(cache_dir, cls.get_file_fingerprint(file_path))
+            shape = cls.load_brep(brep_file_path)
+            if shape is not None:
+                return shape
+        step_reader = cls.get_step_reader(file_path)
         step_reader.TransferRoots()  
         
-        return step_reader.Shape()
+        shape = step_reader.Shape()
+        # a shape that is not transferred is never cached
+        if use_brep_cache and not shape.IsNull():
+            cls.save_brep(shape, brep_file_path)
+        return shape
+    
+    @classmethod  
+    def get_step_reader(cls, file_path: str) -> STEPControl_Reader:
+        step_reader = STEPControl_Reader()
+        if step_reader.ReadFile(file_path) != IFSelect_RetDone:
+            raise ValueError(f"STPFileReader: STP 파일을 읽을 수 없습니다: {file_path}")
+        return step_reader
+    
+    @classmethod  
+    def get_file_path(cls, file_name: str) -> str:
+        dir_name = "./brep_model"
+        return os.path.join(dir_name, file_name)
+    
+    @classmethod  
+    def get_file_fingerprint(cls, file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(cls.FILE_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @classmethod  
+    def get_brep_file_path(cls, cache_dir: str, file_fingerprint: str, root: Optional[int] = None) -> str:
+        """
+        Args:
+            root (Optional[int]): root of the STEP file, None for the shape of read_stp_file_by_occ
+        """
+        suffix = ".brep" if root is None else f".root{root}.brep"
+        return os.path.join(cache_dir, file_fingerprint + suffix)
+    
+    @classmethod  
+    def load_brep(cls, brep_file_path: str) -> Optional[TopoDS_Shape]:
+        if not os.path.isfile(brep_file_path):
+            return None
+        shape = TopoDS_Shape()
+        if not bintools.Read(shape, brep_file_path) or shape.IsNull():
+            print(f"STPFileReader.load_brep: {brep_file_path} is broken and removed")
+            cls.remove(brep_file_path)
+            return None
+        return shape
+    
+    @classmethod  
+    def save_brep(cls, shape: TopoDS_Shape, brep_file_path: str) -> None:
+        # written to a temporary file first, readers never see a partial file
+        cache_dir = os.path.dirname(brep_file_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        os.close(file_descriptor)
+        if bintools.Write(shape, temp_path):
+            os.replace(temp_path, brep_file_path)
+        else:
+            print(f"STPFileReader.save_brep: {brep_file_path} is not written")
+            cls.remove(temp_path)
+        return
+    
+    @classmethod  
+    def save_text(cls, text: str, file_path: str) -> None:
+        # written to a temporary file first like save_brep
+        cache_dir = os.path.dirname(file_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                file.write(text)
+            os.replace(temp_path, file_path)
+        except OSError:
+            cls.remove(temp_path)
+            raise
+        return
+    
+    @classmethod  
+    def remove(cls, file_path: str) -> None:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        return
+
+
+class STPRootReader:
+    """
+    description:
+        root shapes of a STEP file transferred one at a time, the file is parsed on the first transfer
+        and only the requested roots are transferred. with use_brep_cache every transferred root
+        is saved like STPFileReader does, cached roots and the root number are read without parsing.
+    """
+    def __init__(self, file_name: str, use_brep_cache: bool = False, 
+                 cache_dir: str = STPFileReader.BREP_CACHE_DIR) -> None:
+        self.file_path: str = STPFileReader.get_file_path(file_name)
+        if not os.path.isfile(self.file_path):
+            raise FileNotFoundError(f"STPRootReader: STP 파일이 존재하지 않습니다: {self.file_path}")
+        self.use_brep_cache: bool = use_brep_cache
+        self.cache_dir: str = cache_dir
+        self.file_fingerprint: Optional[str] = \
+            STPFileReader.get_file_fingerprint(self.file_path) if use_brep_cache else None
+        self.step_reader: Optional[STEPControl_Reader] = None
+        self.root_number: Optional[int] = None
+        # transferred or loaded roots
+        self.root_shapes: Dict[int, TopoDS_Shape] = {}
+    
+    def get_step_reader(self) -> STEPControl_Reader:
+        if self.step_reader is None:
+            self.step_reader = STPFileReader.get_step_reader(self.file_path)
+        return self.step_reader
+    
+    def get_root_number_file_path(self) -> str:
+        return os.path.join(self.cache_dir, self.file_fingerprint + ".roots")
+    
+    def get_root_number(self) -> int:
+        if self.root_number is not None:
+            return self.root_number
+        if self.use_brep_cache:
+            try:
+                with open(self.get_root_number_file_path()) as file:
+                    self.root_number = int(file.read())
+                return self.root_number
+            except (FileNotFoundError, ValueError):
+                pass
+        self.root_number = int(self.get_step_reader().NbRootsForTransfer())
+        if self.use_brep_cache:
+            STPFileReader.save_text(str(self.root_number), self.get_root_number_file_path())
+        return self.root_number
+    
+    def get_root_shape(self, root: int) -> TopoDS_Shape:
+        """
+        Args:
+            root (int): root number from 0
+        """
+        if root in self.root_shapes:
+            return self.root_shapes[root]
+        if self.use_brep_cache:
+            brep_file_path = STPFileReader.get_brep_file_path(self.cache_dir, self.file_fingerprint, root)
+            shape = STPFileReader.load_brep(brep_file_path)
+            if shape is not None:
+                self.root_shapes[root] = shape
+                return shape
+        root_number = self.get_root_number()
+        if not 0 <= root < root_number:
+            raise IndexError(f"STPRootReader: root {root} is out of {root_number} roots")
+        step_reader = self.get_step_reader()
+        shape_number = step_reader.NbShapes()
+        # a failed transfer adds no shape, the last shape belongs to another root then
+        if not step_reader.TransferRoot(root + 1) or step_reader.NbShapes() <= shape_number:
+            raise ValueError(f"STPRootReader: root {root} of {self.file_path} is not transferred")
+        shape = step_reader.Shape(step_reader.NbShapes())
+        if shape.IsNull():
+            raise ValueError(f"STPRootReader: root {root} of {self.file_path} is a null shape")
+        if self.use_brep_cache:
+            STPFileReader.save_brep(shape, brep_file_path)
+        self.root_shapes[root] = shape
+        return shape
+    
+    def __iter__(self):
+        for root in range(self.get_root_number()):
+            yield self.get_root_shape(root)
 
 class ShapeToMeshConvertor:
+    # "pytorch3d" imports torch and pytorch3d when it is selected
+    SAMPLING_BACKENDS: Tuple[str, ...] = ("numpy", "pytorch3d")
+    
     @classmethod    
-    def convert_to_point_clouds(cls, brep_shape: TopoDS_Shape, number_of_points: int = 50000): 
+    def convert_to_point_clouds(cls, brep_shape: TopoDS_Shape, number_of_points: int = 50000, 
+                                seed: Optional[int] = None, backend: str = "numpy") -> np.ndarray: 
+        """
+        Args:
+            brep_shape (TopoDS_Shape): shape to sample, meshed by init_brep_mesh
+            number_of_points (int): points sampled uniformly over the area of the surface
+            seed (Optional[int]): seed of the numpy sampler, None for a random one
+            backend (str): one of SAMPLING_BACKENDS
+        Returns:
+            np.ndarray: (number_of_points, 3) float32 x, y, z coordinates, (0, 3) for a shape without area
+        """
+        if backend not in cls.SAMPLING_BACKENDS:
+            raise ValueError(f"ShapeToMeshConvertor: unknown sampling backend {backend}")
+        mesh_vertices, mesh_faces = cls.convert_to_triangle_mesh(brep_shape)
+        if backend == "pytorch3d":
+            return cls.sample_triangle_mesh_by_pytorch3d(mesh_vertices, mesh_faces, number_of_points)
+        return cls.sample_triangle_mesh(mesh_vertices, mesh_faces, number_of_points, seed)
+    
+    @classmethod    
+    def sample_triangle_mesh(cls, vertices: np.ndarray, faces: np.ndarray, number_of_points: int, 
+                             seed: Optional[int] = None) -> np.ndarray:
+        """
+        description:
+            triangles picked with probability proportional to their area,
+            uniform barycentric coordinates on the picked triangle
+        Args:
+            vertices (np.ndarray): (V, 3) x, y, z coordinates
+            faces (np.ndarray): (F, 3) vertex indices of the triangles
+        Returns:
+            np.ndarray: (number_of_points, 3) float32 points, (0, 3) if the triangles have no area
+        """
+        triangles = np.asarray(vertices, dtype=np.float64)[np.asarray(faces, dtype=np.int64).reshape(-1, 3)]
+        areas = 0.5 * np.linalg.norm(np.cross(triangles[:, 1] - triangles[:, 0], 
+                                              triangles[:, 2] - triangles[:, 0]), axis=1)
+        area_sum = areas.sum()
+        if len(triangles) == 0 or area_sum <= 0.0:
+            return np.zeros((0, 3), dtype=np.float32)
+        
+        rng = np.random.default_rng(seed)
+        triangle_ids = rng.choice(len(triangles), size=number_of_points, p=areas / area_sum)
+        # sqrt of the first number spreads the points evenly instead of toward a vertex
+        sqrt_r1 = np.sqrt(rng.random(number_of_points))
+        r2 = rng.random(number_of_points)
+        weights = np.stack([1.0 - sqrt_r1, sqrt_r1 * (1.0 - r2), sqrt_r1 * r2], axis=1)
+        points = np.einsum("nv,nvd->nd", weights, triangles[triangle_ids])
+        return points.astype(np.float32)
+    
+    @classmethod    
+    def sample_triangle_mesh_by_pytorch3d(cls, vertices: np.ndarray, faces: np.ndarray, 
+                                          number_of_points: int) -> np.ndarray:
+        import torch
+        from pytorch3d.structures import Meshes
+        from pytorch3d.ops import sample_points_from_meshes
+        
+        torch_points = torch.tensor(vertices, dtype=torch.float32).view(1, -1, 3)  
+        torch_faces = torch.tensor(faces, dtype=torch.int64).view(1, -1, 3)    
+        torch_mesh = Meshes(torch_points, torch_faces)  
+        
+        sampled_points = sample_points_from_meshes(torch_mesh, number_of_points)
+        return sampled_points[0].numpy().astype(np.float32)
+    
+    @classmethod    
+    def convert_to_triangle_mesh(cls, brep_shape: TopoDS_Shape) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (V, 3) float64 vertices and (F, 3) int64 vertex indices 
+                of the triangles of all faces
+        """
         cls.init_brep_mesh(brep_shape)
+        return cls.get_triangle_mesh(brep_shape)
+    
+    @classmethod    
+    def get_triangle_mesh(cls, brep_shape: TopoDS_Shape) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        description:
+            triangles of the faces already meshed by init_brep_mesh, faces without a triangulation are skipped.
+            the triangulations are counted first, then the arrays are filled face by face
+            and the location of each face is applied to its nodes as one matrix product.
+            triangles of reversed faces are flipped, all triangles face out of the material
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (V, 3) float64 vertices and (F, 3) int64 vertex indices
+        """
         explorer = TopExp_Explorer()
         explorer.Init(brep_shape, TopAbs_FACE)
         
-        mesh_faces = []
-        mesh_vertices = []
-
+        face_triangulations = []
+        vertex_number = triangle_number = 0
         while (explorer.More()):
             face = explorer.Current()
-            cls.init_triangle_mesh(mesh_vertices, mesh_faces, face)
+            loc = TopLoc_Location()
+            poly = BRep_Tool.Triangulation(face, loc)
+            if poly is not None and poly.NbTriangles() > 0:
+                face_triangulations.append((poly, loc, face.Orientation() == TopAbs_REVERSED))
+                vertex_number += poly.NbNodes()
+                triangle_number += poly.NbTriangles()
             explorer.Next()
         
-        torch_points = torch.tensor(mesh_vertices, dtype=torch.float32).view(1, -1, 3)  
-        torch_faces = torch.tensor(mesh_faces, dtype=torch.int64).view(1, -1, 3)    
-        torch_mesh = Meshes(torch_points, torch_faces)  
+        vertices = np.empty((vertex_number, 3), dtype=np.float64)
+        faces = np.empty((triangle_number, 3), dtype=np.int64)
+        vertex_offset = triangle_offset = 0
+        for poly, loc, is_reversed in face_triangulations:
+            face_vertex_number, face_triangle_number = poly.NbNodes(), poly.NbTriangles()
+            face_vertices = vertices[vertex_offset:vertex_offset + face_vertex_number]
+            face_vertices[:] = [poly.Node(node_number).Coord() for node_number in range(1, face_vertex_number + 1)]
+            if not loc.IsIdentity():
+                matrix = cls.get_transformation_matrix(loc)
+                face_vertices[:] = face_vertices @ matrix[:, :3].T + matrix[:, 3]
+            
+            # node numbers of a triangulation start from 1
+            face_faces = faces[triangle_offset:triangle_offset + face_triangle_number]
+            face_faces[:] = [poly.Triangle(triangle_number).Get() for triangle_number in range(1, face_triangle_number + 1)]
+            face_faces += vertex_offset - 1
+            if is_reversed:
+                face_faces[:] = face_faces[:, ::-1]
+            vertex_offset += face_vertex_number
+            triangle_offset += face_triangle_number
+        return vertices, faces
+    
+    @classmethod    
+    def get_transformation_matrix(cls, loc: TopLoc_Location) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: (3, 4) rotation and scale in the first 3 columns, translation in the last
+        """
+        trsf = loc.Transformation()
+        return np.array([[trsf.Value(row, col) for col in range(1, 5)] for row in range(1, 4)], dtype=np.float64)
+    
+    @classmethod    
+    def get_solid_triangle_meshes(cls, brep_shape: TopoDS_Shape) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        description:
+            triangle mesh of every solid of a shape already meshed by init_brep_mesh
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: vertices and vertex indices of the triangles per solid
+        """
+        explorer = TopExp_Explorer()
+        explorer.Init(brep_shape, TopAbs_SOLID)
         
-        sampled_points = sample_points_from_meshes(torch_mesh, number_of_points)
-
-        return sampled_points[0].tolist()
+        solid_meshes = []
+        while (explorer.More()):
+            solid_meshes.append(cls.get_triangle_mesh(explorer.Current()))
+            explorer.Next()
+        return solid_meshes
     
     @classmethod    
     def init_brep_mesh(cls, shape: TopoDS_Shape) -> BRepMesh_IncrementalMesh:    
@@ -84,36 +385,6 @@ class ShapeToMeshConvertor:
         bmesh = BRepMesh_IncrementalMesh(shape, line_deflaction, False, angle_deflection, False)
         return bmesh
 
-    @classmethod    
-    def init_triangle_mesh(cls, mesh_vertices, mesh_faces, face) -> None:
-        before_vertices_number = len(mesh_vertices)
-        loc = TopLoc_Location()
-        
-        poly = BRep_Tool.Triangulation(face, loc)
-        if (poly is None):
-            return
-        
-        node_numbers = poly.NbNodes()
-        nodes = poly.InternalNodes()
-
-        for node_number in range(node_numbers):
-            pnt = nodes.Value(node_number).Transformed(loc.Transformation())
-            mesh_vertices.append(pnt.Coord())
-
-        triangles = poly.InternalTriangles()
-        mesh_triangle_indicies = \
-            list(range(before_vertices_number, len(mesh_vertices) + before_vertices_number))
-            
-        for triangle_number in range(triangles.Lower(), triangles.Upper() + 1):
-            triangle_indicies = triangles.Value(triangle_number).Get()
-            if len(triangle_indicies) == 0:
-                continue
-            
-            triangle_index = \
-                [mesh_triangle_indicies[index - 1] for index in triangle_indicies]
-            mesh_faces.append(triangle_index)
-        return
-
 
 
 from OCC.Core.gp import gp_Pnt
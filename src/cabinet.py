@@ -1,5 +1,5 @@
 import os
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from OCC.Core.gp import gp_Pnt
 from OCC.Core.TopoDS import TopoDS_Shape
 from openpyxl import load_workbook  
@@ -8,41 +8,89 @@ from src.brep.brep_util import STPFileReader
 from src.grids_util import Voxelization
 from src.grids.grids3d import Grids3D, Node
 from src.cable import Cable
+from src.pathfinding import JumpPointSearchTheta
+from src.parallel_routing import ParallelRouter, RouteResult
+from src.route_cache import RouteCache
+from src.voxelization_cache import VoxelizationCache
 
 
 class Cabinet:
-    def __init__(self, grids_np_file: str = "") -> None:            
+    def __init__(self, grids_np_file: str = "", processes: Optional[int] = 1, 
+                 route_cache_dir: Optional[str] = None, fill_interior: bool = False,
+                 voxelization_cache_dir: Optional[str] = None) -> None:            
         self.grids = Grids3D(
                     corner_max=gp_Pnt(200, 200, 200),
                     corner_min=gp_Pnt(-200, -200, -200),
                     map_size=30)
         self.cable_name_list: List[str] = self.get_cable_name_list()
         self.cables: Optional[List[Cable]] = None   
+        # routes of unchanged cables are read from the cache directory instead of searched
+        self.route_cache: Optional[RouteCache] = RouteCache(route_cache_dir) if route_cache_dir is not None else None
             
-        if os.path.isfile(grids_np_file):   
+        # the cache directory is checked against CABINET.step and the grids, grids_np_file is loaded as it is
+        if voxelization_cache_dir is not None:
+            VoxelizationCache(voxelization_cache_dir).voxelize_step_file(self.grids, "CABINET.step", fill_interior)
+        elif os.path.isfile(grids_np_file):   
             self.grids.load_grid_map(grids_np_file)  
         else:
             self.cabinet_shape: TopoDS_Shape = None   
-            self.cabinet_shape = STPFileReader.read_stp_file_by_occ("CABINET.step")  
-            Voxelization.voxelize(grids=self.grids, shape=self.cabinet_shape)         
+            self.cabinet_shape = STPFileReader.read_stp_file_by_occ("CABINET.step", use_brep_cache=True)  
+            # fill_interior marks the inside of the solid parts, routes can not pass through them
+            Voxelization.voxelize(grids=self.grids, shape=self.cabinet_shape, fill_interior=fill_interior)         
             
-        self.cables = [self.get_cable(cable_name) for cable_name in self.cable_name_list]     
+        # processes other than 1 (None for every core) routes the cables in a process pool
+        if processes == 1:
+            self.cables = self.get_cables()
+        else:
+            self.cables = self.get_cables_parallel(processes)
         
 
-    def get_cable(self, cable_name: str) -> Cable:
+    def get_cable_terminals(self, cable_name: str) -> Cable:
         cable_data = self.get_cable_data(cable_name)
-        start_pnt, end_pnt = cable_data['start_point'], cable_data['end_point']
-        start_vec, end_vec = cable_data['start_vector'], cable_data['end_vector'] 
-        middle_pnts = cable_data['middle_points']  
-        middle_pnts = [gp_Pnt(*pnt) for pnt in middle_pnts]
         cable = Cable()
-
-        cable.set_start_terminal(start_pnt=gp_Pnt(*start_pnt), start_vec = start_vec, grids=self.grids)
-        cable.set_goal_terminal(goal_pos=gp_Pnt(*end_pnt), goal_vec = end_vec, grids=self.grids)
-        cable.set_intermediate_pnts(pnts=middle_pnts, grids=self.grids, diameter=1)   
-
-        #cable.set_spline(diameter=1, grids=self.grids)
+        cable.set_start_terminal(start_pnt=gp_Pnt(*cable_data['start_point']), 
+                                 start_vec=cable_data['start_vector'], grids=self.grids)
+        cable.set_goal_terminal(goal_pos=gp_Pnt(*cable_data['end_point']), 
+                                goal_vec=cable_data['end_vector'], grids=self.grids)
+        cable.set_intermediate_terminals(pnts=[gp_Pnt(*pnt) for pnt in cable_data['middle_points']], grids=self.grids)
         return cable
+    
+    def get_cables(self) -> List[Cable]:
+        """
+        description:
+            terminals of all cables are set on the grids first, then the cables are routed one by one.
+            every cable sees the same obstacle map, so its route (and its route cache key)
+            does not depend on the cables before it
+        """
+        cables = [self.get_cable_terminals(cable_name) for cable_name in self.cable_name_list]
+        for cable in cables:
+            cable.set_route(grids=self.grids, diameter=1, route_cache=self.route_cache)
+            #cable.set_spline(diameter=1, grids=self.grids)
+        return cables
+    
+    def get_cables_parallel(self, processes: Optional[int] = None) -> List[Cable]:
+        """
+        description:
+            terminals of all cables are set on the grids first, 
+            then the cables are routed in a process pool on the shared obstacle map,
+            which is the same map get_cables routes on
+        """
+        cables = [self.get_cable_terminals(cable_name) for cable_name in self.cable_name_list]
+        terminals_list = [[(node.i, node.j, node.k) for node in cable.get_terminals()] for cable in cables]
+        route_results = self.route_parallel(terminals_list, processes)
+        for cable, route_result in zip(cables, route_results):
+            for segment, is_found in enumerate(route_result.leg_found.tolist()):
+                if not is_found:
+                    cable.print_dropped_segment(segment, self.grids)
+            cable.set_path_nodes(route_result.get_path_nodes(self.grids), diameter=1)
+        return cables
+    
+    def route_parallel(self, terminals_list: List[List[Tuple[int, int, int]]], 
+                       processes: Optional[int] = None) -> List[RouteResult]:
+        # cached routes are served first, only the misses are sent to the process pool
+        if self.route_cache is not None:
+            return self.route_cache.get_routes(self.grids, terminals_list, JumpPointSearchTheta, processes)
+        return ParallelRouter(self.grids, JumpPointSearchTheta, processes).route(terminals_list)
 
     def get_cable_data(self, cable_name):
         file_path = os.path.join(r'ModelCoordinates.xlsx')
@@ -6,9 +6,11 @@ from OCC.Core.BRepClass3d import BRepClass3d_SolidClassifier
 from OCC.Core.TopAbs import TopAbs_IN
 
 from src.grids.grids3d import Node, Grids3D
+from src.grids.reachability import ReachabilityIndex
 from src.grids_util import CollisionChecker
 from src.line.spline import Spline
-from src.pathfinding import JumpPointSearch, AstarAlgorithmOp, GridAlgorithm, JumpPointSearchTheta
+from src.pathfinding import JumpPointSearch, AstarAlgorithmOp, GridAlgorithm, JumpPointSearchTheta, WaypointRouter
+from src.route_cache import RouteCache
 from src.brep.brep_util import ShapeToMeshConvertor
 from src.optimizer.continuous_optimizer import ACOR
 
@@ -25,7 +27,7 @@ class Cable:
         
     
     def set_start_terminal(self, start_pnt: gp_Pnt, start_vec: Tuple[int, int, int],grids: Grids3D) -> None:
-        gap: float = grids[0, 0, 0].gap
+        gap: float = grids.node_gap
         
         i: int = int((start_pnt.X() - grids.corner_min.X()) / gap)  
         j: int = int((start_pnt.Y() - grids.corner_min.Y()) / gap)
@@ -37,7 +39,7 @@ class Cable:
         return  
     
     def set_goal_terminal(self, goal_pos: gp_Pnt, goal_vec: Tuple[int, int, int] ,grids: Grids3D) -> None:
-        gap: float = grids[0, 0, 0].gap
+        gap: float = grids.node_gap
         
         i: int = int((goal_pos.X() - grids.corner_min.X()) / gap)  
         j: int = int((goal_pos.Y() - grids.corner_min.Y()) / gap)
@@ -58,31 +60,67 @@ class Cable:
         
         return 
     
-    def set_intermediate_pnts(self, pnts: List[gp_Pnt], grids: Grids3D, diameter: float) -> None:   
+    def set_intermediate_pnts(self, pnts: List[gp_Pnt], grids: Grids3D, diameter: float, 
+                              route_cache: Optional[RouteCache] = None) -> None:   
+        self.set_intermediate_terminals(pnts=pnts, grids=grids)
+        self.set_route(grids=grids, diameter=diameter, route_cache=route_cache)
+        return
+    
+    def set_route(self, grids: Grids3D, diameter: float, route_cache: Optional[RouteCache] = None) -> None:
+        """
+        description:
+            routes the terminals, which must be set on the grids already
+        """
+        if route_cache is not None:
+            # a route of the same map and terminals is served from the cache without searching
+            route_result = route_cache.get_route(grids, self.get_terminals(), JumpPointSearchTheta)
+            leg_found = route_result.leg_found.tolist()
+            path_nodes = route_result.get_path_nodes(grids)
+        else:
+            # one pathfinder for all segments, shared waypoints are not repeated in the path
+            router = WaypointRouter(grids, JumpPointSearchTheta)
+            router.route(self.get_terminals())
+            leg_found = [leg_stats.is_found for leg_stats in router.leg_stats]
+            path_nodes = router.get_path_nodes()
+        for i, is_found in enumerate(leg_found):
+            if not is_found:
+                self.print_dropped_segment(i, grids)
+        self.set_path_nodes(path_nodes, diameter=diameter)
+        return
+    
+    def set_intermediate_terminals(self, pnts: List[gp_Pnt], grids: Grids3D) -> None:
         for pnt in pnts:
-            gap: float = grids[0, 0, 0].gap
+            gap: float = grids.node_gap
             i: int = int((pnt.X() - grids.corner_min.X()) / gap)  
             j: int = int((pnt.Y() - grids.corner_min.Y()) / gap)
             k: int = int((pnt.Z() - grids.corner_min.Z()) / gap)
             node = grids[i, j, k]
             node.is_obstacle = False
             self.intermidiate_terminals.append(node)    
-            
-        cable_nodes = [self.start_terminal] + self.intermidiate_terminals + [self.goal_terminal]    
-        for i in range(len(cable_nodes) - 1):   
-            grids.set_start_node(cable_nodes[i])
-            grids.set_goal_node(cable_nodes[i + 1])   
-            
-            pathfinder: GridAlgorithm = JumpPointSearchTheta(grids = grids)  
-            if pathfinder.search(): 
-                path_nodes = pathfinder.get_path_nodes()
-                path_pnts = [node.center_pnt for node in path_nodes]
-                for pnt in path_pnts:
-                    self.splines_pnts.append(pnt)
+        return
+    
+    def get_terminals(self) -> List[Node]:
+        return [self.start_terminal] + self.intermidiate_terminals + [self.goal_terminal]
+    
+    def set_path_nodes(self, path_nodes: List[Node], diameter: float) -> None:
+        self.path_nodes = path_nodes
+        for node in self.path_nodes:
+            self.splines_pnts.append(node.center_pnt)
         
         self.spline = Spline(path_pnts=self.splines_pnts, diameter=diameter)
         return
     
+    def print_dropped_segment(self, segment: int, grids: Grids3D) -> None:
+        terminals = self.get_terminals()
+        start_node, goal_node = terminals[segment], terminals[segment + 1]
+        reachability_index = ReachabilityIndex.get_reachability_index(grids)
+        start_components = reachability_index.get_start_components(start_node.i, start_node.j, start_node.k)
+        goal_component = reachability_index.get_component(goal_node.i, goal_node.j, goal_node.k)
+        print(f"Cable.set_intermediate_pnts: segment {segment} is dropped, "
+              f"no path from ({start_node.i}, {start_node.j}, {start_node.k}) in components {start_components} "
+              f"to ({goal_node.i}, {goal_node.j}, {goal_node.k}) in component {goal_component}")
+        return
+    
     def cable_optimization(self, fused_shape: TopoDS_Shape, grids: Grids3D) -> None:
         self.fused_shape = fused_shape
         self.grids = grids
@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from typing import List, Tuple, Optional
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from src.grids.grids3d import Grids3D
+from src.grids.heuristics import get_free_voxel_graph
+
+
+class DistanceField:
+    """
+    description:
+        shortest 26-connected grid distances from one source voxel to every voxel,
+        one dijkstra over the free voxels. parents[v] is the previous voxel of the
+        shortest path from the source to v, so the path to any voxel is read
+        in O(path length) without a search. inf and -1 for voxels not reached.
+    """
+    def __init__(self, source_index: int, distances: np.ndarray, parents: np.ndarray, version: int) -> None:
+        self.source_index: int = source_index
+        # (map_size ** 3,) float64 distances and int32 flat indices of the parents
+        self.distances: np.ndarray = distances
+        self.parents: np.ndarray = parents
+        self.version: int = version
+
+    @property
+    def nbytes(self) -> int:
+        return self.distances.nbytes + self.parents.nbytes
+
+    @classmethod
+    def build(cls, grids: Grids3D, source_index: int, graph: csr_matrix, free_indices: np.ndarray) -> "DistanceField":
+        """
+        Args:
+            source_index (int): flat index of the source
+            graph (csr_matrix): get_free_voxel_graph of the free voxels, the source included
+            free_indices (np.ndarray): flat indices of the nodes of the graph
+        """
+        size = grids.map_size ** 3
+        distances = np.full(size, np.inf)
+        parents = np.full(size, -1, dtype=np.int32)
+        source_id = int(np.searchsorted(free_indices, source_index))
+        if source_id < len(free_indices) and free_indices[source_id] == source_index:
+            node_distances, predecessors = dijkstra(graph, directed=False, indices=source_id, return_predecessors=True)
+            distances[free_indices] = node_distances
+            is_reached = predecessors >= 0
+            parents[free_indices[is_reached]] = free_indices[predecessors[is_reached]]
+        return DistanceField(source_index, distances, parents, grids.version)
+
+    def get_distance(self, index: int) -> float:
+        return float(self.distances[index])
+
+    def get_path_indices(self, index: int) -> List[int]:
+        """
+        Returns:
+            List[int]: flat indices from index to the source, empty if index is not reached
+        """
+        if not np.isfinite(self.distances[index]):
+            return []
+        parents = self.parents
+        path_indices = [index]
+        while index != self.source_index:
+            index = int(parents[index])
+            path_indices.append(index)
+        return path_indices
+
+
+class DistanceFieldCache:
+    """
+    description:
+        distance fields of the terminals on the current obstacle map, cached on the grids.
+        a terminal shared by many routes (a connector, a middle point) costs one dijkstra,
+        its routes are read from the parents of the field. the graph of the free voxels
+        is built once per obstacle map, every field is cleared when the map changes.
+        fields are kept in least recently used order and evicted above max_bytes,
+        the last field is kept even if it is larger.
+    """
+    CACHE_KEY: str = "distance_field_cache"
+    MAX_BYTES: int = 256 << 20
+
+    def __init__(self, max_bytes: int = MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            raise ValueError("DistanceFieldCache: max_bytes must be positive")
+        self.max_bytes: int = max_bytes
+        self.fields: "OrderedDict[int, DistanceField]" = OrderedDict()
+        self.nbytes: int = 0
+        self.version: Optional[int] = None
+        self.graph: Optional[csr_matrix] = None
+        self.free_indices: Optional[np.ndarray] = None
+        self.hit_number: int = 0
+        self.miss_number: int = 0
+
+    @classmethod
+    def get_distance_field_cache(cls, grids: Grids3D, max_bytes: Optional[int] = None) -> "DistanceFieldCache":
+        """
+        Args:
+            max_bytes (Optional[int]): new memory bound of the cache, None keeps it
+        """
+        distance_field_cache: Optional[DistanceFieldCache] = grids.cache.get(cls.CACHE_KEY)
+        if distance_field_cache is None:
+            distance_field_cache = DistanceFieldCache(max_bytes if max_bytes is not None else cls.MAX_BYTES)
+            grids.cache[cls.CACHE_KEY] = distance_field_cache
+        elif max_bytes is not None:
+            if max_bytes <= 0:
+                raise ValueError("DistanceFieldCache: max_bytes must be positive")
+            distance_field_cache.max_bytes = max_bytes
+            distance_field_cache.evict()
+        return distance_field_cache
+
+    def begin(self, grids: Grids3D) -> None:
+        # the fields and the graph of an older obstacle map are dropped
+        if self.version == grids.version:
+            return
+        self.clear()
+        self.version = grids.version
+        return
+
+    def clear(self) -> None:
+        self.fields.clear()
+        self.nbytes = 0
+        self.graph = self.free_indices = None
+        self.version = None
+        return
+
+    def get_cached_distance_field(self, grids: Grids3D, source_ijk: Tuple[int, int, int]) -> Optional[DistanceField]:
+        """
+        Returns:
+            Optional[DistanceField]: field of the source if it is cached, nothing is built
+        """
+        self.begin(grids)
+        source_index = grids.get_index(*source_ijk)
+        distance_field = self.fields.get(source_index)
+        if distance_field is not None:
+            self.hit_number += 1
+            self.fields.move_to_end(source_index)
+        return distance_field
+
+    def get_distance_field(self, grids: Grids3D, source_ijk: Tuple[int, int, int]) -> DistanceField:
+        distance_field = self.get_cached_distance_field(grids, source_ijk)
+        if distance_field is not None:
+            return distance_field
+        self.miss_number += 1
+        source_index = grids.get_index(*source_ijk)
+        if grids.obstacle_map[source_ijk] == 0:
+            if self.graph is None:
+                self.free_indices = np.flatnonzero(grids.obstacle_map.reshape(-1) == 0)
+                self.graph = get_free_voxel_graph(grids.obstacle_map == 0, grids.node_gap, self.free_indices)
+            distance_field = DistanceField.build(grids, source_index, self.graph, self.free_indices)
+        else:
+            # a terminal inside an obstacle leaves it to its free neighbors, a graph of its own
+            free_map = grids.obstacle_map == 0
+            free_map[source_ijk] = True
+            free_indices = np.flatnonzero(free_map.reshape(-1))
+            graph = get_free_voxel_graph(free_map, grids.node_gap, free_indices)
+            distance_field = DistanceField.build(grids, source_index, graph, free_indices)
+        self.fields[source_index] = distance_field
+        self.nbytes += distance_field.nbytes
+        self.evict()
+        return distance_field
+
+    def evict(self) -> None:
+        while self.nbytes > self.max_bytes and len(self.fields) > 1:
+            _, distance_field = self.fields.popitem(last=False)
+            self.nbytes -= distance_field.nbytes
+        return
@@ -0,0 +1,114 @@
+from typing import List, Tuple, Optional
+import numpy as np
+from scipy import ndimage
+from scipy.sparse.csgraph import dijkstra
+
+from src.grids.grids3d import Grids3D
+from src.grids.heuristics import get_free_voxel_graph
+
+
+class GridPyramid:
+    """
+    description:
+        coarse levels of the obstacle map, level l has blocks of 2^l voxels per axis.
+        obstacle_maps[l] is the max-pool of level l - 1 over 2 x 2 x 2 blocks,
+        a block is an obstacle if any of its voxels is one (voxels past the map border are free).
+        a path over free blocks is a path over free voxels, narrow passages are closed
+        on the coarse levels. level 0 is the obstacle map of the grids.
+    """
+    CACHE_KEY: str = "grid_pyramid"
+    LEVEL_NUMBER: int = 3
+    STRUCTURE: np.ndarray = np.ones((3, 3, 3), dtype=bool)
+
+    def __init__(self, obstacle_maps: List[np.ndarray], node_gap: float, version: int) -> None:
+        # (ceil(map_size / 2^l),) * 3 bool obstacle maps of the levels 0 to level_number
+        self.obstacle_maps: List[np.ndarray] = obstacle_maps
+        self.node_gap: float = node_gap
+        self.version: int = version
+
+    @property
+    def level_number(self) -> int:
+        return len(self.obstacle_maps) - 1
+
+    @classmethod
+    def get_grid_pyramid(cls, grids: Grids3D, level_number: int = LEVEL_NUMBER) -> "GridPyramid":
+        """
+        description:
+            pyramid of the current obstacle map, cached on the grids
+        """
+        grid_pyramid: Optional[GridPyramid] = grids.cache.get(cls.CACHE_KEY)
+        if grid_pyramid is not None and grid_pyramid.version == grids.version and \
+                grid_pyramid.level_number == level_number:
+            return grid_pyramid
+        grid_pyramid = cls.build(grids, level_number)
+        grids.cache[cls.CACHE_KEY] = grid_pyramid
+        return grid_pyramid
+
+    @classmethod
+    def build(cls, grids: Grids3D, level_number: int = LEVEL_NUMBER) -> "GridPyramid":
+        obstacle_maps = [grids.obstacle_map != 0]
+        for _ in range(level_number):
+            obstacle_maps.append(cls.max_pool(obstacle_maps[-1]))
+        return GridPyramid(obstacle_maps, grids.node_gap, grids.version)
+
+    @classmethod
+    def max_pool(cls, obstacle_map: np.ndarray) -> np.ndarray:
+        size = obstacle_map.shape[0]
+        pooled_size = (size + 1) // 2
+        padded_map = np.zeros((2 * pooled_size,) * 3, dtype=bool)
+        padded_map[:size, :size, :size] = obstacle_map
+        return padded_map.reshape(pooled_size, 2, pooled_size, 2, pooled_size, 2).any(axis=(1, 3, 5))
+
+    def get_level_ijk(self, level: int, ijk: Tuple[int, int, int]) -> Tuple[int, int, int]:
+        return (ijk[0] >> level, ijk[1] >> level, ijk[2] >> level)
+
+    def get_corridor(self, level: int, path_ijks: List[Tuple[int, int, int]], width: int) -> np.ndarray:
+        """
+        Args:
+            level (int): level of the path, 1 or higher
+            path_ijks (List[Tuple[int, int, int]]): blocks of the path on that level
+            width (int): blocks added around the path
+        Returns:
+            np.ndarray: bool mask of the corridor on level - 1
+        """
+        corridor = np.zeros(self.obstacle_maps[level].shape, dtype=bool)
+        corridor[tuple(np.array(path_ijks).T)] = True
+        if width > 0:
+            corridor = ndimage.binary_dilation(corridor, structure=GridPyramid.STRUCTURE, iterations=width)
+        size = self.obstacle_maps[level - 1].shape[0]
+        for axis in range(3):
+            corridor = np.repeat(corridor, 2, axis=axis)
+        return corridor[:size, :size, :size]
+
+    def get_level_path(self, level: int, start_ijk: Tuple[int, int, int], goal_ijk: Tuple[int, int, int],
+                       corridor: Optional[np.ndarray] = None) -> Optional[List[Tuple[int, int, int]]]:
+        """
+        description:
+            shortest path over the free blocks of a level inside the corridor.
+            the blocks of the terminals are searched even if they hold obstacles,
+            the terminals themselves may be next to one
+        Args:
+            start_ijk, goal_ijk (Tuple[int, int, int]): terminals as voxels of the grids
+            corridor (Optional[np.ndarray]): bool mask of the level, None for the whole level
+        Returns:
+            Optional[List[Tuple[int, int, int]]]: blocks from the start to the goal, None if there is no path
+        """
+        start_ijk, goal_ijk = self.get_level_ijk(level, start_ijk), self.get_level_ijk(level, goal_ijk)
+        free_map = ~self.obstacle_maps[level]
+        if corridor is not None:
+            free_map &= corridor
+        free_map[start_ijk] = free_map[goal_ijk] = True
+        free_indices = np.flatnonzero(free_map.reshape(-1))
+        graph = get_free_voxel_graph(free_map, self.node_gap * (1 << level), free_indices)
+
+        shape = free_map.shape
+        start_id = int(np.searchsorted(free_indices, np.ravel_multi_index(start_ijk, shape)))
+        goal_id = int(np.searchsorted(free_indices, np.ravel_multi_index(goal_ijk, shape)))
+        distances, predecessors = dijkstra(graph, directed=False, indices=start_id, return_predecessors=True)
+        if not np.isfinite(distances[goal_id]):
+            return None
+        node_ids = [goal_id]
+        while node_ids[-1] != start_id:
+            node_ids.append(int(predecessors[node_ids[-1]]))
+        ijks = np.unravel_index(free_indices[node_ids[::-1]], shape)
+        return [tuple(ijk) for ijk in np.stack(ijks, axis=1).tolist()]
@@ -90,20 +90,116 @@ class Box:
         return gap
 
 class Node(Box):
-    # geometry properties are initialized in grids3d initialization step
-    def __init__(self, i: int = 0, j: int = 0, k: int = 0) -> None:
+    # a node created by Grids3D is a view: obstacle and start/goal flags 
+    # are read from and written to the numpy maps of the grids and 
+    # geometry properties are computed from the grids on first access
+    def __init__(self, i: int = 0, j: int = 0, k: int = 0, grids: Optional["Grids3D"] = None) -> None:
+        self._center_pnt: Optional[gp_Pnt] = None
+        self._corner_min: Optional[gp_Pnt] = None
+        self._corner_max: Optional[gp_Pnt] = None
+        self._gap: Optional[float] = None
         super().__init__()
         self.i: int = i
         self.j: int = j
         self.k: int = k
+        self.grids: Optional[Grids3D] = grids
+        # flat index in the grids, used by search states
+        self.index: Optional[int] = grids.get_index(i, j, k) if grids is not None else None
         
         self.f: float = 0.0
         self.g: float = 0.0
         
         self.parent: Optional[Node] = None 
-        self.is_start_node: bool = False   
-        self.is_goal_node: bool = False
-        self.is_obstacle: bool = False
+        self._is_start_node: bool = False   
+        self._is_goal_node: bool = False
+        self._is_obstacle: bool = False
+    
+    # lazy initialization of geometry properties
+    @property
+    def center_pnt(self) -> Optional[gp_Pnt]:
+        if self._center_pnt is None and self.grids is not None:
+            self._center_pnt = self.grids.get_node_center_pnt(self.i, self.j, self.k)
+        return self._center_pnt
+    
+    @center_pnt.setter
+    def center_pnt(self, center_pnt: Optional[gp_Pnt]) -> None:
+        self._center_pnt = center_pnt
+        return
+    
+    @property
+    def corner_min(self) -> Optional[gp_Pnt]:
+        if self._corner_min is None and self.grids is not None:
+            self._corner_min = self.grids.get_node_corner_min(self.i, self.j, self.k)
+        return self._corner_min
+    
+    @corner_min.setter
+    def corner_min(self, corner_min: Optional[gp_Pnt]) -> None:
+        self._corner_min = corner_min
+        return
+    
+    @property
+    def corner_max(self) -> Optional[gp_Pnt]:
+        if self._corner_max is None and self.grids is not None:
+            self._corner_max = self.grids.get_node_corner_max(self.i, self.j, self.k)
+        return self._corner_max
+    
+    @corner_max.setter
+    def corner_max(self, corner_max: Optional[gp_Pnt]) -> None:
+        self._corner_max = corner_max
+        return
+    
+    @property
+    def gap(self) -> Optional[float]:
+        if self._gap is None and self.grids is not None:
+            self._gap = self.grids.node_gap
+        return self._gap
+    
+    @gap.setter
+    def gap(self, gap: Optional[float]) -> None:
+        self._gap = gap
+        return
+    
+    @property
+    def is_obstacle(self) -> bool:
+        if self.grids is None:
+            return self._is_obstacle
+        return self.grids.obstacle_map.item(self.i, self.j, self.k) == 1
+    
+    @is_obstacle.setter
+    def is_obstacle(self, is_obstacle: bool) -> None:
+        if self.grids is None:
+            self._is_obstacle = is_obstacle
+            return
+        self.grids.set_obstacle(self.i, self.j, self.k, is_obstacle)
+        return
+    
+    @property
+    def is_start_node(self) -> bool:
+        if self.grids is None:
+            return self._is_start_node
+        return self.grids.flag_map.item(self.i, self.j, self.k) & Grids3D.START_FLAG != 0
+    
+    @is_start_node.setter
+    def is_start_node(self, is_start_node: bool) -> None:
+        if self.grids is None:
+            self._is_start_node = is_start_node
+            return
+        self.grids.set_flag(self.i, self.j, self.k, Grids3D.START_FLAG, is_start_node)
+        return
+    
+    @property
+    def is_goal_node(self) -> bool:
+        if self.grids is None:
+            return self._is_goal_node
+        return self.grids.flag_map.item(self.i, self.j, self.k) & Grids3D.GOAL_FLAG != 0
+    
+    @is_goal_node.setter
+    def is_goal_node(self, is_goal_node: bool) -> None:
+        if self.grids is None:
+            self._is_goal_node = is_goal_node
+            return
+        self.grids.set_flag(self.i, self.j, self.k, Grids3D.GOAL_FLAG, is_goal_node)
+        return
     
     def copy_from(self, other: "Node") -> None:
         self.i, self.j, self.k = other.i, other.j, other.k
@@ -140,10 +236,18 @@ class Node(Box):
     def __lt__(self, other: "Node") -> bool:
         return self.f < other.f
 
-from typing import Tuple, Optional, List
+from collections import deque
+from typing import Tuple, Optional, List, Dict, Deque, Any
 import numpy as np
 
+from src.grids.search_state import SearchState, SearchStatePool
+
 class Grids3D(Box):
+    # bit flags of flag_map
+    START_FLAG: int = 1
+    GOAL_FLAG: int = 2
+    MAX_OBSTACLE_CHANGES: int = 4096
+    
     def __init__(self, 
                 corner_min: gp_Pnt, 
                 corner_max: gp_Pnt, 
@@ -153,34 +257,118 @@ class Grids3D(Box):
         self.start_node: Optional[Node] = None
         self.goal_node: Optional[Node] = None
         self.map_size: int = map_size   
-        self.nodes_map: List[List[List[Node]]]  = \
-            [[[Node(i, j, k) for k in range(map_size)] for j in range(map_size)] for i in range(map_size)] 
         self.node_gap: float = self.gap / map_size 
-        for i in range(map_size):
-            for j in range(map_size):
-                for k in range(map_size):
-                    
-                    
-                    node_corner_min = gp_Pnt(corner_min.X() + i * self.node_gap, 
-                                             corner_min.Y() +  j * self.node_gap, 
-                                             corner_min.Z() +  k * self.node_gap)
-                    node_corner_max = gp_Pnt(corner_min.X() + (i + 1) * self.node_gap, 
-                                             corner_min.Y() + (j + 1) * self.node_gap, 
-                                             corner_min.Z() + (k + 1) * self.node_gap)  
-                    self.nodes_map[i][j][k].create_box(node_corner_min, node_corner_max)  
+        # 1 is obstacle, 0 is not
+        self.obstacle_map: np.ndarray = np.zeros((map_size, map_size, map_size), dtype=np.uint8)
+        # START_FLAG, GOAL_FLAG bits
+        self.flag_map: np.ndarray = np.zeros((map_size, map_size, map_size), dtype=np.uint8)
+        # node views are created only when they are requested ((i, j, k) -> Node) and kept,
+        # so the attributes of a view (f, g, parent, color) persist. the searches scan
+        # obstacle_map by index and request views only for their paths
+        self.nodes_map: Dict[Tuple[int, int, int], Node] = {}
+        self.search_state_pool: SearchStatePool = SearchStatePool()
+        # version of obstacle_map, increased on every change
+        self.version: int = 0
+        # (version, (i, j, k)) of the recent single voxel changes
+        self.obstacle_changes: Deque[Tuple[int, Tuple[int, int, int]]] = deque(maxlen=Grids3D.MAX_OBSTACLE_CHANGES)
+        # obstacle_changes holds every change after this version
+        self.obstacle_changes_from: int = 0
+        # data derived from obstacle_map (jump table, padded map, ...), 
+        # each entry is rebuilt or updated when its version is behind
+        self.cache: Dict[str, Any] = {}
 
     def reset_nodes(self) -> None:    
-        for node in self:
+        for node in self.nodes_map.values():
             node.reset()
         return
     
+    def acquire_search_state(self, size: Optional[int] = None) -> SearchState:
+        """
+        Args:
+            size (Optional[int]): number of flat indices, map_size ** 3 by default
+        Returns:
+            SearchState: search state owned by the caller until it is released
+        """
+        if size is None:
+            size = self.map_size ** 3
+        return self.search_state_pool.acquire(size)
+    
+    def release_search_state(self, state: SearchState) -> None:
+        self.search_state_pool.release(state)
+        return
+    
+    def get_index(self, i: int, j: int, k: int) -> int:
+        map_size = self.map_size
+        return (i * map_size + j) * map_size + k
+    
+    def get_ijk(self, index: int) -> Tuple[int, int, int]:
+        map_size = self.map_size
+        ij, k = divmod(index, map_size)
+        i, j = divmod(ij, map_size)
+        return i, j, k
+    
+    def get_node_corner_min(self, i: int, j: int, k: int) -> gp_Pnt:
+        corner_min, node_gap = self.corner_min, self.node_gap
+        return gp_Pnt(corner_min.X() + i * node_gap, 
+                      corner_min.Y() + j * node_gap, 
+                      corner_min.Z() + k * node_gap)
+    
+    def get_node_corner_max(self, i: int, j: int, k: int) -> gp_Pnt:
+        corner_min, node_gap = self.corner_min, self.node_gap
+        return gp_Pnt(corner_min.X() + (i + 1) * node_gap, 
+                      corner_min.Y() + (j + 1) * node_gap, 
+                      corner_min.Z() + (k + 1) * node_gap)
+    
+    def get_node_center_pnt(self, i: int, j: int, k: int) -> gp_Pnt:
+        corner_min, node_gap = self.corner_min, self.node_gap
+        x_min, y_min, z_min = corner_min.X() + i * node_gap, corner_min.Y() + j * node_gap, corner_min.Z() + k * node_gap
+        x_max, y_max, z_max = corner_min.X() + (i + 1) * node_gap, corner_min.Y() + (j + 1) * node_gap, corner_min.Z() + (k + 1) * node_gap
+        return gp_Pnt((x_min + x_max) / 2, (y_min + y_max) / 2, (z_min + z_max) / 2)
+    
+    def set_obstacle(self, i: int, j: int, k: int, is_obstacle: bool) -> None:
+        value = 1 if is_obstacle else 0
+        if self.obstacle_map.item(i, j, k) == value:
+            return
+        self.obstacle_map[i, j, k] = value
+        self.version += 1
+        if len(self.obstacle_changes) == self.obstacle_changes.maxlen:
+            self.obstacle_changes_from = self.obstacle_changes[0][0]
+        self.obstacle_changes.append((self.version, (i, j, k)))
+        return
+    
+    def update_obstacle_map(self) -> None:
+        """
+        description:
+            must be called after obstacle_map is written directly,
+            derived data is rebuilt from scratch on the next access
+        """
+        self.version += 1
+        self.obstacle_changes.clear()
+        self.obstacle_changes_from = self.version
+        return
+    
+    def get_obstacle_changes(self, since_version: int) -> Optional[List[Tuple[int, int, int]]]:
+        """
+        Args:
+            since_version (int): version of the caller's derived data
+        Returns:
+            Optional[List[Tuple[int, int, int]]]: voxels changed after since_version, 
+                None if the changes are not recorded
+        """
+        if since_version < self.obstacle_changes_from:
+            return None
+        return [ijk for version, ijk in self.obstacle_changes if version > since_version]
+    
+    def set_flag(self, i: int, j: int, k: int, flag: int, is_set: bool) -> None:
+        if is_set:
+            self.flag_map[i, j, k] |= flag
+        else:
+            self.flag_map[i, j, k] &= ~flag & 0xFF
+        return
+    
     @dispatch(int, int, int)    
     def set_start_node(self, i: int, j: int, k: int) -> None:   
-        if isinstance(self.start_node, Node):
-            self.start_node.is_start_node = False
-        self.start_node = self.nodes_map[i][j][k]
-        self.start_node.is_start_node = True
-        self.start_node.is_obstacle = False 
+        self.set_start_node(self[i, j, k])
         return  
     
     @dispatch(Node)
@@ -194,11 +382,7 @@ class Grids3D(Box):
     
     @dispatch(int, int, int)
     def set_goal_node(self, i: int, j: int, k: int) -> None:
-        if isinstance(self.goal_node, Node):
-            self.goal_node.is_goal_node = False
-        self.goal_node = self.nodes_map[i][j][k]
-        self.goal_node.is_goal_node = True
-        self.goal_node.is_obstacle = False
+        self.set_goal_node(self[i, j, k])
         return
     
     @dispatch(Node)
@@ -210,17 +394,35 @@ class Grids3D(Box):
         node.is_obstacle = False    
         return  
     
+    def iter_obstacle_nodes(self):
+        for i, j, k in np.argwhere(self.obstacle_map):
+            yield self[int(i), int(j), int(k)]
+    
     def __iter__(self):
         for i in range(self.map_size):
             for j in range(self.map_size):
                 for k in range(self.map_size):
-                    yield self.nodes_map[i][j][k]    
+                    yield self[i, j, k]    
                     
     def __getitem__(self, index: Tuple[int, int, int]) -> Node:
-        return self.nodes_map[index[0]][index[1]][index[2]]
+        node = self.nodes_map.get(index)
+        if node is not None:
+            return node
+        
+        map_size = self.map_size
+        i, j, k = index
+        if not (-map_size <= i < map_size and -map_size <= j < map_size and -map_size <= k < map_size):
+            raise IndexError(f"Grids3D: index out of range: {index}")
+        i, j, k = int(i) % map_size, int(j) % map_size, int(k) % map_size
+        
+        node = self.nodes_map.get((i, j, k))
+        if node is None:
+            node = Node(i, j, k, grids=self)
+            self.nodes_map[(i, j, k)] = node
+        return node
         
     def __len__(self):
-        return len(self.nodes_map)
+        return self.map_size
     
     def save_grid_map(self, file_path: str) -> None:
         """_summary_
@@ -231,12 +433,7 @@ class Grids3D(Box):
             save the grid map as a numpy array
             1 is obstacle, 0 is not
         """
-        np_arr = np.zeros((self.map_size, self.map_size, self.map_size))    
-        # 1 is obstacle, 0 is not
-        for node in self:
-            np_arr[node.i, node.j, node.k] = 1 if node.is_obstacle else 0
-        
-        return np.save(file_path, np_arr)
+        return np.save(file_path, self.obstacle_map)
     
     def load_grid_map(self, file_path: str) -> None:
         """_summary_
@@ -250,9 +447,11 @@ class Grids3D(Box):
         """
         self.reset_nodes()
         np_arr = np.load(file_path)    
+        if np_arr.shape != self.obstacle_map.shape:
+            raise ValueError(f"Grids3D: grid map shape {np_arr.shape} does not match {self.obstacle_map.shape}")
         # 1 is obstacle, 0 is not   
-        for node in self:
-            node.is_obstacle = True if np_arr[node.i, node.j, node.k] == 1 else False
+        self.obstacle_map[...] = (np_arr == 1)
+        self.update_obstacle_map()
         
         # basic update for start and goal nodes
         start_node = self[0, 0, 0]
@@ -0,0 +1,297 @@
+import os
+import hashlib
+import math
+from typing import List, Tuple, Optional
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from src.grids.grids3d import Grids3D
+
+
+# one of each (d, -d) pair, edges are undirected
+EDGE_DIRECTIONS: List[Tuple[int, int, int]] = \
+    [(i, j, k) for i in range(-1, 2) for j in range(-1, 2) for k in range(-1, 2) if (i, j, k) > (0, 0, 0)]
+
+
+def get_free_voxel_graph(free_map: np.ndarray, node_gap: float, free_indices: np.ndarray) -> csr_matrix:
+    """
+    Args:
+        free_map (np.ndarray): (N, N, N) bool, True for free voxels
+        node_gap (float): distance of neighboring voxels
+        free_indices (np.ndarray): flat indices of the free voxels, the node ids are positions in it
+    Returns:
+        csr_matrix: undirected 26-connected graph of the free voxels weighted by the step distance
+    """
+    map_size = free_map.shape[0]
+    node_ids = np.full(free_map.shape, -1, dtype=np.int64)
+    node_ids.reshape(-1)[free_indices] = np.arange(len(free_indices))
+    rows, cols, weights = [], [], []
+    for di, dj, dk in EDGE_DIRECTIONS:
+        src = tuple(slice(max(0, -d), map_size - max(0, d)) for d in (di, dj, dk))
+        dst = tuple(slice(max(0, d), map_size - max(0, -d)) for d in (di, dj, dk))
+        is_edge = free_map[src] & free_map[dst]
+        rows.append(node_ids[src][is_edge])
+        cols.append(node_ids[dst][is_edge])
+        weights.append(np.full(int(is_edge.sum()), node_gap * math.sqrt(di * di + dj * dj + dk * dk)))
+    node_number = len(free_indices)
+    return coo_matrix((np.concatenate(weights), (np.concatenate(rows), np.concatenate(cols))),
+                      shape=(node_number, node_number)).tocsr()
+
+
+class Heuristic:
+    """
+    description:
+        lower bound of the path distance between two voxels, plugged into
+        a pathfinder with GridAlgorithm.set_heuristic. get_table returns the bound
+        from every voxel to one target in a single vectorized pass,
+        the pathfinders look it up instead of evaluating the distance on every push.
+    """
+    def get_table(self, grids: Grids3D, target: Tuple[int, int, int]) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: (map_size, map_size, map_size) float64 bounds from each voxel to target
+        """
+        raise NotImplementedError
+
+    def get_distance(self, grids: Grids3D, src: Tuple[int, int, int], dst: Tuple[int, int, int]) -> float:
+        return float(self.get_table(grids, dst)[src])
+
+    @classmethod
+    def get_deltas(cls, grids: Grids3D, target: Tuple[int, int, int]) -> np.ndarray:
+        # (3, map_size, map_size, map_size) absolute index differences to target
+        indices = np.indices(grids.obstacle_map.shape, dtype=np.int64)
+        return np.abs(indices - np.array(target, dtype=np.int64).reshape(3, 1, 1, 1))
+
+
+class EuclideanHeuristic(Heuristic):
+    def get_table(self, grids: Grids3D, target: Tuple[int, int, int]) -> np.ndarray:
+        deltas = Heuristic.get_deltas(grids, target)
+        return grids.node_gap * np.sqrt((deltas * deltas).sum(axis=0))
+
+    def get_distance(self, grids: Grids3D, src: Tuple[int, int, int], dst: Tuple[int, int, int]) -> float:
+        di, dj, dk = dst[0] - src[0], dst[1] - src[1], dst[2] - src[2]
+        return grids.node_gap * math.sqrt(di * di + dj * dj + dk * dk)
+
+
+class OctileHeuristic(Heuristic):
+    """
+    description:
+        exact distance of the 26-connected grid without obstacles,
+        with sorted index differences d1 >= d2 >= d3
+            (d1 - d2) + sqrt(2) * (d2 - d3) + sqrt(3) * d3
+        it bounds the grid moves of A* and JPS tighter than the euclidean distance,
+        any-angle paths (theta) can be shorter, it is not admissible for them.
+    """
+    def get_table(self, grids: Grids3D, target: Tuple[int, int, int]) -> np.ndarray:
+        deltas = np.sort(Heuristic.get_deltas(grids, target), axis=0)
+        d3, d2, d1 = deltas[0], deltas[1], deltas[2]
+        return grids.node_gap * ((d1 - d2) + math.sqrt(2) * (d2 - d3) + math.sqrt(3) * d3)
+
+    def get_distance(self, grids: Grids3D, src: Tuple[int, int, int], dst: Tuple[int, int, int]) -> float:
+        d3, d2, d1 = sorted(abs(dst[n] - src[n]) for n in range(3))
+        return grids.node_gap * ((d1 - d2) + math.sqrt(2) * (d2 - d3) + math.sqrt(3) * d3)
+
+
+class LandmarkHeuristic(Heuristic):
+    """
+    description:
+        ALT heuristic. distances[l] is the shortest 26-connected grid distance
+        from landmark l to every voxel (inf for obstacles and other components),
+        by the triangle inequality
+            h(v) = max_l |distances[l, target] - distances[l, v]|
+        is a consistent lower bound of the grid distance, tight along walls the
+        euclidean distance ignores. landmarks are picked farthest first.
+        the bound holds while no distance differs from a neighbor's by more than their step.
+        new obstacles only remove steps and keep it, a freed voxel gets the shortest
+        distance over its free neighbors and rebuilds the distances only if it can
+        shorten a path (update). the distances are float32, at most MAX_BYTES,
+        and can be saved next to the grid map like the jump table.
+        any-angle paths (theta) can be shorter, it is not admissible for them.
+    """
+    CACHE_KEY: str = "landmark_heuristic"
+    LANDMARK_NUMBER: int = 8
+    MAX_BYTES: int = 256 << 20
+    # relative error of the float32 distances taken off the bound
+    EPSILON: float = 4.0 * float(np.finfo(np.float32).eps)
+    NEIGHBOR_DIRECTIONS: List[Tuple[int, int, int]] = \
+        [(i, j, k) for i in range(-1, 2) for j in range(-1, 2) for k in range(-1, 2) if (i, j, k) != (0, 0, 0)]
+
+    def __init__(self, landmarks: np.ndarray, distances: np.ndarray, fingerprint: str, version: int) -> None:
+        # flat indices of the landmarks
+        self.landmarks: np.ndarray = landmarks
+        # (landmark number, map_size ** 3) float32
+        self.distances: np.ndarray = distances
+        self.fingerprint: str = fingerprint
+        self.version: int = version
+
+    @classmethod
+    def get_fingerprint(cls, grids: Grids3D) -> str:
+        return hashlib.sha1(np.ascontiguousarray(grids.obstacle_map).tobytes()).hexdigest()
+
+    @classmethod
+    def get_file_path(cls, grids_np_file: str) -> str:
+        """
+        Args:
+            grids_np_file (str): .npy grid map file
+        Returns:
+            str: landmark file next to the grid map
+        """
+        root, _ = os.path.splitext(grids_np_file)
+        return root + ".landmarks.npz"
+
+    @classmethod
+    def get_landmark_heuristic(cls, grids: Grids3D) -> "LandmarkHeuristic":
+        """
+        description:
+            landmark heuristic valid for the current obstacle map, cached on the grids.
+            it is kept while the recorded changes only add obstacles
+        """
+        landmark_heuristic: Optional[LandmarkHeuristic] = grids.cache.get(cls.CACHE_KEY)
+        if landmark_heuristic is not None and landmark_heuristic.version == grids.version:
+            return landmark_heuristic
+
+        changes = grids.get_obstacle_changes(landmark_heuristic.version) if landmark_heuristic is not None else None
+        if changes is not None and landmark_heuristic.update(grids, changes):
+            landmark_heuristic.version = grids.version
+        else:
+            landmark_heuristic = cls.build(grids)
+        grids.cache[cls.CACHE_KEY] = landmark_heuristic
+        return landmark_heuristic
+
+    def update(self, grids: Grids3D, changes: List[Tuple[int, int, int]]) -> bool:
+        """
+        description:
+            the freed voxels of the changes get the shortest distance over their free neighbors,
+            one after another. a voxel whose neighbors differ by more than the two steps
+            through it shortens a path (or joins two components), the bound would break
+        Args:
+            changes (List[Tuple[int, int, int]]): voxels changed after the version of the distances
+        Returns:
+            bool: False if the distances must be rebuilt, they are partly updated then
+        """
+        obstacle_map, map_size, node_gap = grids.obstacle_map, grids.map_size, grids.node_gap
+        freed_ijks = list(dict.fromkeys(ijk for ijk in changes if obstacle_map[ijk] == 0))
+        # freed voxels not updated yet are no neighbors
+        pending_ijks = set(freed_ijks)
+        for i, j, k in freed_ijks:
+            pending_ijks.discard((i, j, k))
+            neighbor_indices: List[int] = []
+            steps: List[float] = []
+            for di, dj, dk in LandmarkHeuristic.NEIGHBOR_DIRECTIONS:
+                ni, nj, nk = i + di, j + dj, k + dk
+                if not (0 <= ni < map_size and 0 <= nj < map_size and 0 <= nk < map_size):
+                    continue
+                if obstacle_map.item(ni, nj, nk) or (ni, nj, nk) in pending_ijks:
+                    continue
+                neighbor_indices.append(grids.get_index(ni, nj, nk))
+                steps.append(node_gap * math.sqrt(di * di + dj * dj + dk * dk))
+            index = grids.get_index(i, j, k)
+            if not neighbor_indices:
+                self.distances[:, index] = np.inf
+                continue
+            # (landmark number, neighbor number)
+            neighbor_distances = self.distances[:, neighbor_indices].astype(np.float64)
+            upper = (neighbor_distances + np.array(steps)).min(axis=1)
+            lower = (neighbor_distances - np.array(steps)).max(axis=1)
+            if np.any(lower > upper):
+                return False
+            self.distances[:, index] = upper
+        return True
+
+    @classmethod
+    def get_landmark_number(cls, grids: Grids3D, landmark_number: int) -> int:
+        # landmarks whose distances fit in MAX_BYTES
+        fitting_number = cls.MAX_BYTES // (grids.map_size ** 3 * np.dtype(np.float32).itemsize)
+        if fitting_number == 0:
+            raise ValueError(f"LandmarkHeuristic: map size {grids.map_size} is too large for {cls.MAX_BYTES} bytes")
+        if fitting_number < landmark_number:
+            print(f"LandmarkHeuristic.build: {fitting_number} of {landmark_number} landmarks fit "
+                  f"in {cls.MAX_BYTES} bytes at map size {grids.map_size}")
+        return min(landmark_number, fitting_number)
+
+    @classmethod
+    def build(cls, grids: Grids3D, landmark_number: int = LANDMARK_NUMBER) -> "LandmarkHeuristic":
+        landmark_number = cls.get_landmark_number(grids, landmark_number)
+        free_indices = np.flatnonzero(grids.obstacle_map.reshape(-1) == 0)
+        size = grids.map_size ** 3
+        distances = np.full((landmark_number, size), np.inf, dtype=np.float32)
+        landmarks: List[int] = []
+        if len(free_indices) == 0:
+            return LandmarkHeuristic(np.zeros(0, dtype=np.int64), distances[:0], cls.get_fingerprint(grids), grids.version)
+
+        graph = cls.get_graph(grids, free_indices)
+        # the first landmark is the farthest voxel from an arbitrary free voxel
+        nearest = dijkstra(graph, directed=False, indices=0)
+        for _ in range(landmark_number):
+            # farthest reachable voxel from the landmarks so far
+            reachable = np.isfinite(nearest)
+            if not reachable.any():
+                break
+            landmark = int(np.argmax(np.where(reachable, nearest, -1.0)))
+            if landmarks and nearest[landmark] == 0.0:
+                break
+            field = dijkstra(graph, directed=False, indices=landmark)
+            distances[len(landmarks), free_indices] = field
+            landmarks.append(landmark)
+            nearest = field if len(landmarks) == 1 else np.minimum(nearest, field)
+        if len(landmarks) < landmark_number:
+            distances = distances[:len(landmarks)].copy()
+        return LandmarkHeuristic(free_indices[landmarks], distances, cls.get_fingerprint(grids), grids.version)
+
+    @classmethod
+    def get_graph(cls, grids: Grids3D, free_indices: np.ndarray) -> csr_matrix:
+        # 26-connected graph of the free voxels, node ids are positions in free_indices
+        return get_free_voxel_graph(grids.obstacle_map == 0, grids.node_gap, free_indices)
+
+    def get_table(self, grids: Grids3D, target: Tuple[int, int, int]) -> np.ndarray:
+        if self.version != grids.version:
+            # the landmarks of the current obstacle map
+            return LandmarkHeuristic.get_landmark_heuristic(grids).get_table(grids, target)
+        target_distances = self.distances[:, grids.get_index(*target)]
+        distances = self.distances[np.isfinite(target_distances)]
+        target_distances = target_distances[np.isfinite(target_distances)]
+        table = np.zeros(grids.map_size ** 3)
+        epsilon = LandmarkHeuristic.EPSILON
+        for target_distance, distance in zip(target_distances.astype(np.float64), distances):
+            distance = distance.astype(np.float64)
+            # below |distance - target_distance| - EPSILON * (distance + target_distance), inf stays inf
+            bound = (1.0 - epsilon) * np.abs(distance - target_distance) - 2.0 * epsilon * target_distance
+            np.maximum(table, np.where(np.isfinite(bound), bound, 0.0), out=table)
+        return table.reshape(grids.obstacle_map.shape)
+
+    def save(self, file_path: str) -> None:
+        np.savez_compressed(file_path, landmarks=self.landmarks, distances=self.distances,
+                            fingerprint=np.array(self.fingerprint))
+        return
+
+    @classmethod
+    def load(cls, file_path: str, grids: Grids3D) -> Optional["LandmarkHeuristic"]:
+        """
+        Returns:
+            Optional[LandmarkHeuristic]: None if the file is missing or was built for another obstacle map
+        """
+        if not os.path.isfile(file_path):
+            return None
+        fingerprint = cls.get_fingerprint(grids)
+        with np.load(file_path) as data:
+            if str(data["fingerprint"]) != fingerprint:
+                return None
+            landmarks, distances = data["landmarks"], data["distances"]
+        if distances.shape[1:] != (grids.map_size ** 3,):
+            return None
+        return LandmarkHeuristic(landmarks, distances.astype(np.float32, copy=False), fingerprint, grids.version)
+
+    @classmethod
+    def load_or_build(cls, grids: Grids3D, file_path: str) -> "LandmarkHeuristic":
+        """
+        description:
+            load the landmark distances saved next to the grid map or build and save them,
+            the heuristic is cached on the grids
+        """
+        landmark_heuristic = cls.load(file_path, grids)
+        if landmark_heuristic is None:
+            landmark_heuristic = cls.build(grids)
+            landmark_heuristic.save(file_path)
+        grids.cache[cls.CACHE_KEY] = landmark_heuristic
+        return landmark_heuristic
@@ -0,0 +1,212 @@
+import os
+import hashlib
+from typing import List, Tuple, Optional
+import numpy as np
+
+from src.grids.grids3d import Grids3D
+
+
+class JumpTable:
+    """
+    description:
+        JPS+ style preprocessing of the obstacle map.
+        for each voxel and each of the 26 directions, distances[d, i, j, k] is
+            n > 0: the n-th voxel in the direction is the next jump point
+            n <= 0: -n free voxels are left before a wall or an obstacle
+        a voxel is a jump point of an orthogonal direction if it has a forced neighbor
+        (same rule as JumpPointSearch.has_forced_neighbor),
+        every free voxel is a jump point of a diagonal direction.
+    """
+    CACHE_KEY: str = "jump_table"
+    ORTHOGONAL_DIRECTIONS: List[Tuple[int, int, int]] = \
+        [(1, 0, 0), (0, 1, 0), (0, 0, 1), (-1, 0, 0), (0, -1, 0), (0, 0, -1)]
+    DIRECTIONS: List[Tuple[int, int, int]] = ORTHOGONAL_DIRECTIONS + \
+        [(i, j, k) for i in range(-1, 2) for j in range(-1, 2) for k in range(-1, 2)
+            if abs(i) + abs(j) + abs(k) >= 2]
+    # voxels changed more than this are rebuilt instead of updated
+    MAX_UPDATE_CHANGES: int = 64
+
+    def __init__(self, distances: np.ndarray, fingerprint: str, version: int) -> None:
+        self.distances: np.ndarray = np.ascontiguousarray(distances, dtype=np.int16)
+        self.fingerprint: str = fingerprint
+        self.version: int = version
+        # flat views for fast element access in the search loop
+        self.flat_distances: List[memoryview] = \
+            [memoryview(self.distances[d].reshape(-1)) for d in range(len(JumpTable.DIRECTIONS))]
+
+    @classmethod
+    def get_fingerprint(cls, grids: Grids3D) -> str:
+        return hashlib.sha1(np.ascontiguousarray(grids.obstacle_map).tobytes()).hexdigest()
+
+    @classmethod
+    def get_file_path(cls, grids_np_file: str) -> str:
+        """
+        Args:
+            grids_np_file (str): .npy grid map file
+        Returns:
+            str: jump table file next to the grid map
+        """
+        root, _ = os.path.splitext(grids_np_file)
+        return root + ".jump_table.npz"
+
+    @classmethod
+    def get_jump_table(cls, grids: Grids3D) -> "JumpTable":
+        """
+        description:
+            jump table of the current obstacle map,
+            cached on the grids and updated for recorded obstacle changes
+        """
+        jump_table: Optional[JumpTable] = grids.cache.get(cls.CACHE_KEY)
+        if jump_table is not None and jump_table.version == grids.version:
+            return jump_table
+
+        changes = grids.get_obstacle_changes(jump_table.version) if jump_table is not None else None
+        if changes is not None and len(changes) <= cls.MAX_UPDATE_CHANGES:
+            jump_table.update(grids, changes)
+        else:
+            jump_table = cls.build(grids)
+        grids.cache[cls.CACHE_KEY] = jump_table
+        return jump_table
+
+    @classmethod
+    def build(cls, grids: Grids3D) -> "JumpTable":
+        map_size = grids.map_size
+        obstacle_map = grids.obstacle_map != 0
+        distances = np.zeros((len(cls.DIRECTIONS), map_size, map_size, map_size), dtype=np.int16)
+        for d, direction in enumerate(cls.DIRECTIONS):
+            if d < len(cls.ORTHOGONAL_DIRECTIONS):
+                distances[d] = cls.get_orthogonal_distances(obstacle_map, direction)
+            else:
+                distances[d] = cls.get_diagonal_distances(obstacle_map, direction)
+        return JumpTable(distances, cls.get_fingerprint(grids), grids.version)
+
+    @classmethod
+    def get_orthogonal_distances(cls, obstacle_map: np.ndarray, direction: Tuple[int, int, int]) -> np.ndarray:
+        axis = [i for i in range(3) if direction[i] != 0][0]
+        sign = direction[axis]
+        # move the scan axis to the front and scan in +direction
+        blocked = np.moveaxis(obstacle_map, axis, 0)
+        if sign < 0:
+            blocked = blocked[::-1]
+        forced = cls.get_forced_neighbor_map(blocked)
+
+        line_size = blocked.shape[0]
+        distances = np.zeros(blocked.shape, dtype=np.int16)
+        # the last voxel faces the map border
+        for s in range(line_size - 2, -1, -1):
+            nxt_distances = distances[s + 1]
+            distances[s] = np.where(blocked[s + 1], 0,
+                            np.where(forced[s + 1], 1,
+                            np.where(nxt_distances > 0, nxt_distances + 1, nxt_distances - 1)))
+        if sign < 0:
+            distances = distances[::-1]
+        return np.moveaxis(distances, 0, axis)
+
+    @classmethod
+    def get_forced_neighbor_map(cls, blocked: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            blocked (np.ndarray): obstacle map, scan direction is +axis 0
+        Returns:
+            np.ndarray: voxels with a side neighbor that is blocked while the voxel
+                after the side neighbor is free
+        """
+        # side voxel is blocked and the voxel after it is free
+        blocked_before_free = np.zeros(blocked.shape, dtype=bool)
+        blocked_before_free[:-1] = blocked[:-1] & ~blocked[1:]
+
+        forced = np.zeros(blocked.shape, dtype=bool)
+        forced[:, :-1, :] |= blocked_before_free[:, 1:, :]
+        forced[:, 1:, :] |= blocked_before_free[:, :-1, :]
+        forced[:, :, :-1] |= blocked_before_free[:, :, 1:]
+        forced[:, :, 1:] |= blocked_before_free[:, :, :-1]
+        return forced
+
+    @classmethod
+    def get_diagonal_distances(cls, obstacle_map: np.ndarray, direction: Tuple[int, int, int]) -> np.ndarray:
+        map_size = obstacle_map.shape[0]
+        distances = np.zeros(obstacle_map.shape, dtype=np.int16)
+        src = tuple(slice(max(0, -d), map_size - max(0, d)) for d in direction)
+        dst = tuple(slice(max(0, d), map_size - max(0, -d)) for d in direction)
+        distances[src] = ~obstacle_map[dst]
+        return distances
+
+    def update(self, grids: Grids3D, changes: List[Tuple[int, int, int]]) -> None:
+        """
+        description:
+            recompute only the lines through the changed voxels,
+            forced neighbors depend on the 3 x 3 lines around a voxel
+        """
+        map_size = grids.map_size
+        obstacle_map = grids.obstacle_map != 0
+        for d, direction in enumerate(JumpTable.ORTHOGONAL_DIRECTIONS):
+            axis = [i for i in range(3) if direction[i] != 0][0]
+            other_axes = [a for a in range(3) if a != axis]
+            lines = set()
+            for ijk in changes:
+                for da in range(-1, 2):
+                    for db in range(-1, 2):
+                        a, b = ijk[other_axes[0]] + da, ijk[other_axes[1]] + db
+                        if 0 <= a < map_size and 0 <= b < map_size:
+                            lines.add((a, b))
+            if not lines:
+                continue
+            # one more line on each side is enough to find forced neighbors
+            line_a = np.array([a for a, _ in lines])
+            line_b = np.array([b for _, b in lines])
+            a_min, a_max = max(0, int(line_a.min()) - 1), min(map_size, int(line_a.max()) + 2)
+            b_min, b_max = max(0, int(line_b.min()) - 1), min(map_size, int(line_b.max()) + 2)
+            index = [slice(None)] * 3
+            index[other_axes[0]] = slice(a_min, a_max)
+            index[other_axes[1]] = slice(b_min, b_max)
+            block = JumpTable.get_orthogonal_distances(obstacle_map[tuple(index)], direction)
+            
+            block = np.moveaxis(block, axis, -1)
+            distances = np.moveaxis(self.distances[d], axis, -1)
+            distances[line_a, line_b] = block[line_a - a_min, line_b - b_min]
+
+        for d in range(len(JumpTable.ORTHOGONAL_DIRECTIONS), len(JumpTable.DIRECTIONS)):
+            direction = JumpTable.DIRECTIONS[d]
+            for i, j, k in changes:
+                src_i, src_j, src_k = i - direction[0], j - direction[1], k - direction[2]
+                if 0 <= src_i < map_size and 0 <= src_j < map_size and 0 <= src_k < map_size:
+                    self.distances[d, src_i, src_j, src_k] = 0 if obstacle_map[i, j, k] else 1
+
+        self.fingerprint = JumpTable.get_fingerprint(grids)
+        self.version = grids.version
+        return
+
+    def save(self, file_path: str) -> None:
+        np.savez_compressed(file_path, distances=self.distances, fingerprint=np.array(self.fingerprint))
+        return
+
+    @classmethod
+    def load(cls, file_path: str, grids: Grids3D) -> Optional["JumpTable"]:
+        """
+        Returns:
+            Optional[JumpTable]: None if the file is missing or was built for another obstacle map
+        """
+        if not os.path.isfile(file_path):
+            return None
+        fingerprint = cls.get_fingerprint(grids)
+        with np.load(file_path) as data:
+            if str(data["fingerprint"]) != fingerprint:
+                return None
+            distances = data["distances"]
+        if distances.shape != (len(cls.DIRECTIONS),) + grids.obstacle_map.shape:
+            return None
+        return JumpTable(distances, fingerprint, grids.version)
+
+    @classmethod
+    def load_or_build(cls, grids: Grids3D, file_path: str) -> "JumpTable":
+        """
+        description:
+            load the jump table saved next to the grid map or build and save it,
+            the table is cached on the grids for JumpPointSearchPlus
+        """
+        jump_table = cls.load(file_path, grids)
+        if jump_table is None:
+            jump_table = cls.build(grids)
+            jump_table.save(file_path)
+        grids.cache[cls.CACHE_KEY] = jump_table
+        return jump_table
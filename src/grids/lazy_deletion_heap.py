@@ -0,0 +1,204 @@
+import heapq
+from array import array
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+class LazyDeletionHeap:
+    """
+    description:
+        priority queue of flat indices with decrease-key by lazy deletion, every index
+        is queued at most once. the entries (key, order, index) are in a binary heap list
+        sifted by heapq, the key and the order of the live entry of every queued index
+        are kept in arrays. a changed key pushes a new entry and outdates the old one
+        instead of moving it, outdated entries are dropped when they reach the top and
+        the heap is rebuilt once they outnumber the queued indices, so pop() only returns
+        queued indices with their current key. the heap holds at most 2 * queued + REBUILD_SLACK
+        entries. (a heap tracking the entry positions sifts in python, about 3 times slower
+        than heapq in CPython.) keys are floats in an array('d'), or with has_tuple_keys
+        tuples compared in order (LPA* keys) in a dict. ties are popped in push order.
+    """
+    # outdated entries kept before the heap is rebuilt, on top of the queued number
+    REBUILD_SLACK: int = 64
+
+    def __init__(self, size: int, has_tuple_keys: bool = False) -> None:
+        self.size: int = size
+        self.entries: List[Tuple[Any, int, int]] = []
+        # key of every queued index, indexed like orders
+        self.has_tuple_keys: bool = has_tuple_keys
+        self.keys: Union[array, Dict[int, Tuple[float, ...]]] = {} if has_tuple_keys else array('d', [0.0]) * size
+        # order of the live entry of every index, -1 if the index is not queued
+        self.orders: array = array('q', [-1]) * size
+        self.order_counter: int = 0
+        self.queued_number: int = 0
+        self.outdated_number: int = 0
+        # indices entering the queue and changed keys of queued indices, counted over the life of the heap
+        self.push_number: int = 0
+        self.decrease_key_number: int = 0
+        # indices given to push() and push_all() while it is a list, see collect()
+        self.collected_indices: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return self.queued_number
+
+    def contains(self, index: int) -> bool:
+        return self.orders[index] != -1
+
+    def get_key(self, index: int) -> Any:
+        """
+        Returns:
+            Any: key of a queued index, None if it is not queued
+        """
+        if self.orders[index] == -1:
+            return None
+        return self.keys[index]
+
+    def push(self, index: int, key: Any) -> bool:
+        """
+        description:
+            queue the index or decrease its key
+        Returns:
+            bool: False if the index is queued with a key not greater than key
+        """
+        orders = self.orders
+        if orders[index] != -1:
+            if key >= self.keys[index]:
+                return False
+            self.decrease_key_number += 1
+            self.outdated_number += 1
+            orders[index] = -1
+            if self.outdated_number > self.queued_number + self.REBUILD_SLACK:
+                self.rebuild()
+        else:
+            self.push_number += 1
+            self.queued_number += 1
+        order = self.order_counter
+        self.order_counter = order + 1
+        orders[index] = order
+        self.keys[index] = key
+        heapq.heappush(self.entries, (key, order, index))
+        if self.collected_indices is not None:
+            self.collected_indices.append(index)
+        return True
+
+    def push_all(self, indices: List[int], keys: List[Any]) -> None:
+        """
+        description:
+            push() of every index with its key, one call for the successors of an expansion
+        """
+        orders, queued_keys, entries = self.orders, self.keys, self.entries
+        heappush = heapq.heappush
+        order = self.order_counter
+        push_number = decrease_key_number = 0
+        for index, key in zip(indices, keys):
+            if orders[index] != -1:
+                if key >= queued_keys[index]:
+                    continue
+                decrease_key_number += 1
+            else:
+                push_number += 1
+            orders[index] = order
+            queued_keys[index] = key
+            heappush(entries, (key, order, index))
+            order += 1
+        self.order_counter = order
+        self.push_number += push_number
+        self.queued_number += push_number
+        self.decrease_key_number += decrease_key_number
+        self.outdated_number += decrease_key_number
+        if self.collected_indices is not None:
+            self.collected_indices.extend(indices)
+        if self.outdated_number > self.queued_number + self.REBUILD_SLACK:
+            self.rebuild()
+        return
+
+    def update(self, index: int, key: Any) -> None:
+        """
+        description:
+            queue the index or change its key, the key may also increase
+        """
+        if self.orders[index] != -1:
+            if key == self.keys[index]:
+                return
+            # outdated like a removed index and queued again
+            self.remove(index)
+            self.decrease_key_number += 1
+            self.push_number -= 1
+        self.push(index, key)
+        return
+
+    def remove(self, index: int) -> None:
+        if self.orders[index] == -1:
+            return
+        self.orders[index] = -1
+        self.queued_number -= 1
+        self.outdated_number += 1
+        return
+
+    def pop(self) -> int:
+        """
+        Returns:
+            int: queued index with the smallest key, IndexError if the queue is empty
+        """
+        entries, orders = self.entries, self.orders
+        heappop = heapq.heappop
+        while True:
+            _, order, index = heappop(entries)
+            if orders[index] == order:
+                orders[index] = -1
+                self.queued_number -= 1
+                return index
+            self.outdated_number -= 1
+
+    def peek(self) -> Tuple[Any, int]:
+        """
+        Returns:
+            Tuple[Any, int]: smallest key and its index, IndexError if the queue is empty
+        """
+        entries, orders = self.entries, self.orders
+        while True:
+            key, order, index = entries[0]
+            if orders[index] == order:
+                return key, index
+            heapq.heappop(entries)
+            self.outdated_number -= 1
+
+    def peek_key(self) -> Any:
+        return self.peek()[0]
+
+    def get_indices(self) -> List[int]:
+        orders = self.orders
+        return [index for _, order, index in self.entries if orders[index] == order]
+
+    def rebuild(self) -> None:
+        orders = self.orders
+        entries = self.entries
+        entries[:] = [entry for entry in entries if orders[entry[2]] == entry[1]]
+        heapq.heapify(entries)
+        self.outdated_number = 0
+        return
+
+    def clear(self) -> None:
+        # O(entries), the arrays of indices never queued are untouched
+        orders = self.orders
+        for _, _, index in self.entries:
+            orders[index] = -1
+        self.entries.clear()
+        if self.has_tuple_keys:
+            self.keys.clear()
+        self.queued_number = 0
+        self.outdated_number = 0
+        return
+
+    def collect(self) -> None:
+        """
+        description:
+            start recording the pushed indices in collected_indices,
+            used to look at the successors of one expansion
+        """
+        self.collected_indices = []
+        return
+
+    def finish_collecting(self) -> List[int]:
+        collected_indices = self.collected_indices
+        self.collected_indices = None
+        return collected_indices
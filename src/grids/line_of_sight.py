@@ -0,0 +1,152 @@
+from typing import Dict, Tuple
+import numpy as np
+
+from src.grids.grids3d import Grids3D
+
+
+class LineOfSight:
+    """
+    description:
+        line of sight checks on the obstacle map.
+        voxels of a 3D Bresenham line (same voxels as the incremental version,
+        start voxel excluded) are computed in closed form
+            coord(t) = start + sign * floor((2 * d * t + n) / (2 * n)), t = 1 .. n
+        for a line or a batch of lines and tested against the obstacle map in one gather.
+        results are memoized on (src index, dst index) for the current grids version.
+    """
+    CACHE_KEY: str = "line_of_sight"
+    MAX_MEMO_SIZE: int = 1 << 20
+    # lines up to this size are checked without numpy, the array overhead dominates them
+    SHORT_LINE_SIZE: int = 16
+
+    def __init__(self, grids: Grids3D) -> None:
+        self.grids: Grids3D = grids
+        self.version: int = grids.version
+        self.memo: Dict[Tuple[int, int], bool] = {}
+        self.flat_obstacle_map: np.ndarray = grids.obstacle_map.reshape(-1)
+        # counters over the lifetime of the object, read by the search stats
+        self.call_number: int = 0
+        self.memo_hit_number: int = 0
+        self.visible_number: int = 0
+
+    @classmethod
+    def get_line_of_sight(cls, grids: Grids3D) -> "LineOfSight":
+        line_of_sight = grids.cache.get(cls.CACHE_KEY)
+        if line_of_sight is None:
+            line_of_sight = LineOfSight(grids)
+            grids.cache[cls.CACHE_KEY] = line_of_sight
+        return line_of_sight
+
+    def get_counters(self) -> Tuple[int, int, int]:
+        """
+        Returns:
+            Tuple[int, int, int]: checked lines, lines answered by the memo and lines found free
+        """
+        return self.call_number, self.memo_hit_number, self.visible_number
+    
+    def check_version(self) -> None:
+        if self.version != self.grids.version:
+            self.memo.clear()
+            self.version = self.grids.version
+            self.flat_obstacle_map = self.grids.obstacle_map.reshape(-1)
+        return
+
+    @classmethod
+    def get_line_indices(cls, src: Tuple[int, int, int], dst: Tuple[int, int, int]) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: (n, 3) voxel indices from the voxel after src to dst
+        """
+        src_arr = np.array(src, dtype=np.int64)
+        delta = np.array(dst, dtype=np.int64) - src_arr
+        sign = np.where(delta > 0, 1, -1)
+        delta = np.abs(delta)
+        n = int(delta.max())
+        if n == 0:
+            return np.zeros((0, 3), dtype=np.int64)
+        t = np.arange(1, n + 1, dtype=np.int64)[:, None]
+        return src_arr + sign * ((2 * delta * t + n) // (2 * n))
+
+    def has_line_of_sight(self, src: Tuple[int, int, int], dst: Tuple[int, int, int]) -> bool:
+        self.check_version()
+        grids = self.grids
+        key = (grids.get_index(*src), grids.get_index(*dst))
+        visible = self.memo.get(key)
+        self.call_number += 1
+        if visible is not None:
+            self.memo_hit_number += 1
+            self.visible_number += visible
+            return visible
+
+        di, dj, dk = dst[0] - src[0], dst[1] - src[1], dst[2] - src[2]
+        n = max(abs(di), abs(dj), abs(dk))
+        if n <= LineOfSight.SHORT_LINE_SIZE:
+            visible = self.has_short_line_of_sight(src, di, dj, dk, n)
+        else:
+            indices = LineOfSight.get_line_indices(src, dst)
+            map_size = grids.map_size
+            flat_indices = (indices[:, 0] * map_size + indices[:, 1]) * map_size + indices[:, 2]
+            visible = not self.flat_obstacle_map[flat_indices].any()
+        self.store(key, visible)
+        self.visible_number += visible
+        return visible
+
+    def has_short_line_of_sight(self, src: Tuple[int, int, int], di: int, dj: int, dk: int, n: int) -> bool:
+        # same closed form, element by element with early exit
+        obstacle_map = self.grids.obstacle_map
+        si, sj, sk = (1 if di > 0 else -1), (1 if dj > 0 else -1), (1 if dk > 0 else -1)
+        di, dj, dk = abs(di), abs(dj), abs(dk)
+        n2 = 2 * n
+        for t in range(1, n + 1):
+            if obstacle_map.item(src[0] + si * ((2 * di * t + n) // n2),
+                                 src[1] + sj * ((2 * dj * t + n) // n2),
+                                 src[2] + sk * ((2 * dk * t + n) // n2)):
+                return False
+        return True
+
+    def has_lines_of_sight(self, srcs: np.ndarray, dsts: np.ndarray, memoize: bool = True) -> np.ndarray:
+        """
+        Args:
+            srcs (np.ndarray): (N, 3) start voxel indices
+            dsts (np.ndarray): (N, 3) end voxel indices
+            memoize (bool): store the results, False leaves it to the caller (store)
+        Returns:
+            np.ndarray: (N,) bool, True if the line from srcs[n] to dsts[n] is free
+        """
+        self.check_version()
+        srcs = np.asarray(srcs, dtype=np.int64).reshape(-1, 3)
+        dsts = np.asarray(dsts, dtype=np.int64).reshape(-1, 3)
+        if len(srcs) == 0:
+            return np.zeros(0, dtype=bool)
+        map_size = self.grids.map_size
+
+        delta = dsts - srcs
+        sign = np.where(delta > 0, 1, -1)
+        delta = np.abs(delta)
+        n = delta.max(axis=1)
+        safe_n = np.maximum(n, 1)
+        # (N, L) steps, padded to the longest line
+        t = np.arange(1, max(int(n.max()), 1) + 1, dtype=np.int64)[None, :]
+        valid = t <= n[:, None]
+        coords = srcs[:, None, :] + sign[:, None, :] * \
+            ((2 * delta[:, None, :] * t[:, :, None] + safe_n[:, None, None]) // (2 * safe_n[:, None, None]))
+        coords = np.where(valid[:, :, None], coords, srcs[:, None, :])
+        flat_indices = (coords[:, :, 0] * map_size + coords[:, :, 1]) * map_size + coords[:, :, 2]
+        blocked = self.flat_obstacle_map[flat_indices].astype(bool) & valid
+        visible = ~blocked.any(axis=1)
+        self.call_number += len(visible)
+        self.visible_number += int(np.count_nonzero(visible))
+
+        if not memoize:
+            return visible
+        src_indices = (srcs[:, 0] * map_size + srcs[:, 1]) * map_size + srcs[:, 2]
+        dst_indices = (dsts[:, 0] * map_size + dsts[:, 1]) * map_size + dsts[:, 2]
+        for src_index, dst_index, is_visible in zip(src_indices.tolist(), dst_indices.tolist(), visible.tolist()):
+            self.store((src_index, dst_index), is_visible)
+        return visible
+
+    def store(self, key: Tuple[int, int], visible: bool) -> None:
+        if len(self.memo) >= LineOfSight.MAX_MEMO_SIZE:
+            self.memo.clear()
+        self.memo[key] = visible
+        return
@@ -0,0 +1,139 @@
+from typing import List, Tuple, Optional
+import numpy as np
+from scipy import ndimage
+
+from src.grids.grids3d import Grids3D
+
+
+class ReachabilityIndex:
+    """
+    description:
+        connected components of the free voxels with the 26-neighborhood
+        every pathfinder moves in. components[i, j, k] is the component id of a free voxel,
+        0 for an obstacle. two voxels are reachable from each other only if
+        they share a component, so an impossible route is rejected without a search.
+        freed voxels merge the components around them, a blocked voxel relabels its component
+        only if its free neighbors are not connected inside the 3 x 3 x 3 block around it.
+    """
+    CACHE_KEY: str = "reachability"
+    STRUCTURE: np.ndarray = np.ones((3, 3, 3), dtype=bool)
+    # voxels changed more than this are rebuilt instead of updated
+    MAX_UPDATE_CHANGES: int = 256
+
+    def __init__(self, components: np.ndarray, component_number: int, version: int) -> None:
+        self.components: np.ndarray = components
+        # largest component id in use, ids of merged components are not reused
+        self.component_number: int = component_number
+        self.version: int = version
+
+    @classmethod
+    def get_reachability_index(cls, grids: Grids3D) -> "ReachabilityIndex":
+        """
+        description:
+            reachability index of the current obstacle map,
+            cached on the grids and updated for recorded obstacle changes
+        """
+        reachability_index: Optional[ReachabilityIndex] = grids.cache.get(cls.CACHE_KEY)
+        if reachability_index is not None and reachability_index.version == grids.version:
+            return reachability_index
+
+        changes = grids.get_obstacle_changes(reachability_index.version) if reachability_index is not None else None
+        if changes is not None and len(changes) <= cls.MAX_UPDATE_CHANGES:
+            reachability_index.update(grids, changes)
+        else:
+            reachability_index = cls.build(grids)
+        grids.cache[cls.CACHE_KEY] = reachability_index
+        return reachability_index
+
+    @classmethod
+    def build(cls, grids: Grids3D) -> "ReachabilityIndex":
+        components, component_number = ndimage.label(grids.obstacle_map == 0, structure=cls.STRUCTURE)
+        return ReachabilityIndex(components.astype(np.int32), int(component_number), grids.version)
+
+    def get_component(self, i: int, j: int, k: int) -> int:
+        return int(self.components[i, j, k])
+
+    def get_component_size(self, component: int) -> int:
+        if component == 0:
+            return 0
+        return int(np.count_nonzero(self.components == component))
+
+    def get_start_components(self, i: int, j: int, k: int) -> List[int]:
+        """
+        Returns:
+            List[int]: components a search can enter from (i, j, k),
+                the free neighbors are used if the voxel itself is an obstacle
+        """
+        component = self.get_component(i, j, k)
+        if component != 0:
+            return [component]
+        block = self.get_block(i, j, k)
+        return [int(c) for c in np.unique(block) if c != 0]
+
+    def is_reachable(self, src: Tuple[int, int, int], dst: Tuple[int, int, int]) -> bool:
+        if tuple(src) == tuple(dst):
+            return True
+        dst_component = self.get_component(*dst)
+        if dst_component == 0:
+            return False
+        return dst_component in self.get_start_components(*src)
+
+    def get_block(self, i: int, j: int, k: int) -> np.ndarray:
+        # 3 x 3 x 3 block around (i, j, k) clipped to the map
+        return self.components[max(0, i - 1):i + 2, max(0, j - 1):j + 2, max(0, k - 1):k + 2]
+
+    def update(self, grids: Grids3D, changes: List[Tuple[int, int, int]]) -> None:
+        """
+        description:
+            blocked voxels are removed and split first, freed voxels are merged after,
+            so every step works on a consistent labelling
+        """
+        obstacle_map = grids.obstacle_map
+        components = self.components
+        split_components = set()
+        freed_voxels = []
+        for i, j, k in changes:
+            if obstacle_map[i, j, k] == 0:
+                freed_voxels.append((i, j, k))
+                continue
+            component = int(components[i, j, k])
+            if component == 0:
+                continue
+            components[i, j, k] = 0
+            # the component stays connected if the free neighbors are connected around the voxel
+            block = self.get_block(i, j, k)
+            _, block_component_number = ndimage.label(block != 0, structure=ReachabilityIndex.STRUCTURE)
+            if block_component_number > 1:
+                split_components.add(component)
+
+        for component in split_components:
+            self.split(component)
+        for i, j, k in freed_voxels:
+            if components[i, j, k] == 0:
+                self.merge(i, j, k)
+        self.version = grids.version
+        return
+
+    def merge(self, i: int, j: int, k: int) -> None:
+        neighbor_components = [int(c) for c in np.unique(self.get_block(i, j, k)) if c != 0]
+        if not neighbor_components:
+            self.component_number += 1
+            self.components[i, j, k] = self.component_number
+            return
+        component = min(neighbor_components)
+        self.components[i, j, k] = component
+        for other in neighbor_components:
+            if other != component:
+                self.components[self.components == other] = component
+        return
+
+    def split(self, component: int) -> None:
+        mask = self.components == component
+        if not mask.any():
+            return
+        labels, label_number = ndimage.label(mask, structure=ReachabilityIndex.STRUCTURE)
+        # the first part keeps the id, the others get new ids
+        other_parts = labels > 1
+        self.components[other_parts] = labels[other_parts] + (self.component_number - 1)
+        self.component_number += label_number - 1
+        return
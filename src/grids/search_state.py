@@ -0,0 +1,110 @@
+import threading
+from array import array
+from typing import List
+
+from src.grids.lazy_deletion_heap import LazyDeletionHeap
+
+
+class SearchState:
+    """
+    description:
+        per-query search state (g-cost, parent index, closed flag, open list)
+        over flat voxel indices.
+        an entry is valid only if its stamp equals the current generation,
+        so begin() resets the whole state in O(1) instead of O(map_size^3)
+    """
+    MAX_GENERATION: int = 2 ** 32 - 1
+
+    def __init__(self, size: int) -> None:
+        self.size: int = size
+        self.generation: int = 0
+        self.g: array = array('d', [0.0]) * size
+        self.parent: array = array('q', [-1]) * size
+        self.visited_stamp: array = array('I', [0]) * size
+        self.closed_stamp: array = array('I', [0]) * size
+        # cleared by the algorithm when a search begins
+        self.open_list: LazyDeletionHeap = LazyDeletionHeap(size)
+
+    def begin(self) -> None:
+        self.generation += 1
+        if self.generation == SearchState.MAX_GENERATION:
+            # stamps wrap around, clear them once every 2^32 - 1 searches
+            self.visited_stamp = array('I', [0]) * self.size
+            self.closed_stamp = array('I', [0]) * self.size
+            self.generation = 1
+        return
+
+    def is_visited(self, index: int) -> bool:
+        return self.visited_stamp[index] == self.generation
+
+    def is_closed(self, index: int) -> bool:
+        return self.closed_stamp[index] == self.generation
+
+    def get_g(self, index: int) -> float:
+        if self.visited_stamp[index] != self.generation:
+            return float('inf')
+        return self.g[index]
+
+    def get_parent(self, index: int) -> int:
+        if self.visited_stamp[index] != self.generation:
+            return -1
+        return self.parent[index]
+
+    def set_g(self, index: int, g: float, parent: int) -> None:
+        self.visited_stamp[index] = self.generation
+        self.g[index] = g
+        self.parent[index] = parent
+        return
+
+    def set_parent(self, index: int, parent: int) -> None:
+        # an entry reached without a g-cost (cells scanned by a jump) has no path cost of its own
+        if self.visited_stamp[index] != self.generation:
+            self.visited_stamp[index] = self.generation
+            self.g[index] = float('inf')
+        self.parent[index] = parent
+        return
+
+    def close(self, index: int) -> None:
+        self.closed_stamp[index] = self.generation
+        return
+
+    def get_path_indices(self, goal_index: int) -> List[int]:
+        """
+        Args:
+            goal_index (int): flat index of the last node
+        Returns:
+            List[int]: flat indices from the goal to the root of the search tree,
+                empty if goal_index is not visited in the current generation
+        """
+        path_indices: List[int] = []
+        index = goal_index
+        while index != -1 and self.visited_stamp[index] == self.generation:
+            path_indices.append(index)
+            if len(path_indices) > self.size:
+                raise RuntimeError("SearchState: parent indices make a cycle")
+            index = self.parent[index]
+        return path_indices
+
+
+class SearchStatePool:
+    """
+    description:
+        search states are reused between queries on the same grids.
+        every running query owns its own state, so several searches
+        can share the grids without overwriting each other
+    """
+    def __init__(self) -> None:
+        self.free_states: List[SearchState] = []
+        self.lock = threading.Lock()
+
+    def acquire(self, size: int) -> SearchState:
+        with self.lock:
+            for i in range(len(self.free_states) - 1, -1, -1):
+                if self.free_states[i].size == size:
+                    return self.free_states.pop(i)
+        return SearchState(size)
+
+    def release(self, state: SearchState) -> None:
+        with self.lock:
+            self.free_states.append(state)
+        return
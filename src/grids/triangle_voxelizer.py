@@ -0,0 +1,159 @@
+from typing import Tuple
+import numpy as np
+from scipy import ndimage
+
+from src.grids.grids3d import Grids3D
+
+
+class TriangleVoxelizer:
+    """
+    description:
+        exact surface voxelization of a triangle mesh. a voxel is marked if it overlaps
+        a triangle by the separating axis test of triangle and box (Akenine-Moller):
+        the 3 box normals, the triangle normal and the 9 cross products of the triangle
+        edges with the box axes. the candidates of a triangle are the voxels of its bounding box,
+        triangles longer than MAX_EXTENT voxels are split into 4 at their edge midpoints first,
+        so the candidates grow with the surface voxels instead of the bounding box volume.
+        the (triangle, voxel) pairs are tested in vectorized chunks of CHUNK_SIZE.
+        voxels touched only at a face, an edge or a corner are marked too.
+        the surface of a closed mesh separates its interior from the outside for the
+        26-neighborhood, get_solid_map fills that interior.
+    """
+    MAX_EXTENT: float = 4.0
+    CHUNK_SIZE: int = 1 << 20
+    # free voxels are connected like the pathfinders move
+    STRUCTURE: np.ndarray = np.ones((3, 3, 3), dtype=bool)
+
+    @classmethod
+    def get_surface_map(cls, grids: Grids3D, vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            grids (Grids3D): target grids
+            vertices (np.ndarray): (V, 3) x, y, z coordinates
+            faces (np.ndarray): (F, 3) vertex indices of the triangles
+        Returns:
+            np.ndarray: (map_size, map_size, map_size) bool, True for the voxels the triangles overlap
+        """
+        map_size = grids.map_size
+        surface_map = np.zeros((map_size,) * 3, dtype=bool)
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        if len(faces) == 0:
+            return surface_map
+        # voxel coordinates, voxel (i, j, k) is the unit cube from (i, j, k)
+        corner_min = np.array(grids.corner_min.Coord())
+        triangles = (vertices[faces] - corner_min) / grids.node_gap
+        triangles = cls.subdivide(cls.get_inner_triangles(triangles, map_size))
+
+        lower = np.clip(np.floor(triangles.min(axis=1)).astype(np.int64), 0, map_size - 1)
+        upper = np.clip(np.floor(triangles.max(axis=1)).astype(np.int64), 0, map_size - 1)
+        dims = upper - lower + 1
+        counts = dims.prod(axis=1)
+        ends = np.cumsum(counts)
+        begin = 0
+        while begin < len(triangles):
+            # triangles of one chunk, at least one
+            offset = ends[begin] - counts[begin]
+            end = max(int(np.searchsorted(ends, offset + cls.CHUNK_SIZE, side="right")), begin + 1)
+            ijks, triangle_ids = cls.get_candidates(lower[begin:end], dims[begin:end], counts[begin:end])
+            is_overlapped = cls.get_overlap(triangles[begin:end][triangle_ids] - (ijks + 0.5)[:, None, :])
+            ijks = ijks[is_overlapped]
+            surface_map[ijks[:, 0], ijks[:, 1], ijks[:, 2]] = True
+            begin = end
+        return surface_map
+
+    @classmethod
+    def get_solid_map(cls, surface_map: np.ndarray) -> np.ndarray:
+        """
+        description:
+            the surface with the voxels it encloses. free voxels the 26-neighborhood
+            can not lead out of the bounding box of the surface are interior,
+            a space open to the map border is not, the voxels past the border are free
+        Args:
+            surface_map (np.ndarray): (map_size, map_size, map_size) bool surface of a closed shape
+        Returns:
+            np.ndarray: (map_size, map_size, map_size) bool, the surface and its interior
+        """
+        solid_map = surface_map.copy()
+        occupied = np.nonzero(surface_map)
+        if len(occupied[0]) == 0:
+            return solid_map
+        # bounding box of the surface, the interior is inside it
+        box = tuple(slice(int(indices.min()), int(indices.max()) + 1) for indices in occupied)
+        padded_box_map = np.pad(surface_map[box], 1, constant_values=False)
+        solid_map[box] = ndimage.binary_fill_holes(padded_box_map, structure=cls.STRUCTURE)[1:-1, 1:-1, 1:-1]
+        return solid_map
+
+    @classmethod
+    def get_inner_triangles(cls, triangles: np.ndarray, map_size: int) -> np.ndarray:
+        # triangles whose bounding box meets the map
+        is_inner = np.all((triangles.max(axis=1) >= 0.0) & (triangles.min(axis=1) <= map_size), axis=1)
+        return triangles[is_inner]
+
+    @classmethod
+    def subdivide(cls, triangles: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            triangles (np.ndarray): (T, 3, 3) vertices in voxel coordinates
+        Returns:
+            np.ndarray: triangles covering the same surface, none longer than MAX_EXTENT on an axis
+        """
+        done = []
+        while len(triangles) > 0:
+            extents = (triangles.max(axis=1) - triangles.min(axis=1)).max(axis=1)
+            is_large = extents > cls.MAX_EXTENT
+            done.append(triangles[~is_large])
+            large = triangles[is_large]
+            v0, v1, v2 = large[:, 0], large[:, 1], large[:, 2]
+            m01, m12, m20 = 0.5 * (v0 + v1), 0.5 * (v1 + v2), 0.5 * (v2 + v0)
+            triangles = np.concatenate([np.stack(vertices, axis=1) for vertices in
+                                        [(v0, m01, m20), (m01, v1, m12), (m20, m12, v2), (m01, m12, m20)]])
+        return np.concatenate(done)
+
+    @classmethod
+    def get_candidates(cls, lower: np.ndarray, dims: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (P, 3) voxels of the bounding boxes and (P,) their triangles
+        """
+        triangle_ids = np.repeat(np.arange(len(counts)), counts)
+        offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        dim_j, dim_k = dims[triangle_ids, 1], dims[triangle_ids, 2]
+        ij, dk = np.divmod(offsets, dim_k)
+        di, dj = np.divmod(ij, dim_j)
+        ijks = lower[triangle_ids] + np.stack([di, dj, dk], axis=1)
+        return ijks, triangle_ids
+
+    @classmethod
+    def get_overlap(cls, triangles: np.ndarray) -> np.ndarray:
+        """
+        description:
+            the axes are tested one after another on the pairs not yet separated
+        Args:
+            triangles (np.ndarray): (P, 3, 3) vertices relative to the center of the tested voxel
+        Returns:
+            np.ndarray: (P,) bool, True if the triangle overlaps the unit box at the origin
+        """
+        half = 0.5
+        # box normals
+        is_overlapped = np.all((triangles.min(axis=1) <= half) & (triangles.max(axis=1) >= -half), axis=1)
+        # triangle normal
+        v0, v1, v2 = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+        normal = np.cross(v1 - v0, v2 - v1)
+        is_overlapped &= np.abs(np.einsum("pd,pd->p", normal, v0)) <= half * np.abs(normal).sum(axis=1)
+        pair_ids = np.flatnonzero(is_overlapped)
+        triangles = triangles[pair_ids]
+        # edge (a, b) crossed with box normal d, both vertices of the edge have the same projection
+        for a, b, c in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+            for d in range(3):
+                x, y = (d + 1) % 3, (d + 2) % 3
+                edge_x = triangles[:, b, x] - triangles[:, a, x]
+                edge_y = triangles[:, b, y] - triangles[:, a, y]
+                pa = edge_y * triangles[:, a, x] - edge_x * triangles[:, a, y]
+                pc = edge_y * triangles[:, c, x] - edge_x * triangles[:, c, y]
+                radius = half * (np.abs(edge_x) + np.abs(edge_y))
+                is_kept = (np.minimum(pa, pc) <= radius) & (np.maximum(pa, pc) >= -radius)
+                pair_ids, triangles = pair_ids[is_kept], triangles[is_kept]
+        is_overlapped = np.zeros(len(is_overlapped), dtype=bool)
+        is_overlapped[pair_ids] = True
+        return is_overlapped
@@ -1,8 +1,10 @@
 from typing import List, Optional
+import numpy as np
 from OCC.Core.TopoDS import TopoDS_Shape
 
 from src.brep.brep_util import ShapeToMeshConvertor 
 from src.grids.grids3d import Grids3D   
+from src.grids.triangle_voxelizer import TriangleVoxelizer
 
 class CollisionChecker:
     @classmethod    
@@ -11,22 +13,9 @@ class CollisionChecker:
             print("CollisionChecker.check_collision_points_number: shape is None.")
             return None
         
-        gap: float = grids[0, 0, 0].gap
-        points_clouds: List[List[float]] = ShapeToMeshConvertor.convert_to_point_clouds(shape, number_of_points=points_number) 
-        collision_points: int = 0
-        for point in points_clouds:
-            i, j, k = point
-            i = int((i - grids.corner_min.X()) / gap)
-            j = int((j - grids.corner_min.Y()) / gap)  
-            k = int((k - grids.corner_min.Z()) / gap)
-            
-            if i < 0 or j < 0 or k < 0:
-                continue
-            if i >= grids.map_size or j >= grids.map_size or k >= grids.map_size:
-                continue    
-            if grids[i, j, k].is_obstacle:
-                collision_points += 1
-            
+        points_clouds: np.ndarray = ShapeToMeshConvertor.convert_to_point_clouds(shape, number_of_points=points_number) 
+        indices = GridsIndexer.get_inner_indices(grids, points_clouds)
+        collision_points: int = int(np.count_nonzero(grids.obstacle_map[indices]))
         return collision_points
     
     def check_collision(cls, grids: Grids3D, shape: TopoDS_Shape) -> bool:
@@ -34,40 +23,99 @@ class CollisionChecker:
             print("CollisionChecker.check_collision: shape is None.")
             return None
         
-        gap: float = grids[0, 0, 0].gap
-        points_clouds: List[List[float]] = ShapeToMeshConvertor.convert_to_point_clouds(shape) 
-        for point in points_clouds:
-            i, j, k = point
-            i = int((i - grids.corner_min.X()) / gap)
-            j = int((j - grids.corner_min.Y()) / gap)  
-            k = int((k - grids.corner_min.Z()) / gap)
-            
-            if i < 0 or j < 0 or k < 0:
-                continue
-            if i >= grids.map_size or j >= grids.map_size or k >= grids.map_size:
-                continue    
-            if grids[i, j, k].is_obstacle:
-                return True
-        return False    
+        points_clouds: np.ndarray = ShapeToMeshConvertor.convert_to_point_clouds(shape) 
+        indices = GridsIndexer.get_inner_indices(grids, points_clouds)
+        return bool(np.any(grids.obstacle_map[indices]))
+
+class Tessellation:
+    """
+    description:
+        triangle mesh of a shape, the input of the voxelization. face_solids[f] is -1 for the triangles
+        of the surface of the shape and the solid number for the triangles of the mesh of each solid,
+        which are added only for the interior fill and repeat triangles of the surface
+    """
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray, face_solids: np.ndarray) -> None:
+        # (V, 3) float64, (F, 3) int64, (F,) int32
+        self.vertices: np.ndarray = vertices
+        self.faces: np.ndarray = faces
+        self.face_solids: np.ndarray = face_solids
+
+    @classmethod
+    def from_shape(cls, shape: TopoDS_Shape, include_solids: bool = False) -> "Tessellation":
+        vertices, faces = ShapeToMeshConvertor.convert_to_triangle_mesh(shape)
+        vertices_list, faces_list = [vertices], [faces]
+        face_solids_list = [np.full(len(faces), -1, dtype=np.int32)]
+        if include_solids:
+            vertex_number = len(vertices)
+            for solid, (solid_vertices, solid_faces) in enumerate(ShapeToMeshConvertor.get_solid_triangle_meshes(shape)):
+                vertices_list.append(solid_vertices)
+                faces_list.append(solid_faces + vertex_number)
+                face_solids_list.append(np.full(len(solid_faces), solid, dtype=np.int32))
+                vertex_number += len(solid_vertices)
+        return Tessellation(np.concatenate(vertices_list), np.concatenate(faces_list), np.concatenate(face_solids_list))
+
+    @property
+    def solid_number(self) -> int:
+        return int(self.face_solids.max()) + 1 if len(self.face_solids) > 0 else 0
+
 
 class Voxelization:
     @classmethod    
-    def voxelize(cls, grids: Grids3D, shape: TopoDS_Shape) -> None:
+    def voxelize(cls, grids: Grids3D, shape: TopoDS_Shape, fill_interior: bool = False) -> None:
+        """
+        description:
+            marks every voxel the tessellated surface of the shape overlaps,
+            the triangles are rasterized by TriangleVoxelizer
+        Args:
+            fill_interior (bool): also mark the voxels enclosed by the surface of each solid of the shape.
+                solids are filled one by one, the free space an enclosure of several solids 
+                (the cabinet) surrounds stays free
+        """
         if shape is None:
             print("Voxelization.voxelize: shape is None.")
             return
         
-        gap: float = grids[0, 0, 0].gap
-        points_clouds: List[List[float]] = ShapeToMeshConvertor.convert_to_point_clouds(shape) 
-        for point in points_clouds:
-            i, j, k = point
-            i = int((i - grids.corner_min.X()) / gap)
-            j = int((j - grids.corner_min.Y()) / gap)  
-            k = int((k - grids.corner_min.Z()) / gap)
-            
-            if i < 0 or j < 0 or k < 0:
-                continue
-            if i >= grids.map_size or j >= grids.map_size or k >= grids.map_size:
-                continue    
-            grids[i, j, k].is_obstacle = True
+        tessellation = Tessellation.from_shape(shape, include_solids=fill_interior)
+        cls.voxelize_tessellation(grids, tessellation, fill_interior)
+        return
+    
+    @classmethod    
+    def voxelize_tessellation(cls, grids: Grids3D, tessellation: Tessellation, fill_interior: bool = False) -> None:
+        occupied_map = cls.get_occupied_map(grids, tessellation, fill_interior)
+        grids.obstacle_map[occupied_map] = 1
+        grids.update_obstacle_map()
         return
+    
+    @classmethod    
+    def get_occupied_map(cls, grids: Grids3D, tessellation: Tessellation, fill_interior: bool = False) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: (map_size, map_size, map_size) bool voxels of the surface, 
+                and of the interior of the solids of the tessellation if fill_interior
+        """
+        vertices, faces, face_solids = tessellation.vertices, tessellation.faces, tessellation.face_solids
+        occupied_map = TriangleVoxelizer.get_surface_map(grids, vertices, faces[face_solids == -1])
+        if fill_interior:
+            for solid in range(tessellation.solid_number):
+                solid_surface_map = TriangleVoxelizer.get_surface_map(grids, vertices, faces[face_solids == solid])
+                occupied_map |= TriangleVoxelizer.get_solid_map(solid_surface_map)
+        return occupied_map
+
+class GridsIndexer:
+    @classmethod
+    def get_inner_indices(cls, grids: Grids3D, points: List[List[float]]) -> tuple:
+        """
+        Args:
+            grids (Grids3D): target grids
+            points (List[List[float]]): (N, 3) x, y, z coordinates
+        Returns:
+            tuple: (i, j, k) index arrays of the points inside the grids, 
+                usable for fancy indexing of grids.obstacle_map
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        corner_min = np.array(grids.corner_min.Coord())
+        # truncation toward zero, same as int()
+        ijk = ((points - corner_min) / grids.node_gap).astype(np.int64)
+        inner = np.all((ijk >= 0) & (ijk < grids.map_size), axis=1)
+        ijk = ijk[inner]
+        return ijk[:, 0], ijk[:, 1], ijk[:, 2]
@@ -0,0 +1,128 @@
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import List, Tuple, Optional, Type
+import numpy as np
+from OCC.Core.gp import gp_Pnt
+
+from src.grids.grids3d import Grids3D, Node
+from src.pathfinding import GridAlgorithm, JumpPointSearchTheta, WaypointRouter
+
+
+class SharedGrids:
+    """
+    description:
+        obstacle map of a Grids3D copied once into multiprocessing.shared_memory.
+        worker processes attach a read-only Grids3D to the same buffer without copying it.
+        the owner must close() the shared memory (or use it as a context manager)
+    """
+    def __init__(self, grids: Grids3D) -> None:
+        obstacle_map = grids.obstacle_map
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=obstacle_map.nbytes)
+        shared_obstacle_map = np.ndarray(obstacle_map.shape, dtype=np.uint8, buffer=self.shared_memory.buf)
+        shared_obstacle_map[...] = obstacle_map
+        del shared_obstacle_map
+        corner_min, corner_max = grids.corner_min, grids.corner_max
+        # picklable description of the grids for the workers
+        self.spec: Tuple[str, int, Tuple[float, float, float], Tuple[float, float, float]] = \
+            (self.shared_memory.name, grids.map_size,
+             (corner_min.X(), corner_min.Y(), corner_min.Z()), (corner_max.X(), corner_max.Y(), corner_max.Z()))
+
+    @classmethod
+    def attach(cls, spec: Tuple[str, int, Tuple[float, float, float], Tuple[float, float, float]]) \
+            -> Tuple[Grids3D, shared_memory.SharedMemory]:
+        """
+        Returns:
+            Tuple[Grids3D, shared_memory.SharedMemory]: grids on the shared buffer,
+                the shared memory must be kept alive as long as the grids
+        """
+        name, map_size, corner_min, corner_max = spec
+        # pool workers share the resource tracker of the owner, only the owner unlinks the memory
+        attached_memory = shared_memory.SharedMemory(name=name)
+
+        grids = Grids3D(corner_min=gp_Pnt(*corner_min), corner_max=gp_Pnt(*corner_max), map_size=map_size)
+        obstacle_map = np.ndarray((map_size, map_size, map_size), dtype=np.uint8, buffer=attached_memory.buf)
+        obstacle_map.setflags(write=False)
+        grids.obstacle_map = obstacle_map
+        grids.update_obstacle_map()
+        return grids, attached_memory
+
+    def close(self) -> None:
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+        return
+
+    def __enter__(self) -> "SharedGrids":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+        return
+
+
+class RouteResult:
+    def __init__(self, path_indices: np.ndarray, leg_found: np.ndarray, leg_distances: np.ndarray) -> None:
+        # flat indices of the deduplicated path, start to goal
+        self.path_indices: np.ndarray = path_indices
+        self.leg_found: np.ndarray = leg_found
+        self.leg_distances: np.ndarray = leg_distances
+
+    @classmethod
+    def from_router(cls, router: WaypointRouter) -> "RouteResult":
+        path_indices = np.array([node.index for node in router.get_path_nodes()], dtype=np.int32)
+        leg_found = np.array([leg_stats.is_found for leg_stats in router.leg_stats], dtype=bool)
+        leg_distances = np.array([leg_stats.distance for leg_stats in router.leg_stats], dtype=np.float64)
+        return RouteResult(path_indices, leg_found, leg_distances)
+
+    def is_found(self) -> bool:
+        return bool(self.leg_found.all())
+
+    def get_path_nodes(self, grids: Grids3D) -> List[Node]:
+        return [grids[grids.get_ijk(index)] for index in self.path_indices.tolist()]
+
+
+# grids and router of a worker process, set by init_routing_worker
+_worker_grids: Optional[Grids3D] = None
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+_worker_router: Optional[WaypointRouter] = None
+
+
+def init_routing_worker(spec: Tuple, algorithm: Type[GridAlgorithm]) -> None:
+    global _worker_grids, _worker_memory, _worker_router
+    _worker_grids, _worker_memory = SharedGrids.attach(spec)
+    # one router per worker, its search state is reused by every cable of the worker
+    _worker_router = WaypointRouter(_worker_grids, algorithm)
+    return
+
+
+def route_terminals(terminals: List[Tuple[int, int, int]]) -> RouteResult:
+    grids, router = _worker_grids, _worker_router
+    router.route([grids[ijk] for ijk in terminals])
+    return RouteResult.from_router(router)
+
+
+class ParallelRouter:
+    """
+    description:
+        routes the terminal lists of many cables in a process pool.
+        the obstacle map is shared read-only through SharedGrids and workers return
+        flat index arrays, OCC objects are never sent between processes.
+        terminals must be free in the obstacle map before routing,
+        workers can not change the shared map.
+    """
+    def __init__(self, grids: Grids3D, algorithm: Type[GridAlgorithm] = JumpPointSearchTheta,
+                 processes: Optional[int] = None) -> None:
+        self.grids: Grids3D = grids
+        self.algorithm: Type[GridAlgorithm] = algorithm
+        self.processes: int = processes if processes is not None else multiprocessing.cpu_count()
+
+    def route(self, terminals_list: List[List[Tuple[int, int, int]]]) -> List[RouteResult]:
+        if not terminals_list:
+            return []
+        chunk_size = max(1, len(terminals_list) // (self.processes * 4))
+        with SharedGrids(self.grids) as shared_grids:
+            with multiprocessing.Pool(self.processes, initializer=init_routing_worker,
+                                      initargs=(shared_grids.spec, self.algorithm)) as pool:
+                return pool.map(route_terminals, terminals_list, chunksize=chunk_size)
+
+    def get_path_nodes(self, route_result: RouteResult) -> List[Node]:
+        return route_result.get_path_nodes(self.grids)
@@ -1,135 +1,614 @@
-from typing import Optional, Tuple, List
-import heapq        
+from typing import Optional, Tuple, List, Type, Dict
+from array import array
+import copy
+import math
+import time
+import weakref
+import numpy as np
 
 from src.grids.grids3d import Grids3D, Node
+from src.grids.search_state import SearchState
+from src.grids.jump_table import JumpTable
+from src.grids.line_of_sight import LineOfSight
+from src.grids.reachability import ReachabilityIndex
+from src.grids.heuristics import Heuristic
+from src.grids.lazy_deletion_heap import LazyDeletionHeap
+from src.grids.grid_pyramid import GridPyramid
+from src.grids.distance_field import DistanceFieldCache
+from src.search_stats import SearchStats, traced_search
 
 class GridAlgorithm:
-    def __init__(self, grids: Optional[None]) -> None:
+    BUDGET_CLOCK_INTERVAL: int = 64
+    MAX_HEURISTIC_TABLES: int = 4
+    WINDOW_GROWTH: float = 2.0
+    # search() runs search_windowed() if a window margin is set
+    HAS_WINDOW_SEARCH: bool = True
+    # search() runs search_bidirectional() if bidirectional is set, the algorithm provides expand()
+    HAS_BIDIRECTIONAL_SEARCH: bool = True
+    
+    def __init__(self, grids: Optional[None], search_state_size: Optional[int] = None, bidirectional: bool = False) -> None:
         self.grids: Grids3D = grids 
+        self.goal_node: Node = grids.goal_node
+        self.start_node: Node = grids.start_node    
+        # flat indices used by the search state
+        self.start_index: int = self.get_search_index(self.start_node)
+        self.goal_index: int = self.get_search_index(self.goal_node)
+        self.line_of_sight: LineOfSight = LineOfSight.get_line_of_sight(grids)
+        # query-local search state, returned to the grids when the algorithm is collected
+        self.search_state: SearchState = grids.acquire_search_state(search_state_size)
+        weakref.finalize(self, grids.release_search_state, self.search_state)
+        # flat indices keyed by f with decrease-key, an index is queued at most once
+        self.open_list: LazyDeletionHeap = self.search_state.open_list
+        # bidirectional mode: a goal to start copy of this algorithm searches toward the start,
+        # the path goes through the meeting index of both search trees
+        # reject start and goal in different components of the free voxels before searching
+        self.check_reachability: bool = True
+        self.bidirectional: bool = False
+        self.set_bidirectional(bidirectional)
+        self.balanced_heuristic: bool = False
+        self.reverse_algorithm: Optional[GridAlgorithm] = None
+        self.meeting_index: int = -1
+        # search budget, None is unbounded. a search that runs out of it stops
+        # with is_budget_exceeded set and returns False, the anytime search returns its best path
+        self.max_expansions: Optional[int] = None
+        self.time_limit: Optional[float] = None
+        self.budget_expanded_number: int = 0
+        self.deadline: float = math.inf
+        self.is_budget_exceeded: bool = False
+        # statistics of the last search, collected only if enable_stats() is called
+        self.stats: Optional[SearchStats] = None
+        self.is_stats_enabled: bool = False
+        self.is_expansion_recorded: bool = False
+        self.forced_neighbor_call_number: int = 0
+        # heuristic provider, None is the euclidean voxel distance computed per node.
+        # tables of a provider are in search index order, looked up for the goal (and the start
+        # with the balanced heuristic) of the current search
+        self.heuristic: Optional[Heuristic] = None
+        self.heuristic_tables: Dict[Tuple[int, int], array] = {}
+        self.goal_heuristic_table: Optional[array] = None
+        self.start_heuristic_table: Optional[array] = None
+        # windowed search, None searches the whole map, the bidirectional search ignores it.
+        # the searches stay inside the voxels from window_lower to window_upper,
+        # the whole map outside search_windowed()
+        self.window_margin: Optional[int] = None
+        self.window_growth: float = GridAlgorithm.WINDOW_GROWTH
+        self.window_number: int = 0
+        self.window_lower: Tuple[int, int, int] = (0, 0, 0)
+        self.window_upper: Tuple[int, int, int] = (grids.map_size - 1,) * 3
     
+    def get_search_index(self, node: Node) -> int:
+        return node.index
     
-    def __iter__(self):
-        cur_node: Node = self.grids.goal_node
-        start_node: Node = self.grids.start_node
-        start_node.parent = None
+    def set_terminals(self, start_node: Node, goal_node: Node) -> None:
+        """
+        description:
+            next query on the same grids, the search state and the precomputed data are reused
+        """
+        self.start_node, self.goal_node = start_node, goal_node
+        self.start_index, self.goal_index = self.get_search_index(start_node), self.get_search_index(goal_node)
+        if self.reverse_algorithm is not None:
+            reverse_algorithm = self.reverse_algorithm
+            reverse_algorithm.start_node, reverse_algorithm.goal_node = goal_node, start_node
+            reverse_algorithm.start_index, reverse_algorithm.goal_index = self.goal_index, self.start_index
+        return
+    
+    def begin_search(self) -> None:
+        self.search_state.begin()
+        self.open_list.clear()
+        self.search_state.set_g(self.start_index, 0.0, -1)
+        self.meeting_index = -1
+        self.begin_budget()
+        self.begin_heuristic()
+        return
+    
+    def set_heuristic(self, heuristic: Optional[Heuristic]) -> None:
+        """
+        Args:
+            heuristic (Optional[Heuristic]): provider of the heuristic, None for the euclidean distance
+        """
+        self.heuristic = heuristic
+        self.heuristic_tables = {}
+        if self.reverse_algorithm is not None:
+            self.reverse_algorithm.set_heuristic(heuristic)
+        return
+    
+    def begin_heuristic(self) -> None:
+        if self.heuristic is None:
+            self.goal_heuristic_table = self.start_heuristic_table = None
+            return
+        self.goal_heuristic_table = self.get_heuristic_table(self.goal_node)
+        self.start_heuristic_table = self.get_heuristic_table(self.start_node) if self.balanced_heuristic else None
+        return
+    
+    def get_heuristic_table(self, target_node: Node) -> array:
+        key = (self.grids.version, target_node.index)
+        table = self.heuristic_tables.get(key)
+        if table is None:
+            # the tables of the last terminals are kept
+            if len(self.heuristic_tables) >= GridAlgorithm.MAX_HEURISTIC_TABLES:
+                self.heuristic_tables.pop(next(iter(self.heuristic_tables)))
+            grid_table = self.heuristic.get_table(self.grids, (target_node.i, target_node.j, target_node.k))
+            table = array('d', self.get_search_table(grid_table).astype(np.float64).tobytes())
+            self.heuristic_tables[key] = table
+        return table
+    
+    def get_search_table(self, grid_table: np.ndarray) -> np.ndarray:
+        # values of the grid voxels in search index order
+        return np.ascontiguousarray(grid_table).reshape(-1)
+    
+    def set_budget(self, max_expansions: Optional[int] = None, time_limit: Optional[float] = None) -> None:
+        """
+        Args:
+            max_expansions (Optional[int]): expanded nodes per search, None is unbounded
+            time_limit (Optional[float]): wall-clock seconds per search, None is unbounded
+        """
+        if max_expansions is not None and max_expansions < 0:
+            raise ValueError("GridAlgorithm.set_budget: max_expansions must be non-negative")
+        if time_limit is not None and time_limit < 0:
+            raise ValueError("GridAlgorithm.set_budget: time_limit must be non-negative")
+        self.max_expansions, self.time_limit = max_expansions, time_limit
+        return
+    
+    def has_budget(self) -> bool:
+        return self.max_expansions is not None or self.time_limit is not None
+    
+    def has_expansion_check(self) -> bool:
+        # search loops call count_pop and check_expansion only if this is True
+        return self.is_stats_enabled or self.has_budget()
+    
+    def enable_stats(self, record_expansions: bool = False) -> None:
+        """
+        Args:
+            record_expansions (bool): record the expansion order in the stats of every search
+        """
+        self.is_stats_enabled = True
+        self.is_expansion_recorded = record_expansions
+        return
+    
+    def disable_stats(self) -> None:
+        self.is_stats_enabled = False
+        self.is_expansion_recorded = False
+        return
+    
+    def get_push_number(self) -> int:
+        push_number = self.open_list.push_number
+        if self.reverse_algorithm is not None:
+            push_number += self.reverse_algorithm.open_list.push_number
+        return push_number
+    
+    def get_decrease_key_number(self) -> int:
+        decrease_key_number = self.open_list.decrease_key_number
+        if self.reverse_algorithm is not None:
+            decrease_key_number += self.reverse_algorithm.open_list.decrease_key_number
+        return decrease_key_number
+    
+    def get_forced_neighbor_call_number(self) -> int:
+        call_number = self.forced_neighbor_call_number
+        if self.reverse_algorithm is not None:
+            call_number += self.reverse_algorithm.forced_neighbor_call_number
+        return call_number
+    
+    def get_open_size(self) -> int:
+        open_size = len(self.open_list)
+        if self.bidirectional and self.reverse_algorithm is not None:
+            open_size += len(self.reverse_algorithm.open_list)
+        return open_size
+    
+    def get_grid_indices(self, search_indices: np.ndarray) -> np.ndarray:
+        # flat indices of the grids for search indices
+        return search_indices
+    
+    def begin_budget(self) -> None:
+        self.budget_expanded_number = 0
+        self.is_budget_exceeded = False
+        self.deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else math.inf
+        return
+    
+    def count_pop(self) -> None:
+        # called for every pop of the open list if has_expansion_check()
+        if self.stats is not None:
+            self.stats.pop_number += 1
+        return
+    
+    def check_expansion(self, cur_index: int) -> bool:
+        """
+        description:
+            counts one expansion in the stats and against the budget, called only if has_expansion_check().
+            the clock is read every BUDGET_CLOCK_INTERVAL expansions
+        Returns:
+            bool: True if the budget is exceeded and the search must stop
+        """
+        stats = self.stats
+        if self.is_stats_enabled and stats is not None:
+            stats.expanded_number += 1
+            # the popped entry is counted, it was in the open list until now
+            open_size = self.get_open_size() + 1
+            if open_size > stats.open_peak:
+                stats.open_peak = open_size
+            if self.is_expansion_recorded:
+                stats.expansion_order.append(cur_index)
+        if not self.has_budget():
+            return False
+        self.budget_expanded_number += 1
+        if self.max_expansions is not None and self.budget_expanded_number > self.max_expansions:
+            self.is_budget_exceeded = True
+        elif self.budget_expanded_number % self.BUDGET_CLOCK_INTERVAL == 0 and \
+                time.perf_counter() > self.deadline:
+            self.is_budget_exceeded = True
+        return self.is_budget_exceeded
+    
+    def set_bidirectional(self, bidirectional: bool) -> None:
+        if bidirectional and not self.HAS_BIDIRECTIONAL_SEARCH:
+            raise ValueError(f"{type(self).__name__}: bidirectional search is not supported")
+        self.bidirectional = bidirectional
+        return
+    
+    def set_window(self, margin: Optional[int], growth: float = WINDOW_GROWTH) -> None:
+        """
+        Args:
+            margin (Optional[int]): voxels around the bounding box of the terminals searched first,
+                None searches the whole map
+            growth (float): factor of the margin when the window is grown
+        """
+        if margin is not None and not self.HAS_WINDOW_SEARCH:
+            raise ValueError(f"{type(self).__name__}: windowed search is not supported")
+        if margin is not None and margin < 0:
+            raise ValueError("GridAlgorithm: window margin must not be negative")
+        if growth <= 1.0:
+            raise ValueError("GridAlgorithm: window growth must be greater than 1")
+        self.window_margin = margin
+        self.window_growth = growth
+        return
+    
+    def get_window(self, margin: int) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
+        """
+        Returns:
+            Tuple[Tuple[int, int, int], Tuple[int, int, int]]: lowest and highest voxel of the bounding box
+                of the terminals grown by margin, clipped to the map
+        """
+        max_index = self.grids.map_size - 1
+        start_ijk = (self.start_node.i, self.start_node.j, self.start_node.k)
+        goal_ijk = (self.goal_node.i, self.goal_node.j, self.goal_node.k)
+        lower = tuple(max(0, min(s, g) - margin) for s, g in zip(start_ijk, goal_ijk))
+        upper = tuple(min(max_index, max(s, g) + margin) for s, g in zip(start_ijk, goal_ijk))
+        return lower, upper
+    
+    def set_search_window(self, lower: Tuple[int, int, int], upper: Tuple[int, int, int]) -> None:
+        self.window_lower, self.window_upper = lower, upper
+        return
+    
+    def get_window_bound(self, lower: Tuple[int, int, int], upper: Tuple[int, int, int]) -> float:
+        """
+        description:
+            a path leaving the window has a voxel v beyond one of its faces and is at least
+            |start - v| + |v - goal| long. the smallest such length beyond a face is on the plane
+            of the voxels next to it, the distance from the start to the goal mirrored on that plane
+        Returns:
+            float: lower bound of the distance of every path leaving the window, inf if the window is the map
+        """
+        max_index = self.grids.map_size - 1
+        start_ijk = (self.start_node.i, self.start_node.j, self.start_node.k)
+        goal_ijk = (self.goal_node.i, self.goal_node.j, self.goal_node.k)
+        bound = math.inf
+        for axis in range(3):
+            planes = []
+            if lower[axis] > 0:
+                planes.append(lower[axis] - 1)
+            if upper[axis] < max_index:
+                planes.append(upper[axis] + 1)
+            for plane in planes:
+                mirrored_ijk = list(goal_ijk)
+                mirrored_ijk[axis] = 2 * plane - goal_ijk[axis]
+                bound = min(bound, math.dist(start_ijk, mirrored_ijk))
+        return self.grids.node_gap * bound
+    
+    @traced_search
+    def search(self) -> bool:
+        if self.reject_unreachable():
+            return False
+        if self.bidirectional:
+            return self.search_bidirectional()
+        if self.window_margin is not None:
+            return self.search_windowed()
+        self.begin_search()
+        return self.search_open_list()
+    
+    def search_open_list(self) -> bool:
+        """
+        description:
+            the search from the start after begin_search(), inside the current window
+        """
+        raise NotImplementedError
+    
+    def search_windowed(self) -> bool:
+        """
+        description:
+            the search limited to the bounding box of the terminals plus window_margin,
+            the margin grows by window_growth until the window proves the path.
+            a path found inside the window is accepted if it is not longer than the bound
+            of the paths leaving it (get_window_bound), so a search on the whole map
+            can not find a shorter one and an optimal search stays optimal.
+            the window is convex, any-angle segments between its voxels stay inside.
+            the budget covers all windows.
+        """
+        map_window = ((0, 0, 0), (self.grids.map_size - 1,) * 3)
+        self.window_number = 0
+        margin = self.window_margin
+        budget = None
+        try:
+            while True:
+                lower, upper = self.get_window(margin)
+                self.begin_search()
+                if budget is not None:
+                    # begin_search() starts a new budget
+                    self.budget_expanded_number, self.deadline = budget
+                self.window_number += 1
+                self.set_search_window(lower, upper)
+                is_found = self.search_open_list()
+                if self.is_budget_exceeded:
+                    return False
+                bound = self.get_window_bound(lower, upper)
+                if bound == math.inf:
+                    return is_found
+                if is_found and self.search_state.get_g(self.goal_index) <= bound:
+                    return True
+                budget = (self.budget_expanded_number, self.deadline)
+                margin = max(margin + 1, int(math.ceil(margin * self.window_growth)))
+        finally:
+            self.set_search_window(*map_window)
+    
+    def push_open_list(self, f: float, index: int) -> None:
+        # queues the index or decreases its f
+        self.open_list.push(index, f)
+        return
+    
+    def get_node(self, index: int) -> Node:
+        return self.grids[self.grids.get_ijk(index)]
+    
+    def get_voxel_distance(self, src_node: Node, dst_node: Node) -> float:
+        # distance between voxel centers from the index difference
+        di, dj, dk = dst_node.i - src_node.i, dst_node.j - src_node.j, dst_node.k - src_node.k
+        return self.grids.node_gap * math.sqrt(di * di + dj * dj + dk * dk)
+    
+    def get_ijk_distance(self, src_ijk: Tuple[int, int, int], dst_ijk: Tuple[int, int, int]) -> float:
+        di, dj, dk = dst_ijk[0] - src_ijk[0], dst_ijk[1] - src_ijk[1], dst_ijk[2] - src_ijk[2]
+        return self.grids.node_gap * math.sqrt(di * di + dj * dj + dk * dk)
+    
+    def get_heuristic(self, node: Node) -> float:
+        return self.get_ijk_heuristic((node.i, node.j, node.k), self.get_search_index(node))
+    
+    def get_ijk_heuristic(self, ijk: Tuple[int, int, int], index: int) -> float:
+        """
+        Args:
+            ijk (Tuple[int, int, int]): voxel
+            index (int): search index of the voxel
+        """
+        if self.goal_heuristic_table is not None:
+            if self.balanced_heuristic:
+                return 0.5 * (self.goal_heuristic_table[index] - self.start_heuristic_table[index])
+            return self.goal_heuristic_table[index]
+        goal_node = self.goal_node
+        goal_distance = self.get_ijk_distance(ijk, (goal_node.i, goal_node.j, goal_node.k))
+        if self.balanced_heuristic:
+            # consistent for both sides of the bidirectional search
+            start_node = self.start_node
+            return 0.5 * (goal_distance - self.get_ijk_distance(ijk, (start_node.i, start_node.j, start_node.k)))
+        return goal_distance
+    
+    def get_terminal_components(self) -> Tuple[List[int], int]:
+        """
+        Returns:
+            Tuple[List[int], int]: components the search can enter from the start 
+                and the component of the goal, 0 if the goal is an obstacle
+        """
+        reachability_index = ReachabilityIndex.get_reachability_index(self.grids)
+        start_node, goal_node = self.start_node, self.goal_node
+        return (reachability_index.get_start_components(start_node.i, start_node.j, start_node.k), 
+                reachability_index.get_component(goal_node.i, goal_node.j, goal_node.k))
+    
+    def is_reachable(self) -> bool:
+        reachability_time = time.perf_counter()
+        reachability_index = ReachabilityIndex.get_reachability_index(self.grids)
+        start_node, goal_node = self.start_node, self.goal_node
+        is_reachable = reachability_index.is_reachable((start_node.i, start_node.j, start_node.k), 
+                                                       (goal_node.i, goal_node.j, goal_node.k))
+        if self.is_stats_enabled and self.stats is not None:
+            self.stats.reachability_time += time.perf_counter() - reachability_time
+        return is_reachable
+    
+    def reject_unreachable(self) -> bool:
+        """
+        description:
+            True if the goal can not be reached from the start,
+            the previous result is cleared so search() can return False at once
+        """
+        if not self.check_reachability or self.is_reachable():
+            return False
+        self.begin_search()
+        return True
+    
+    def expand(self, cur_index: int) -> None:
+        """
+        description:
+            push the successors of a closed node to the open list,
+            one step of search() used by the bidirectional search
+        """
+        raise NotImplementedError
+    
+    def get_reverse_algorithm(self) -> "GridAlgorithm":
+        if self.reverse_algorithm is None:
+            # shares the grids and the precomputed tables, owns its search state
+            reverse_algorithm = copy.copy(self)
+            reverse_algorithm.bidirectional = False
+            reverse_algorithm.start_node, reverse_algorithm.goal_node = self.goal_node, self.start_node
+            reverse_algorithm.start_index, reverse_algorithm.goal_index = self.goal_index, self.start_index
+            reverse_algorithm.search_state = self.grids.acquire_search_state(self.search_state.size)
+            reverse_algorithm.open_list = reverse_algorithm.search_state.open_list
+            weakref.finalize(reverse_algorithm, self.grids.release_search_state, reverse_algorithm.search_state)
+            self.reverse_algorithm = reverse_algorithm
+        return self.reverse_algorithm
+    
+    def search_bidirectional(self) -> bool:
+        """
+        description:
+            searches from both terminals, the side with the smaller open list is expanded.
+            both sides use the potential p(v) = (h_goal(v) - h_start(v)) / 2 of their own
+            terminals, so the two searches run on the same reduced costs and
+            every path not found yet costs at least f_min forward + f_min backward.
+            a successor already reached by the other side joins two paths, mu is the
+            cheapest one. the search stops as soon as f_min forward + f_min backward >= mu,
+            the path is optimal for the A* algorithms.
+        """
+        reverse_algorithm = self.get_reverse_algorithm()
+        self.balanced_heuristic = reverse_algorithm.balanced_heuristic = True
+        forward_state, backward_state = self.search_state, reverse_algorithm.search_state
+        self.begin_search()
+        reverse_algorithm.begin_search()
+        self.push_open_list(self.get_heuristic(self.start_node), self.start_index)
+        reverse_algorithm.push_open_list(reverse_algorithm.get_heuristic(reverse_algorithm.start_node), 
+                                         reverse_algorithm.start_index)
         
-        while cur_node is not None:
-            yield cur_node
-            cur_node = cur_node.parent
+        mu: float = forward_state.g[self.start_index] + backward_state.get_g(self.start_index)
+        if mu == 0.0:
+            self.meeting_index = self.start_index
+        has_expansion_check = self.has_expansion_check()
+        while self.open_list and reverse_algorithm.open_list:
+            if self.open_list.peek_key() + reverse_algorithm.open_list.peek_key() >= mu:
+                break
+            if len(self.open_list) <= len(reverse_algorithm.open_list):
+                algorithm, state, other_state = self, forward_state, backward_state
+            else:
+                algorithm, state, other_state = reverse_algorithm, backward_state, forward_state
+            
+            open_list = algorithm.open_list
+            cur_index = open_list.pop()
+            if has_expansion_check:
+                self.count_pop()
+            if state.is_closed(cur_index):
+                continue
+            if has_expansion_check and self.check_expansion(cur_index):
+                return False
+            state.close(cur_index)
+            if cur_index == algorithm.goal_index:
+                continue
+            # collect the successors of this expansion to check them against the other side
+            open_list.collect()
+            algorithm.expand(cur_index)
+            for index in open_list.finish_collecting():
+                # cells only scanned by the other side have no g-cost and never meet
+                path_g = state.g[index] + other_state.get_g(index)
+                if path_g < mu:
+                    mu = path_g
+                    self.meeting_index = index
+        return self.meeting_index != -1
+    
+    def get_path_indices(self) -> List[int]:
+        """
+        Returns:
+            List[int]: flat indices from the goal to the start, empty if no path is found
+        """
+        if self.bidirectional and self.meeting_index == -1:
+            return []
+        if self.meeting_index == -1:
+            return self.search_state.get_path_indices(self.goal_index)
+        # meeting index to start, and meeting index to goal on the reverse search tree
+        forward_indices = self.search_state.get_path_indices(self.meeting_index)
+        backward_indices = self.reverse_algorithm.search_state.get_path_indices(self.meeting_index)
+        backward_indices.reverse()
+        return backward_indices + forward_indices[1:]
+    
+    def __iter__(self):
+        for index in self.get_path_indices():
+            yield self.get_node(index)
     
     def get_path_nodes(self) -> List[Node]:
+        path_time = time.perf_counter()
         path_nodes = []
         for path_node in self:
             path_nodes.append(path_node)
         path_nodes.reverse()
+        self.add_path_time(time.perf_counter() - path_time)
         return path_nodes 
     
+    def add_path_time(self, path_time: float) -> None:
+        if self.is_stats_enabled and self.stats is not None:
+            self.stats.path_time += path_time
+        return
+    
     def get_path_distance(self) -> float:
+        return GridAlgorithm.get_nodes_distance(self.get_path_nodes())
+    
+    @staticmethod
+    def get_nodes_distance(path_nodes: List[Node]) -> float:
         distance_sum: float = 0.0
-        for path_node in self:
-            if isinstance(path_node.parent, Node):
-                distance_sum += self.get_distance(path_node, path_node.parent)
+        for i in range(len(path_nodes) - 1):
+            distance_sum += path_nodes[i].center_pnt.Distance(path_nodes[i + 1].center_pnt)
         
         return distance_sum
 
 
     def has_line_of_sight(self, src_node: Node, dst_node: Node) -> bool:
-        x1, y1, z1 = src_node.i, src_node.j, src_node.k
-        x2, y2, z2 = dst_node.i, dst_node.j, dst_node.k
-
-        if (x2 > x1):
-            xs = 1
-            dx = x2 - x1
-        else:
-            xs = -1
-            dx = x1 - x2
-
-        if (y2 > y1):
-            ys = 1
-            dy = y2 - y1
-        else:
-            ys = -1
-            dy = y1 - y2
-
-        if (z2 > z1):
-            zs = 1
-            dz = z2 - z1
-        else:
-            zs = -1
-            dz = z1 - z2
-
-        if (dx >= dy and dx >= dz):
-            p1 = 2 * dy - dx
-            p2 = 2 * dz - dx
-            while (x1 != x2):
-                x1 += xs
-                if (p1 >= 0):
-                    y1 += ys
-                    p1 -= 2 * dx
-                if (p2 >= 0):
-                    z1 += zs
-                    p2 -= 2 * dx
-                p1 += 2 * dy
-                p2 += 2 * dz
-                if self.grids[x1, y1, z1].is_obstacle: 
-                    return False
-
-        elif (dy >= dx and dy >= dz):
-            p1 = 2 * dx - dy
-            p2 = 2 * dz - dy
-            while (y1 != y2):
-                y1 += ys
-                if (p1 >= 0):
-                    x1 += xs
-                    p1 -= 2 * dy
-                if (p2 >= 0):
-                    z1 += zs
-                    p2 -= 2 * dy
-                p1 += 2 * dx
-                p2 += 2 * dz
-                if self.grids[x1, y1, z1].is_obstacle:  
-                    return False
-        else:
-            p1 = 2 * dy - dz
-            p2 = 2 * dx - dz
-            while (z1 != z2):
-                z1 += zs
-                if (p1 >= 0):
-                    y1 += ys
-                    p1 -= 2 * dz
-                if (p2 >= 0):
-                    x1 += xs
-                    p2 -= 2 * dz
-                p1 += 2 * dy
-                p2 += 2 * dx
-                if self.grids[x1, y1, z1].is_obstacle:  
-                    return False
-        return True
+        return self.line_of_sight.has_line_of_sight((src_node.i, src_node.j, src_node.k), 
+                                                    (dst_node.i, dst_node.j, dst_node.k))
     
     def get_smoothed_path_nodes(self) -> List[Node]:
-        dst_node = self.grids.goal_node
-        src_node = self.grids.start_node    
-        src_node.parent = None  
+        path_time = time.perf_counter()
+        # goal to start order
+        path_nodes = list(self)
+        if len(path_nodes) < 2:
+            return path_nodes
+        src_index = len(path_nodes) - 1
+        path_ijk = np.array([(node.i, node.j, node.k) for node in path_nodes], dtype=np.int64)
         
         smoothed_node_list = []
-        finder: Node = dst_node
-        smoothed_node_list.append(finder)
-        tmp_node: Node = finder.parent
-
-        while tmp_node != src_node:
-            while self.has_line_of_sight(finder, tmp_node.parent):
-                tmp_node = tmp_node.parent
-                if tmp_node == src_node: 
-                    break
+        finder: int = 0
+        smoothed_node_list.append(path_nodes[finder])
+        tmp_node: int = finder + 1
+
+        while tmp_node != src_index:
+            visible_number = self.get_visible_number(path_ijk, finder, tmp_node + 1)
+            tmp_node = tmp_node + visible_number
             finder = tmp_node
-            if tmp_node == src_node:
+            if tmp_node == src_index:
                 break   
-            tmp_node = finder.parent
-            smoothed_node_list.append(finder)
+            tmp_node = finder + 1
+            smoothed_node_list.append(path_nodes[finder])
         
-        smoothed_node_list.append(src_node)
+        smoothed_node_list.append(path_nodes[src_index])
+        self.add_path_time(time.perf_counter() - path_time)
         return smoothed_node_list   
     
+    def get_visible_number(self, path_ijk: np.ndarray, finder: int, begin: int) -> int:
+        """
+        description:
+            lines of sight from the finder are checked in batches of 1, 2, 4, ... later nodes
+            until one is blocked, only the lines up to the first blocked one are memoized
+        Args:
+            path_ijk (np.ndarray): (L, 3) voxels of the path
+            finder (int): path position of the line start
+            begin (int): first path position checked
+        Returns:
+            int: number of nodes from begin on visible from the finder before the first blocked one
+        """
+        line_of_sight, map_size = self.line_of_sight, self.grids.map_size
+        src_index = self.grids.get_index(*path_ijk[finder].tolist())
+        batch_size, end = 1, begin
+        while end < len(path_ijk):
+            candidates = path_ijk[end:end + batch_size]
+            visible = line_of_sight.has_lines_of_sight(np.repeat(path_ijk[finder:finder + 1], len(candidates), axis=0), 
+                                                       candidates, memoize=False)
+            is_blocked = not visible.all()
+            visible_number = int(np.argmin(visible)) if is_blocked else len(visible)
+            used = candidates[:visible_number + is_blocked]
+            dst_indices = (used[:, 0] * map_size + used[:, 1]) * map_size + used[:, 2]
+            for dst_index, is_visible in zip(dst_indices.tolist(), visible[:len(used)].tolist()):
+                line_of_sight.store((src_index, dst_index), is_visible)
+            if is_blocked:
+                return end + visible_number - begin
+            end += len(candidates)
+            batch_size *= 2
+        return end - begin
+    
     
 class Direction:    
     def __init__(self, dir_i: int, dir_j: int, dir_k: int) -> None:
@@ -167,14 +646,8 @@ class Direction:
         return self.dir_i < other.dir_i
 
 class JumpPointSearch(GridAlgorithm):
-    def __init__(self, grids: Grids3D) -> None:
-        self.grids: Grids3D = grids
-        self.goal_node: Node = grids.goal_node
-        self.start_node: Node = grids.start_node    
-        self.open_list: list[Node] = [] 
-        self.close_list = set()
-        self.scaned_node_set = set()   
-        self.grids.reset_nodes()
+    def __init__(self, grids: Grids3D, bidirectional: bool = False) -> None:
+        super().__init__(grids, bidirectional=bidirectional)
         self.scan_directions = [Direction(1, 0, 0),
                                 Direction(0, 1, 0),
                                 Direction(0, 0, 1),
@@ -223,532 +696,1148 @@ class JumpPointSearch(GridAlgorithm):
                             (0, 1, 0),
                             (0, -1, 0)]
 
-    def search(self):
-        self.open_list.clear()
-        self.close_list.clear()
-        
-        heapq.heappush(self.open_list, self.start_node) 
+    def search_open_list(self) -> bool:
+        state = self.search_state
+        self.push_open_list(self.get_heuristic(self.start_node), self.start_index) 
+        has_expansion_check = self.has_expansion_check()
         
         while self.open_list:
-            cur_node: Node = heapq.heappop(self.open_list)         
-            if cur_node.is_goal_node == True:
+            cur_index = self.open_list.pop()
+            if has_expansion_check:
+                self.count_pop()
+            if cur_index == self.goal_node.index:
                 return True
-            if cur_node in self.close_list:
+            # a jump closes the cells it scans, queued jump points included
+            if state.is_closed(cur_index):
                 continue
+            if has_expansion_check and self.check_expansion(cur_index):
+                return False
             
-            self.close_list.add(cur_node)
-            self.jump_diagonal3d(cur_node, 1, 1, 1)
-            self.jump_diagonal3d(cur_node, 1, 1, -1)
-            self.jump_diagonal3d(cur_node, 1, -1, 1)
-            self.jump_diagonal3d(cur_node, -1, 1, 1)
-            self.jump_diagonal3d(cur_node, 1, -1, -1)
-            self.jump_diagonal3d(cur_node, -1, 1, -1)
-            self.jump_diagonal3d(cur_node, -1, -1, 1)
-            self.jump_diagonal3d(cur_node, -1, -1, -1)
-            
-            self.jump_diagonal2d(cur_node, 1, 1, 0)
-            self.jump_diagonal2d(cur_node, 1, 0, 1)
-            self.jump_diagonal2d(cur_node, 0, 1, 1)
-            self.jump_diagonal2d(cur_node, 1, -1, 0)
-            self.jump_diagonal2d(cur_node, 1, 0, -1)
-            self.jump_diagonal2d(cur_node, 0, 1, -1)
-            self.jump_diagonal2d(cur_node, -1, 1, 0)
-            self.jump_diagonal2d(cur_node, -1, 0, 1)
-            self.jump_diagonal2d(cur_node, 0, -1, 1)
-            self.jump_diagonal2d(cur_node, -1, -1, 0)
-            self.jump_diagonal2d(cur_node, -1, 0, -1)
-            self.jump_diagonal2d(cur_node, 0, -1, -1)
-            
-            self.jump_orthogonal(cur_node, 1, 0, 0) 
-            self.jump_orthogonal(cur_node, 0, 1, 0)
-            self.jump_orthogonal(cur_node, 0, 0, 1)
-            self.jump_orthogonal(cur_node, -1, 0, 0)
-            self.jump_orthogonal(cur_node, 0, -1, 0)
-            self.jump_orthogonal(cur_node, 0, 0, -1) 
+            state.close(cur_index)
+            self.expand(cur_index)
             
         return False
+    
+    def expand(self, cur_index: int) -> None:
+        cur_ijk: Tuple[int, int, int] = self.grids.get_ijk(cur_index)
+        self.jump_diagonal3d(cur_ijk, 1, 1, 1)
+        self.jump_diagonal3d(cur_ijk, 1, 1, -1)
+        self.jump_diagonal3d(cur_ijk, 1, -1, 1)
+        self.jump_diagonal3d(cur_ijk, -1, 1, 1)
+        self.jump_diagonal3d(cur_ijk, 1, -1, -1)
+        self.jump_diagonal3d(cur_ijk, -1, 1, -1)
+        self.jump_diagonal3d(cur_ijk, -1, -1, 1)
+        self.jump_diagonal3d(cur_ijk, -1, -1, -1)
             
-    def jump_orthogonal(self, cur_node: Node, dir_i: int, dir_j: int, dir_k: int) -> None:     
+        self.jump_diagonal2d(cur_ijk, 1, 1, 0)
+        self.jump_diagonal2d(cur_ijk, 1, 0, 1)
+        self.jump_diagonal2d(cur_ijk, 0, 1, 1)
+        self.jump_diagonal2d(cur_ijk, 1, -1, 0)
+        self.jump_diagonal2d(cur_ijk, 1, 0, -1)
+        self.jump_diagonal2d(cur_ijk, 0, 1, -1)
+        self.jump_diagonal2d(cur_ijk, -1, 1, 0)
+        self.jump_diagonal2d(cur_ijk, -1, 0, 1)
+        self.jump_diagonal2d(cur_ijk, 0, -1, 1)
+        self.jump_diagonal2d(cur_ijk, -1, -1, 0)
+        self.jump_diagonal2d(cur_ijk, -1, 0, -1)
+        self.jump_diagonal2d(cur_ijk, 0, -1, -1)
+            
+        self.jump_orthogonal(cur_ijk, 1, 0, 0) 
+        self.jump_orthogonal(cur_ijk, 0, 1, 0)
+        self.jump_orthogonal(cur_ijk, 0, 0, 1)
+        self.jump_orthogonal(cur_ijk, -1, 0, 0)
+        self.jump_orthogonal(cur_ijk, 0, -1, 0)
+        self.jump_orthogonal(cur_ijk, 0, 0, -1) 
+        return
+    
+    def push_jump_point(self, src_ijk: Tuple[int, int, int], src_index: int, 
+                        nxt_ijk: Tuple[int, int, int], nxt_index: int) -> None:
+        state = self.search_state
+        ng = state.g[src_index] + self.get_ijk_distance(src_ijk, nxt_ijk)
+        if not state.is_visited(nxt_index) or ng < state.g[nxt_index]:
+            state.set_g(nxt_index, ng, src_index)
+            self.push_open_list(ng + self.get_ijk_heuristic(nxt_ijk, nxt_index), nxt_index)
+        return
+    
+    # the jumps scan the obstacle map by voxel and flat index, no node views are built
+    def jump_orthogonal(self, src_ijk: Tuple[int, int, int], dir_i: int, dir_j: int, dir_k: int) -> None:     
         if dir_i == 0 and dir_j == 0 and dir_k == 0:
             return
         
+        state = self.search_state
+        obstacle_map = self.grids.obstacle_map
         map_size = self.grids.map_size
-        cur_i, cur_j, cur_k = cur_node.i, cur_node.j, cur_node.k    
+        lower_i, lower_j, lower_k = self.window_lower
+        upper_i, upper_j, upper_k = self.window_upper
+        cur_i, cur_j, cur_k = src_ijk
+        src_index = nxt_index = (cur_i * map_size + cur_j) * map_size + cur_k
+        step = (dir_i * map_size + dir_j) * map_size + dir_k
         while True:
             nxt_i, nxt_j, nxt_k = cur_i + dir_i, cur_j + dir_j, cur_k + dir_k
-            if nxt_i < 0 or nxt_i >= map_size or nxt_j < 0 or nxt_j >= map_size or nxt_k < 0 or nxt_k >= map_size:
+            if nxt_i < lower_i or nxt_i > upper_i or nxt_j < lower_j or nxt_j > upper_j or \
+                    nxt_k < lower_k or nxt_k > upper_k:
                 return
             
-            nxt_node = self.grids[nxt_i, nxt_j, nxt_k] 
-            if nxt_node.is_obstacle == True:
+            nxt_index += step
+            if obstacle_map.item(nxt_i, nxt_j, nxt_k):
                 return
-            if nxt_node in self.close_list:
+            if state.is_closed(nxt_index):
                 return
 
-            if nxt_node.is_goal_node == True or self.has_forced_neighbor(nxt_node, dir_i, dir_j, dir_k):
-                ng = cur_node.g + cur_node.center_pnt.Distance(nxt_node.center_pnt)
-                    
-                if nxt_node.parent is None or ng < nxt_node.g:
-                    nxt_node.g = ng
-                    nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                    nxt_node.parent = cur_node
-                    heapq.heappush(self.open_list, nxt_node)
+            if nxt_index == self.goal_index or self.has_forced_neighbor(nxt_i, nxt_j, nxt_k, dir_i, dir_j, dir_k):
+                self.push_jump_point(src_ijk, src_index, (nxt_i, nxt_j, nxt_k), nxt_index)
                 return
             
-            nxt_node.parent = cur_node
+            state.set_parent(nxt_index, src_index)
             cur_i, cur_j, cur_k = nxt_i, nxt_j, nxt_k   
-            self.close_list.add(nxt_node)   
+            state.close(nxt_index)   
 
             
-    def jump_diagonal2d(self, cur_node: Node, dir_i: int, dir_j: int, dir_k: int) -> Optional[Node]:     
+    def jump_diagonal2d(self, src_ijk: Tuple[int, int, int], dir_i: int, dir_j: int, dir_k: int) -> None:     
+        state = self.search_state
+        obstacle_map = self.grids.obstacle_map
         map_size = self.grids.map_size
-        cur_i, cur_j, cur_k = cur_node.i, cur_node.j, cur_node.k    
+        lower_i, lower_j, lower_k = self.window_lower
+        upper_i, upper_j, upper_k = self.window_upper
+        cur_i, cur_j, cur_k = src_ijk
+        src_index = nxt_index = (cur_i * map_size + cur_j) * map_size + cur_k
+        step = (dir_i * map_size + dir_j) * map_size + dir_k
             
         while True:
             nxt_i, nxt_j, nxt_k = cur_i + dir_i, cur_j + dir_j, cur_k + dir_k
-            if nxt_i < 0 or nxt_i >= map_size or nxt_j < 0 or nxt_j >= map_size or nxt_k < 0 or nxt_k >= map_size:
-                return None
+            if nxt_i < lower_i or nxt_i > upper_i or nxt_j < lower_j or nxt_j > upper_j or \
+                    nxt_k < lower_k or nxt_k > upper_k:
+                return
             
-            nxt_node = self.grids[nxt_i, nxt_j, nxt_k] 
-            if nxt_node.is_obstacle == True:
-                return None
-            if nxt_node in self.close_list:
-                return None
+            nxt_index += step
+            if obstacle_map.item(nxt_i, nxt_j, nxt_k):
+                return
+            if state.is_closed(nxt_index):
+                return
             
-            if nxt_node.is_goal_node == True or self.has_forced_neighbor(nxt_node, dir_i, dir_j, dir_k):
-                ng = cur_node.g + cur_node.center_pnt.Distance(nxt_node.center_pnt)
-                    
-                if nxt_node.parent is None or ng < nxt_node.g:
-                    nxt_node.g = ng
-                    nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                    nxt_node.parent = cur_node
-                    heapq.heappush(self.open_list, nxt_node)
+            nxt_ijk = (nxt_i, nxt_j, nxt_k)
+            if nxt_index == self.goal_index or self.has_forced_neighbor(nxt_i, nxt_j, nxt_k, dir_i, dir_j, dir_k):
+                self.push_jump_point(src_ijk, src_index, nxt_ijk, nxt_index)
                 return
 
-            self.jump_orthogonal(nxt_node, dir_i, 0, 0)
-            self.jump_orthogonal(nxt_node, 0, dir_j, 0)
-            self.jump_orthogonal(nxt_node, 0, 0, dir_k)
+            self.jump_orthogonal(nxt_ijk, dir_i, 0, 0)
+            self.jump_orthogonal(nxt_ijk, 0, dir_j, 0)
+            self.jump_orthogonal(nxt_ijk, 0, 0, dir_k)
             
             cur_i, cur_j, cur_k = nxt_i, nxt_j, nxt_k   
-            nxt_node.parent = cur_node
-            self.close_list.add(nxt_node)   
+            state.set_parent(nxt_index, src_index)
+            state.close(nxt_index)   
     
-    def jump_diagonal3d(self, cur_node: Node, dir_i: int, dir_j: int, dir_k: int) -> None:     
+    def jump_diagonal3d(self, src_ijk: Tuple[int, int, int], dir_i: int, dir_j: int, dir_k: int) -> None:     
+        state = self.search_state
+        obstacle_map = self.grids.obstacle_map
         map_size = self.grids.map_size
-        cur_i, cur_j, cur_k = cur_node.i, cur_node.j, cur_node.k    
+        lower_i, lower_j, lower_k = self.window_lower
+        upper_i, upper_j, upper_k = self.window_upper
+        cur_i, cur_j, cur_k = src_ijk
+        src_index = nxt_index = (cur_i * map_size + cur_j) * map_size + cur_k
+        step = (dir_i * map_size + dir_j) * map_size + dir_k
             
         while True:
             nxt_i, nxt_j, nxt_k = cur_i + dir_i, cur_j + dir_j, cur_k + dir_k
-            if nxt_i < 0 or nxt_i >= map_size or nxt_j < 0 or nxt_j >= map_size or nxt_k < 0 or nxt_k >= map_size:
+            if nxt_i < lower_i or nxt_i > upper_i or nxt_j < lower_j or nxt_j > upper_j or \
+                    nxt_k < lower_k or nxt_k > upper_k:
                 return
             
-            nxt_node = self.grids[nxt_i, nxt_j, nxt_k] 
-            if nxt_node.is_obstacle == True:
+            nxt_index += step
+            if obstacle_map.item(nxt_i, nxt_j, nxt_k):
                 return
-            if nxt_node in self.close_list:
+            if state.is_closed(nxt_index):
                 return
             
-            if nxt_node.is_goal_node == True or self.has_forced_neighbor(nxt_node, dir_i, dir_j, dir_k):
-                ng = cur_node.g + cur_node.center_pnt.Distance(nxt_node.center_pnt)
-                    
-                if nxt_node.parent is None or ng < nxt_node.g:
-                    nxt_node.g = ng
-                    nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                    nxt_node.parent = cur_node
-                    heapq.heappush(self.open_list, nxt_node)
+            nxt_ijk = (nxt_i, nxt_j, nxt_k)
+            if nxt_index == self.goal_index or self.has_forced_neighbor(nxt_i, nxt_j, nxt_k, dir_i, dir_j, dir_k):
+                self.push_jump_point(src_ijk, src_index, nxt_ijk, nxt_index)
                 return
             
             
-            self.jump_orthogonal(nxt_node, dir_i, 0, 0)
-            self.jump_orthogonal(nxt_node, 0, dir_j, 0)
-            self.jump_orthogonal(nxt_node, 0, 0, dir_k)
+            self.jump_orthogonal(nxt_ijk, dir_i, 0, 0)
+            self.jump_orthogonal(nxt_ijk, 0, dir_j, 0)
+            self.jump_orthogonal(nxt_ijk, 0, 0, dir_k)
                 
             
-            self.jump_diagonal2d(nxt_node, dir_i, dir_j, 0)
-            self.jump_diagonal2d(nxt_node, dir_i, 0, dir_k)
-            self.jump_diagonal2d(nxt_node, 0, dir_j, dir_k)
+            self.jump_diagonal2d(nxt_ijk, dir_i, dir_j, 0)
+            self.jump_diagonal2d(nxt_ijk, dir_i, 0, dir_k)
+            self.jump_diagonal2d(nxt_ijk, 0, dir_j, dir_k)
 
             cur_i, cur_j, cur_k = nxt_i, nxt_j, nxt_k   
-            nxt_node.parent = cur_node
-            self.close_list.add(nxt_node)   
+            state.set_parent(nxt_index, src_index)
+            state.close(nxt_index)   
     
-    def has_forced_neighbor(self, node: Node, dir_i, dir_j, dir_k) -> bool:
+    def has_forced_neighbor(self, node_i: int, node_j: int, node_k: int, dir_i, dir_j, dir_k) -> bool:
+        self.forced_neighbor_call_number += 1
         map_size = self.grids.map_size
+        obstacle_map = self.grids.obstacle_map
         
         if dir_i != 0 and dir_j == 0 and dir_k == 0:
-            node_i, node_j, node_k = node.i, node.j, node.k    
-            for nxt_direction_col in self.direction_orthogonal_i_col:
-                col_i, col_j, col_k = node_i + nxt_direction_col[0], node_j + nxt_direction_col[1], node_k + nxt_direction_col[2]
-                if col_i < 0 or col_i >= map_size or col_j < 0 or col_j >= map_size or col_k < 0 or col_k >= map_size:
-                    continue
-                free_i, free_j, free_k = col_i + dir_i, col_j, col_k
-                if free_i < 0 or free_i >= map_size or free_j < 0 or free_j >= map_size or free_k < 0 or free_k >= map_size:    
-                    continue
-                collusion_node = self.grids[col_i, col_j, col_k]
-                free_node = self.grids[free_i, free_j, free_k] 
-                
-                if collusion_node.is_obstacle == True and free_node.is_obstacle == False:
-                    return True
-            return False
-        
-        if dir_i == 0 and dir_j != 0 and dir_k == 0:
-            node_i, node_j, node_k = node.i, node.j, node.k    
-            for nxt_direction_col in self.direction_orthogonal_j_col:
-                col_i, col_j, col_k = node_i + nxt_direction_col[0], node_j + nxt_direction_col[1], node_k + nxt_direction_col[2]
-                if col_i < 0 or col_i >= map_size or col_j < 0 or col_j >= map_size or col_k < 0 or col_k >= map_size:
-                    continue
-                free_i, free_j, free_k = col_i, col_j + dir_j, col_k
-                if free_i < 0 or free_i >= map_size or free_j < 0 or free_j >= map_size or free_k < 0 or free_k >= map_size:    
-                    continue
-                collusion_node = self.grids[col_i, col_j, col_k]
-                free_node = self.grids[free_i, free_j, free_k] 
-                
-                if collusion_node.is_obstacle == True and free_node.is_obstacle == False:
-                    return True
-            return False
+            direction_col = self.direction_orthogonal_i_col
+        elif dir_i == 0 and dir_j != 0 and dir_k == 0:
+            direction_col = self.direction_orthogonal_j_col
+        elif dir_i == 0 and dir_j == 0 and dir_k != 0:
+            direction_col = self.direction_orthogonal_k_col
+        else:
+            return True
         
-        if dir_i == 0 and dir_j == 0 and dir_k != 0:
-            node_i, node_j, node_k = node.i, node.j, node.k    
-            for nxt_direction_col in self.direction_orthogonal_k_col:
-                col_i, col_j, col_k = node_i + nxt_direction_col[0], node_j + nxt_direction_col[1], node_k + nxt_direction_col[2]
-                if col_i < 0 or col_i >= map_size or col_j < 0 or col_j >= map_size or col_k < 0 or col_k >= map_size:
-                    continue
-                free_i, free_j, free_k = col_i, col_j, col_k + dir_k
-                if free_i < 0 or free_i >= map_size or free_j < 0 or free_j >= map_size or free_k < 0 or free_k >= map_size:    
-                    continue
-                collusion_node = self.grids[col_i, col_j, col_k]
-                free_node = self.grids[free_i, free_j, free_k] 
-                
-                if collusion_node.is_obstacle == True and free_node.is_obstacle == False:
-                    return True
-            return False
-        return True
+        for col_di, col_dj, col_dk in direction_col:
+            col_i, col_j, col_k = node_i + col_di, node_j + col_dj, node_k + col_dk
+            if col_i < 0 or col_i >= map_size or col_j < 0 or col_j >= map_size or col_k < 0 or col_k >= map_size:
+                continue
+            free_i, free_j, free_k = col_i + dir_i, col_j + dir_j, col_k + dir_k
+            if free_i < 0 or free_i >= map_size or free_j < 0 or free_j >= map_size or free_k < 0 or free_k >= map_size:    
+                continue
+            if obstacle_map.item(col_i, col_j, col_k) and not obstacle_map.item(free_i, free_j, free_k):
+                return True
+        return False
 
 class AstarAlgorithmOp(GridAlgorithm):
-    def __init__(self, grids: Grids3D) -> None:
-        super().__init__(grids)
-        self.open_list: list[Node] = []
-        self.close_list = set()
-        self.grids.reset_nodes()
+    def __init__(self, grids: Grids3D, bidirectional: bool = False) -> None:
+        super().__init__(grids, bidirectional=bidirectional)
     
     
-    def search(self) -> bool:
-        start_node: Node = self.grids.start_node
-        start_node.f = start_node.center_pnt.Distance(self.grids.goal_node.center_pnt)
-        goal_node: Node = self.grids.goal_node  
-        heapq.heappush(self.open_list, start_node)
-        map_size = self.grids.map_size
+    def search_open_list(self) -> bool:
+        state = self.search_state
+        start_node: Node = self.start_node
+        goal_node: Node = self.goal_node  
+        self.push_open_list(self.get_heuristic(start_node), start_node.index)
+        has_expansion_check = self.has_expansion_check()
         while self.open_list:
-            cur_node: Node = heapq.heappop(self.open_list)
-
-            if cur_node == goal_node:
+            cur_index = self.open_list.pop()
+            if has_expansion_check:
+                self.count_pop()
+            if cur_index == goal_node.index:
                 return True
-            self.close_list.add(cur_node)
-            cur_i, cur_j, cur_k = cur_node.i, cur_node.j, cur_node.k
-            for i in range(-1, 2):
-                for j in range(-1, 2):
-                    for k in range(-1 ,2):
-                        if i == j == k == 0:    
-                            continue
-                        nei_i, nei_j, nei_k = cur_i + i, cur_j + j, cur_k + k   
-                        if nei_i < 0 or nei_j < 0 or nei_k < 0:    
-                            continue
-                        if map_size <= nei_i or map_size <= nei_j or map_size <= nei_k:
-                            continue
-                        
-                        nei_node = self.grids[nei_i, nei_j, nei_k]
-
-                        if nei_node in self.close_list or nei_node.is_obstacle:
-                            continue           
-                        
-                        nxt_node: Node = nei_node
-                        nxt_g = cur_node.g + cur_node.center_pnt.Distance(nxt_node.center_pnt)  
-
-                        if nei_node.parent is None or nxt_g < nei_node.g:
-                            nei_node.parent = cur_node
-                            nei_node.g = nxt_g
-                            nei_node.f = nxt_g + nxt_node.center_pnt.Distance(goal_node.center_pnt)
-                            heapq.heappush(self.open_list, nei_node)
+            if has_expansion_check and self.check_expansion(cur_index):
+                return False
+            state.close(cur_index)
+            self.expand(cur_index)
         return False
+    
+    def expand(self, cur_index: int) -> None:
+        state = self.search_state
+        obstacle_map = self.grids.obstacle_map
+        map_size = self.grids.map_size
+        lower_i, lower_j, lower_k = self.window_lower
+        upper_i, upper_j, upper_k = self.window_upper
+        cur_g: float = state.g[cur_index]
+        cur_ijk = cur_i, cur_j, cur_k = self.grids.get_ijk(cur_index)
+        for i in range(-1, 2):
+            for j in range(-1, 2):
+                for k in range(-1 ,2):
+                    if i == j == k == 0:    
+                        continue
+                    nei_i, nei_j, nei_k = cur_i + i, cur_j + j, cur_k + k   
+                    if nei_i < lower_i or nei_j < lower_j or nei_k < lower_k:    
+                        continue
+                    if upper_i < nei_i or upper_j < nei_j or upper_k < nei_k:
+                        continue
+                    
+                    nei_index = (nei_i * map_size + nei_j) * map_size + nei_k
 
-class JumpPointSearchTheta(GridAlgorithm):
-    def __init__(self, grids: Grids3D) -> None:
-        self.grids: Grids3D = grids
-        self.goal_node: Node = grids.goal_node
-        self.start_node: Node = grids.start_node    
-        self.open_list: list[Node] = [] 
-        self.close_list = set()
-        self.scaned_node_set = set()   
-        self.grids.reset_nodes()
-        self.scan_directions = [Direction(1, 0, 0),
-                                Direction(0, 1, 0),
-                                Direction(0, 0, 1),
-                                Direction(0, 0, -1),  
-                                Direction(0, -1, 0),    
-                                Direction(-1, 0, 0), 
-                                
-                                Direction(1, 1, 0), 
-                                Direction(1, 0, 1),
-                                Direction(0, 1, 1),
-                                
-                                Direction(-1, 1, 0),    
-                                Direction(-1, 0, 1),
-                                Direction(0, -1, 1),
-                                Direction(1, -1, 0),
-                                Direction(1, 0, -1),
-                                Direction(0, 1, -1),
-                                
-                                Direction(-1, -1, 0),
-                                Direction(-1, 0, -1),
-                                Direction(0, -1, -1),
-                                
-                                Direction(1, 1, 1),  
-                                Direction(1, 1, -1),
-                                Direction(1, -1, 1),
-                                Direction(-1, 1, 1),
-                                
-                                Direction(1, -1, -1),
-                                Direction(-1, 1, -1),
-                                Direction(-1, -1, 1),
-                                Direction(-1, -1, -1)]
-        self.direction_orthogonal_i_col = \
-                            [(0, 1, 0), 
-                            (0, -1, 0), 
-                            (0, 0, 1), 
-                            (0, 0, -1),]
+                    if state.is_closed(nei_index) or obstacle_map.item(nei_i, nei_j, nei_k):
+                        continue           
+                    
+                    nei_ijk = (nei_i, nei_j, nei_k)
+                    nxt_g = cur_g + self.get_ijk_distance(cur_ijk, nei_ijk)  
 
-        self.direction_orthogonal_j_col = \
-                            [(1, 0, 0), 
-                            (-1, 0, 0), 
-                            (0, 0, 1), 
-                            (0, 0, -1)]
-        self.direction_orthogonal_k_col = \
-                            [(1, 0, 0),
-                            (-1, 0, 0),    
-                            (0, 1, 0),
-                            (0, -1, 0)]
+                    if not state.is_visited(nei_index) or nxt_g < state.g[nei_index]:
+                        state.set_g(nei_index, nxt_g, cur_index)
+                        self.push_open_list(nxt_g + self.get_ijk_heuristic(nei_ijk, nei_index), nei_index)
+        return
 
-    def search(self):
-        self.open_list.clear()
-        self.close_list.clear()
+class JumpPointSearchTheta(JumpPointSearch):
+    """
+    description:
+        jump point search with the any-angle shortcut of theta*,
+        a jump point is linked to the parent of its source if the parent sees it
+    """
+    def push_jump_point(self, src_ijk: Tuple[int, int, int], src_index: int, 
+                        nxt_ijk: Tuple[int, int, int], nxt_index: int) -> None:
+        state = self.search_state
+        parent_index = state.get_parent(src_index)
+        if parent_index != -1:
+            parent_ijk = self.grids.get_ijk(parent_index)
+            if self.line_of_sight.has_line_of_sight(parent_ijk, nxt_ijk):
+                ng: float = state.g[parent_index] + self.get_ijk_distance(parent_ijk, nxt_ijk)
+                if not state.is_visited(nxt_index) or ng < state.g[nxt_index]:
+                    state.set_g(nxt_index, ng, parent_index)
+                    self.push_open_list(ng + self.get_ijk_heuristic(nxt_ijk, nxt_index), nxt_index)
+                return
+        ng = state.g[src_index] + self.get_ijk_distance(src_ijk, nxt_ijk)
+        if not state.is_visited(nxt_index) or ng < state.g[nxt_index]:
+            state.set_g(nxt_index, ng, src_index)
+            self.push_open_list(ng + self.get_ijk_heuristic(nxt_ijk, nxt_index), nxt_index)
+        return
+
+class AstarAlgorithmArray(GridAlgorithm):
+    """
+    description:
+        A* on flat voxel indices of the obstacle map padded by one layer of obstacles,
+        so neighbours of any searchable cell are inside the array without bounds checks.
+        neighbour offsets and step costs (1, sqrt(2), sqrt(3) x node_gap) are precomputed,
+        and closed cells are stamped in the search state instead of hashed in a set.
+        neighbours are visited in the same order as AstarAlgorithmOp.
+        a search window (set_window) or mask is searched on a copy of the padded map
+        with the voxels outside it as obstacles.
+    """
+    def __init__(self, grids: Grids3D, bidirectional: bool = False) -> None:
+        map_size: int = grids.map_size
+        self.padded_size: int = map_size + 2
+        super().__init__(grids, search_state_size=self.padded_size ** 3, bidirectional=bidirectional)
+        self.padded_obstacle_map: bytes = self.get_padded_obstacle_map()
+        self.obstacle_version: int = grids.version
+        # padded obstacle map of the whole map while a window or a mask is searched
+        self.unwindowed_obstacle_map: Optional[bytes] = None
         
-        heapq.heappush(self.open_list, self.start_node) 
+        padded_size = self.padded_size
+        node_gap = grids.node_gap
+        # (flat offset, step cost, di, dj, dk)
+        self.neighbors: List[Tuple[int, float, int, int, int]] = []
+        for i in range(-1, 2):
+            for j in range(-1, 2):
+                for k in range(-1, 2):
+                    if i == j == k == 0:
+                        continue
+                    offset = (i * padded_size + j) * padded_size + k
+                    self.neighbors.append((offset, node_gap * math.sqrt(i * i + j * j + k * k), i, j, k))
+    
+    def get_padded_index(self, i: int, j: int, k: int) -> int:
+        padded_size = self.padded_size
+        return ((i + 1) * padded_size + j + 1) * padded_size + k + 1
+    
+    def get_search_index(self, node: Node) -> int:
+        return self.get_padded_index(node.i, node.j, node.k)
+    
+    def get_padded_obstacle_map(self) -> bytes:
+        return np.pad(self.grids.obstacle_map != 0, 1, constant_values=True).astype(np.uint8).tobytes()
+    
+    def set_search_window(self, lower: Tuple[int, int, int], upper: Tuple[int, int, int]) -> None:
+        super().set_search_window(lower, upper)
+        if lower == (0, 0, 0) and upper == (self.grids.map_size - 1,) * 3:
+            self.set_search_mask(None)
+            return
+        mask = np.zeros(self.grids.obstacle_map.shape, dtype=bool)
+        mask[tuple(slice(low, high + 1) for low, high in zip(lower, upper))] = True
+        self.set_search_mask(mask)
+        return
+    
+    def set_search_mask(self, mask: Optional[np.ndarray]) -> None:
+        """
+        description:
+            the voxels outside the mask are obstacles of the padded map searched
+        Args:
+            mask (Optional[np.ndarray]): (map_size, map_size, map_size) bool, None for the whole map
+        """
+        if mask is None:
+            if self.unwindowed_obstacle_map is not None:
+                self.padded_obstacle_map, self.unwindowed_obstacle_map = self.unwindowed_obstacle_map, None
+            return
+        if self.unwindowed_obstacle_map is None:
+            self.unwindowed_obstacle_map = self.padded_obstacle_map
+        padded_size = self.padded_size
+        obstacle_map = np.frombuffer(self.unwindowed_obstacle_map, dtype=np.uint8).reshape((padded_size,) * 3)
+        padded_mask = np.pad(mask, 1, constant_values=False)
+        self.padded_obstacle_map = np.where(padded_mask, obstacle_map, 1).astype(np.uint8).tobytes()
+        return
+    
+    def begin_search(self) -> None:
+        # the padded copy follows obstacle changes between queries
+        if self.obstacle_version != self.grids.version:
+            self.padded_obstacle_map = self.get_padded_obstacle_map()
+            self.obstacle_version = self.grids.version
+        super().begin_search()
+        return
+    
+    def get_node(self, index: int) -> Node:
+        padded_size = self.padded_size
+        ij, k = divmod(index, padded_size)
+        i, j = divmod(ij, padded_size)
+        return self.grids[i - 1, j - 1, k - 1]
+    
+    def get_search_table(self, grid_table: np.ndarray) -> np.ndarray:
+        return np.pad(grid_table, 1, constant_values=0.0).reshape(-1)
+    
+    def get_index_heuristic(self, index: int) -> float:
+        if self.goal_heuristic_table is not None:
+            return self.goal_heuristic_table[index]
+        padded_size = self.padded_size
+        ij, k = divmod(index, padded_size)
+        i, j = divmod(ij, padded_size)
+        goal_ij, goal_k = divmod(self.goal_index, padded_size)
+        goal_i, goal_j = divmod(goal_ij, padded_size)
+        di, dj, dk = goal_i - i, goal_j - j, goal_k - k
+        return self.grids.node_gap * math.sqrt(di * di + dj * dj + dk * dk)
+    
+    def get_grid_indices(self, search_indices: np.ndarray) -> np.ndarray:
+        padded_size, map_size = self.padded_size, self.grids.map_size
+        ij, k = np.divmod(search_indices, padded_size)
+        i, j = np.divmod(ij, padded_size)
+        return ((i - 1) * map_size + j - 1) * map_size + k - 1
+    
+    def search_open_list(self) -> bool:
+        closed_stamp = self.search_state.closed_stamp
+        generation = self.search_state.generation
+        open_list = self.open_list
+        pop, expand = open_list.pop, self.expand
+        goal_index = self.goal_index
+        self.push_open_list(self.get_index_heuristic(self.start_index), self.start_index)
+        has_expansion_check = self.has_expansion_check()
         
-        while self.open_list:
-            cur_node: Node = heapq.heappop(self.open_list)         
-            if cur_node.is_goal_node == True:
+        # closed cells are never queued again, every pop is expanded
+        while open_list:
+            cur_index = pop()
+            if has_expansion_check:
+                self.count_pop()
+            if cur_index == goal_index:
                 return True
-            if cur_node in self.close_list:
-                continue
-            
-            self.close_list.add(cur_node)
-            self.jump_diagonal3d(cur_node, 1, 1, 1)
-            self.jump_diagonal3d(cur_node, 1, 1, -1)
-            self.jump_diagonal3d(cur_node, 1, -1, 1)
-            self.jump_diagonal3d(cur_node, -1, 1, 1)
-            self.jump_diagonal3d(cur_node, 1, -1, -1)
-            self.jump_diagonal3d(cur_node, -1, 1, -1)
-            self.jump_diagonal3d(cur_node, -1, -1, 1)
-            self.jump_diagonal3d(cur_node, -1, -1, -1)
-            
-            self.jump_diagonal2d(cur_node, 1, 1, 0)
-            self.jump_diagonal2d(cur_node, 1, 0, 1)
-            self.jump_diagonal2d(cur_node, 0, 1, 1)
-            self.jump_diagonal2d(cur_node, 1, -1, 0)
-            self.jump_diagonal2d(cur_node, 1, 0, -1)
-            self.jump_diagonal2d(cur_node, 0, 1, -1)
-            self.jump_diagonal2d(cur_node, -1, 1, 0)
-            self.jump_diagonal2d(cur_node, -1, 0, 1)
-            self.jump_diagonal2d(cur_node, 0, -1, 1)
-            self.jump_diagonal2d(cur_node, -1, -1, 0)
-            self.jump_diagonal2d(cur_node, -1, 0, -1)
-            self.jump_diagonal2d(cur_node, 0, -1, -1)
-            
-            self.jump_orthogonal(cur_node, 1, 0, 0) 
-            self.jump_orthogonal(cur_node, 0, 1, 0)
-            self.jump_orthogonal(cur_node, 0, 0, 1)
-            self.jump_orthogonal(cur_node, -1, 0, 0)
-            self.jump_orthogonal(cur_node, 0, -1, 0)
-            self.jump_orthogonal(cur_node, 0, 0, -1) 
-            
+            if has_expansion_check and self.check_expansion(cur_index):
+                return False
+            closed_stamp[cur_index] = generation
+            expand(cur_index)
         return False
-            
-    def jump_orthogonal(self, cur_node: Node, dir_i: int, dir_j: int, dir_k: int) -> None:     
-        if dir_i == 0 and dir_j == 0 and dir_k == 0:
-            return
+    
+    def expand(self, cur_index: int) -> None:
+        state = self.search_state
+        generation = state.generation
+        g, parent = state.g, state.parent
+        visited_stamp, closed_stamp = state.visited_stamp, state.closed_stamp
+        obstacle_map = self.padded_obstacle_map
+        sqrt = math.sqrt
+        # successors are pushed together at the end of the expansion
+        successor_indices: List[int] = []
+        successor_fs: List[float] = []
+        heuristic_table, start_heuristic_table = self.goal_heuristic_table, self.start_heuristic_table
         
-        map_size = self.grids.map_size
-        cur_i, cur_j, cur_k = cur_node.i, cur_node.j, cur_node.k    
-        while True:
-            nxt_i, nxt_j, nxt_k = cur_i + dir_i, cur_j + dir_j, cur_k + dir_k
-            if nxt_i < 0 or nxt_i >= map_size or nxt_j < 0 or nxt_j >= map_size or nxt_k < 0 or nxt_k >= map_size:
-                return
+        padded_size = self.padded_size
+        node_gap = self.grids.node_gap
+        goal_ij, goal_k = divmod(self.goal_index, padded_size)
+        goal_i, goal_j = divmod(goal_ij, padded_size)
+        cur_ij, cur_k = divmod(cur_index, padded_size)
+        cur_i, cur_j = divmod(cur_ij, padded_size)
+        
+        cur_g = g[cur_index]
+        dist_i, dist_j, dist_k = goal_i - cur_i, goal_j - cur_j, goal_k - cur_k
+        balanced_heuristic = self.balanced_heuristic
+        if balanced_heuristic:
+            start_ij, start_k = divmod(self.start_index, padded_size)
+            start_i, start_j = divmod(start_ij, padded_size)
+            start_dist_i, start_dist_j, start_dist_k = start_i - cur_i, start_j - cur_j, start_k - cur_k
+        for offset, step_cost, di, dj, dk in self.neighbors:
+            nei_index = cur_index + offset
+            if obstacle_map[nei_index] or closed_stamp[nei_index] == generation:
+                continue
             
-            nxt_node = self.grids[nxt_i, nxt_j, nxt_k] 
-            if nxt_node.is_obstacle == True:
-                return
-            if nxt_node in self.close_list:
-                return
-
-            if nxt_node.is_goal_node == True or self.has_forced_neighbor(nxt_node, dir_i, dir_j, dir_k):
-                if cur_node.parent is not None and self.has_line_of_sight(cur_node.parent, nxt_node):
-                    ng: float = cur_node.parent.g + cur_node.parent.center_pnt.Distance(nxt_node.center_pnt)  
-                    if nxt_node.parent is None or ng < nxt_node.g:
-                        nxt_node.g = ng
-                        nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                        nxt_node.parent = cur_node.parent
-                        heapq.heappush(self.open_list, nxt_node)    
+            nxt_g = cur_g + step_cost
+            if visited_stamp[nei_index] != generation or nxt_g < g[nei_index]:
+                visited_stamp[nei_index] = generation
+                g[nei_index] = nxt_g
+                parent[nei_index] = cur_index
+                if heuristic_table is not None:
+                    h = heuristic_table[nei_index]
+                    if balanced_heuristic:
+                        h = 0.5 * (h - start_heuristic_table[nei_index])
                 else:
-                    ng = cur_node.g + cur_node.center_pnt.Distance(nxt_node.center_pnt)
-                    
-                    if nxt_node.parent is None or ng < nxt_node.g:
-                        nxt_node.g = ng
-                        nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                        nxt_node.parent = cur_node
-                        heapq.heappush(self.open_list, nxt_node)
-                return
-            
-            nxt_node.parent = cur_node
-            cur_i, cur_j, cur_k = nxt_i, nxt_j, nxt_k   
-            self.close_list.add(nxt_node)   
+                    hi, hj, hk = dist_i - di, dist_j - dj, dist_k - dk
+                    h = node_gap * sqrt(hi * hi + hj * hj + hk * hk)
+                    if balanced_heuristic:
+                        hi, hj, hk = start_dist_i - di, start_dist_j - dj, start_dist_k - dk
+                        h = 0.5 * (h - node_gap * sqrt(hi * hi + hj * hj + hk * hk))
+                successor_indices.append(nei_index)
+                successor_fs.append(nxt_g + h)
+        self.open_list.push_all(successor_indices, successor_fs)
+        return
 
-            
-    def jump_diagonal2d(self, cur_node: Node, dir_i: int, dir_j: int, dir_k: int) -> Optional[Node]:     
-        map_size = self.grids.map_size
-        cur_i, cur_j, cur_k = cur_node.i, cur_node.j, cur_node.k    
-            
-        while True:
-            nxt_i, nxt_j, nxt_k = cur_i + dir_i, cur_j + dir_j, cur_k + dir_k
-            if nxt_i < 0 or nxt_i >= map_size or nxt_j < 0 or nxt_j >= map_size or nxt_k < 0 or nxt_k >= map_size:
-                return None
-            
-            nxt_node = self.grids[nxt_i, nxt_j, nxt_k] 
-            if nxt_node.is_obstacle == True:
-                return None
-            if nxt_node in self.close_list:
-                return None
-            
-            if nxt_node.is_goal_node == True or self.has_forced_neighbor(nxt_node, dir_i, dir_j, dir_k):
-                if cur_node.parent is not None and self.has_line_of_sight(cur_node.parent, nxt_node):
-                    ng: float = cur_node.parent.g + cur_node.parent.center_pnt.Distance(nxt_node.center_pnt)  
-                    if nxt_node.parent is None or ng < nxt_node.g:
-                        nxt_node.g = ng
-                        nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                        nxt_node.parent = cur_node.parent
-                        heapq.heappush(self.open_list, nxt_node)    
-                else:
-                    ng = cur_node.g + cur_node.center_pnt.Distance(nxt_node.center_pnt)
-                    
-                    if nxt_node.parent is None or ng < nxt_node.g:
-                        nxt_node.g = ng
-                        nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                        nxt_node.parent = cur_node
-                        heapq.heappush(self.open_list, nxt_node)
-                return
 
-            self.jump_orthogonal(nxt_node, dir_i, 0, 0)
-            self.jump_orthogonal(nxt_node, 0, dir_j, 0)
-            self.jump_orthogonal(nxt_node, 0, 0, dir_k)
-            
-            cur_i, cur_j, cur_k = nxt_i, nxt_j, nxt_k   
-            nxt_node.parent = cur_node
-            self.close_list.add(nxt_node)   
+class JumpPointSearchPlus(GridAlgorithm):
+    """
+    description:
+        jump point search on the precomputed JumpTable (JPS+).
+        a jump in any of the 26 directions is a single table lookup,
+        the goal is detected on orthogonal runs at query time.
+        the jumps of the table cross any window, it searches the whole map.
+    """
+    HAS_WINDOW_SEARCH: bool = False
     
-    def jump_diagonal3d(self, cur_node: Node, dir_i: int, dir_j: int, dir_k: int) -> None:     
+    def __init__(self, grids: Grids3D, jump_table: Optional[JumpTable] = None, bidirectional: bool = False) -> None:
+        super().__init__(grids, bidirectional=bidirectional)
+        if jump_table is None:
+            jump_table = JumpTable.get_jump_table(grids)
+        self.jump_table: JumpTable = jump_table
+        
+        map_size = grids.map_size
+        node_gap = grids.node_gap
+        # (flat offset, step cost, di, dj, dk) in the order of JumpTable.DIRECTIONS
+        self.directions: List[Tuple[int, float, int, int, int]] = []
+        for i, j, k in JumpTable.DIRECTIONS:
+            offset = (i * map_size + j) * map_size + k
+            self.directions.append((offset, node_gap * math.sqrt(i * i + j * j + k * k), i, j, k))
+    
+    def begin_search(self) -> None:
+        # the jump table follows obstacle changes between queries
+        if self.jump_table.version != self.grids.version:
+            self.jump_table = JumpTable.get_jump_table(self.grids)
+        super().begin_search()
+        return
+    
+    def search_open_list(self) -> bool:
+        closed_stamp = self.search_state.closed_stamp
+        generation = self.search_state.generation
+        open_list = self.open_list
+        pop, expand = open_list.pop, self.expand
+        goal_index = self.goal_index
+        self.push_open_list(self.get_heuristic(self.start_node), self.start_index)
+        has_expansion_check = self.has_expansion_check()
+        
+        # closed cells are never queued again, every pop is expanded
+        while open_list:
+            cur_index = pop()
+            if has_expansion_check:
+                self.count_pop()
+            if cur_index == goal_index:
+                return True
+            if has_expansion_check and self.check_expansion(cur_index):
+                return False
+            closed_stamp[cur_index] = generation
+            expand(cur_index)
+        return False
+    
+    def expand(self, cur_index: int) -> None:
+        state = self.search_state
+        generation = state.generation
+        g, parent = state.g, state.parent
+        visited_stamp, closed_stamp = state.visited_stamp, state.closed_stamp
+        flat_distances = self.jump_table.flat_distances
+        sqrt = math.sqrt
+        # successors are pushed together at the end of the expansion
+        successor_indices: List[int] = []
+        successor_fs: List[float] = []
+        heuristic_table, start_heuristic_table = self.goal_heuristic_table, self.start_heuristic_table
+        orthogonal_number = len(JumpTable.ORTHOGONAL_DIRECTIONS)
+        
         map_size = self.grids.map_size
-        cur_i, cur_j, cur_k = cur_node.i, cur_node.j, cur_node.k    
-            
-        while True:
-            nxt_i, nxt_j, nxt_k = cur_i + dir_i, cur_j + dir_j, cur_k + dir_k
-            if nxt_i < 0 or nxt_i >= map_size or nxt_j < 0 or nxt_j >= map_size or nxt_k < 0 or nxt_k >= map_size:
-                return
-            
-            nxt_node = self.grids[nxt_i, nxt_j, nxt_k] 
-            if nxt_node.is_obstacle == True:
-                return
-            if nxt_node in self.close_list:
-                return
+        map_size_2 = map_size * map_size
+        node_gap = self.grids.node_gap
+        goal_i, goal_j, goal_k = self.goal_node.i, self.goal_node.j, self.goal_node.k
+        
+        cur_g = g[cur_index]
+        cur_i, rest = divmod(cur_index, map_size_2)
+        cur_j, cur_k = divmod(rest, map_size)
+        dist_i, dist_j, dist_k = goal_i - cur_i, goal_j - cur_j, goal_k - cur_k
+        balanced_heuristic = self.balanced_heuristic
+        if balanced_heuristic:
+            start_dist_i = self.start_node.i - cur_i
+            start_dist_j = self.start_node.j - cur_j
+            start_dist_k = self.start_node.k - cur_k
+        for d, (offset, step_cost, di, dj, dk) in enumerate(self.directions):
+            jump = flat_distances[d][cur_index]
+            if jump == 0:
+                continue
+            if d < orthogonal_number:
+                # stop at the goal if it is on the run
+                reach = jump if jump > 0 else -jump
+                t = dist_i * di + dist_j * dj + dist_k * dk
+                if 0 < t <= reach and dist_i == t * di and dist_j == t * dj and dist_k == t * dk:
+                    jump = t
+                elif jump < 0:
+                    continue
+            elif jump < 0:
+                continue
             
-            if nxt_node.is_goal_node == True or self.has_forced_neighbor(nxt_node, dir_i, dir_j, dir_k):
-                if cur_node.parent is not None and self.has_line_of_sight(cur_node.parent, nxt_node):
-                    ng: float = cur_node.parent.g + cur_node.parent.center_pnt.Distance(nxt_node.center_pnt)  
-                    if nxt_node.parent is None or ng < nxt_node.g:
-                        nxt_node.g = ng
-                        nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                        nxt_node.parent = cur_node.parent
-                        heapq.heappush(self.open_list, nxt_node)    
+            nxt_index = cur_index + jump * offset
+            if closed_stamp[nxt_index] == generation:
+                continue
+            nxt_g = cur_g + jump * step_cost
+            if visited_stamp[nxt_index] != generation or nxt_g < g[nxt_index]:
+                visited_stamp[nxt_index] = generation
+                g[nxt_index] = nxt_g
+                parent[nxt_index] = cur_index
+                if heuristic_table is not None:
+                    h = heuristic_table[nxt_index]
+                    if balanced_heuristic:
+                        h = 0.5 * (h - start_heuristic_table[nxt_index])
                 else:
-                    ng = cur_node.g + cur_node.center_pnt.Distance(nxt_node.center_pnt)
-                    
-                    if nxt_node.parent is None or ng < nxt_node.g:
-                        nxt_node.g = ng
-                        nxt_node.f = ng + nxt_node.center_pnt.Distance(self.goal_node.center_pnt)
-                        nxt_node.parent = cur_node
-                        heapq.heappush(self.open_list, nxt_node)
-                return
-            
-            
-            self.jump_orthogonal(nxt_node, dir_i, 0, 0)
-            self.jump_orthogonal(nxt_node, 0, dir_j, 0)
-            self.jump_orthogonal(nxt_node, 0, 0, dir_k)
-                
-            
-            self.jump_diagonal2d(nxt_node, dir_i, dir_j, 0)
-            self.jump_diagonal2d(nxt_node, dir_i, 0, dir_k)
-            self.jump_diagonal2d(nxt_node, 0, dir_j, dir_k)
+                    hi, hj, hk = dist_i - jump * di, dist_j - jump * dj, dist_k - jump * dk
+                    h = node_gap * sqrt(hi * hi + hj * hj + hk * hk)
+                    if balanced_heuristic:
+                        hi, hj, hk = start_dist_i - jump * di, start_dist_j - jump * dj, start_dist_k - jump * dk
+                        h = 0.5 * (h - node_gap * sqrt(hi * hi + hj * hj + hk * hk))
+                successor_indices.append(nxt_index)
+                successor_fs.append(nxt_g + h)
+        self.open_list.push_all(successor_indices, successor_fs)
+        return
 
-            cur_i, cur_j, cur_k = nxt_i, nxt_j, nxt_k   
-            nxt_node.parent = cur_node
-            self.close_list.add(nxt_node)   
+
+class AstarAlgorithmHierarchical(AstarAlgorithmArray):
+    """
+    description:
+        coarse to fine search on the GridPyramid of the grids (HPA*-style).
+        the route is found on the coarsest level with a path, then every finer level
+        is searched only in a corridor, the blocks of the coarser path grown by corridor_width blocks.
+        a refinement without a path doubles the corridor width until the corridor covers the level,
+        the finest level is AstarAlgorithmArray on the voxels of the corridor.
+        coarse levels close narrow passages, without a path on a level the next finer one is tried.
+        the path is optimal inside the last corridor, not on the whole map.
+    """
+    HAS_WINDOW_SEARCH: bool = False
+    HAS_BIDIRECTIONAL_SEARCH: bool = False
+    CORRIDOR_WIDTH: int = 1
     
-    def has_forced_neighbor(self, node: Node, dir_i, dir_j, dir_k) -> bool:
-        map_size = self.grids.map_size
-        
-        if dir_i != 0 and dir_j == 0 and dir_k == 0:
-            node_i, node_j, node_k = node.i, node.j, node.k    
-            for nxt_direction_col in self.direction_orthogonal_i_col:
-                col_i, col_j, col_k = node_i + nxt_direction_col[0], node_j + nxt_direction_col[1], node_k + nxt_direction_col[2]
-                if col_i < 0 or col_i >= map_size or col_j < 0 or col_j >= map_size or col_k < 0 or col_k >= map_size:
-                    continue
-                free_i, free_j, free_k = col_i + dir_i, col_j, col_k
-                if free_i < 0 or free_i >= map_size or free_j < 0 or free_j >= map_size or free_k < 0 or free_k >= map_size:    
-                    continue
-                collusion_node = self.grids[col_i, col_j, col_k]
-                free_node = self.grids[free_i, free_j, free_k] 
-                
-                if collusion_node.is_obstacle == True and free_node.is_obstacle == False:
-                    return True
+    def __init__(self, grids: Grids3D, level_number: int = GridPyramid.LEVEL_NUMBER, 
+                 corridor_width: int = CORRIDOR_WIDTH) -> None:
+        if level_number < 0:
+            raise ValueError("AstarAlgorithmHierarchical: level_number must not be negative")
+        if corridor_width < 0:
+            raise ValueError("AstarAlgorithmHierarchical: corridor_width must not be negative")
+        super().__init__(grids)
+        self.level_number: int = level_number
+        self.corridor_width: int = corridor_width
+        # searches of the levels by the last search, refinements with a wider corridor included
+        self.level_search_number: int = 0
+        self.budget: Optional[Tuple[int, float]] = None
+    
+    @traced_search
+    def search(self) -> bool:
+        if self.reject_unreachable():
             return False
+        grid_pyramid = GridPyramid.get_grid_pyramid(self.grids, self.level_number)
+        start_ijk = (self.start_node.i, self.start_node.j, self.start_node.k)
+        goal_ijk = (self.goal_node.i, self.goal_node.j, self.goal_node.k)
+        self.level_search_number = 0
+        self.budget = None
         
-        if dir_i == 0 and dir_j != 0 and dir_k == 0:
-            node_i, node_j, node_k = node.i, node.j, node.k    
-            for nxt_direction_col in self.direction_orthogonal_j_col:
-                col_i, col_j, col_k = node_i + nxt_direction_col[0], node_j + nxt_direction_col[1], node_k + nxt_direction_col[2]
-                if col_i < 0 or col_i >= map_size or col_j < 0 or col_j >= map_size or col_k < 0 or col_k >= map_size:
-                    continue
-                free_i, free_j, free_k = col_i, col_j + dir_j, col_k
-                if free_i < 0 or free_i >= map_size or free_j < 0 or free_j >= map_size or free_k < 0 or free_k >= map_size:    
-                    continue
-                collusion_node = self.grids[col_i, col_j, col_k]
-                free_node = self.grids[free_i, free_j, free_k] 
-                
-                if collusion_node.is_obstacle == True and free_node.is_obstacle == False:
-                    return True
+        # the coarsest level with a path
+        level, path_ijks = self.level_number, None
+        while level > 0:
+            self.level_search_number += 1
+            path_ijks = grid_pyramid.get_level_path(level, start_ijk, goal_ijk)
+            if path_ijks is not None:
+                break
+            level -= 1
+        
+        # refined level by level in corridors around the coarser path
+        while level > 0:
+            width = self.corridor_width
+            while True:
+                corridor = grid_pyramid.get_corridor(level, path_ijks, width)
+                if level > 1:
+                    self.level_search_number += 1
+                    refined_ijks = grid_pyramid.get_level_path(level - 1, start_ijk, goal_ijk, corridor)
+                    is_found = refined_ijks is not None
+                else:
+                    is_found = self.search_corridor(corridor)
+                    if self.is_budget_exceeded:
+                        return False
+                if is_found or corridor.all():
+                    break
+                width = 2 * width if width > 0 else 1
+            if not is_found:
+                # the terminal blocks of the coarser path hide a path that only exists outside them
+                break
+            if level == 1:
+                return True
+            level, path_ijks = level - 1, refined_ijks
+        return self.search_corridor(None)
+    
+    def search_corridor(self, corridor: Optional[np.ndarray]) -> bool:
+        """
+        Args:
+            corridor (Optional[np.ndarray]): bool mask of the voxels searched, None for the whole map
+        """
+        self.level_search_number += 1
+        self.begin_search()
+        if self.budget is not None:
+            # begin_search() starts a new budget
+            self.budget_expanded_number, self.deadline = self.budget
+        self.set_search_mask(corridor)
+        try:
+            is_found = self.search_open_list()
+        finally:
+            self.set_search_mask(None)
+        self.budget = (self.budget_expanded_number, self.deadline)
+        return is_found
+
+
+class DistanceFieldSearch(GridAlgorithm):
+    """
+    description:
+        one to many routing on the DistanceFieldCache of the grids. the first search from a terminal
+        runs one dijkstra over the whole free space, every later route from or to that terminal
+        is read from the parents of its field in O(path length). a field cached for the goal is used
+        before a new field of the start is built, so routes fanning in to a connector share it too.
+        the paths are shortest 26-connected grid paths like AstarAlgorithmOp,
+        the budget is not checked during the dijkstra.
+    """
+    HAS_WINDOW_SEARCH: bool = False
+    HAS_BIDIRECTIONAL_SEARCH: bool = False
+
+    def __init__(self, grids: Grids3D) -> None:
+        super().__init__(grids)
+        # flat indices from the goal to the start of the last search
+        self.path_indices: List[int] = []
+    
+    @traced_search
+    def search(self) -> bool:
+        self.path_indices = []
+        if self.reject_unreachable():
             return False
+        self.begin_search()
+        distance_field_cache = DistanceFieldCache.get_distance_field_cache(self.grids)
+        start_ijk = (self.start_node.i, self.start_node.j, self.start_node.k)
+        goal_ijk = (self.goal_node.i, self.goal_node.j, self.goal_node.k)
+        goal_field = distance_field_cache.get_cached_distance_field(self.grids, goal_ijk)
+        if goal_field is not None and self.grids.obstacle_map[start_ijk] == 0:
+            # start to goal on the field of the goal
+            self.path_indices = goal_field.get_path_indices(self.start_index)
+            self.path_indices.reverse()
+        else:
+            start_field = distance_field_cache.get_distance_field(self.grids, start_ijk)
+            self.path_indices = start_field.get_path_indices(self.goal_index)
+        return len(self.path_indices) > 0
+    
+    def get_path_indices(self) -> List[int]:
+        return list(self.path_indices)
+
+
+class AstarAlgorithmIncremental(AstarAlgorithmArray):
+    """
+    description:
+        lifelong planning A* (LPA*) for a fixed start and goal on the padded flat indices
+        of AstarAlgorithmArray. g, rhs and the priority queue are kept between calls,
+        so search() after an obstacle change repairs only the vertices whose cost
+        is affected instead of searching from scratch.
+        changed voxels are read from the change log of the grids (or given to replan()),
+        the first call and a call after set_terminals are a full search.
+    """
+    HAS_WINDOW_SEARCH: bool = False
+    HAS_BIDIRECTIONAL_SEARCH: bool = False
+    
+    def __init__(self, grids: Grids3D) -> None:
+        super().__init__(grids)
+        self.is_initialized: bool = False
+        self.is_found: bool = False
+        # search tree kept between calls, the pooled search state is not used
+        self.g: array = array('d')
+        self.rhs: array = array('d')
+        # keys are (min(g, rhs) + h, min(g, rhs)) tuples
+        self.open_list = LazyDeletionHeap(self.padded_size ** 3, has_tuple_keys=True)
+        # vertices expanded by the last call
+        self.expanded_number: int = 0
+    
+    def get_padded_obstacle_map(self) -> bytearray:
+        # changed voxels are written in place
+        return bytearray(super().get_padded_obstacle_map())
+    
+    def set_terminals(self, start_node: Node, goal_node: Node) -> None:
+        super().set_terminals(start_node, goal_node)
+        self.is_initialized = False
+        return
+    
+    def initialize(self) -> None:
+        size = self.padded_size ** 3
+        self.padded_obstacle_map = self.get_padded_obstacle_map()
+        self.obstacle_version = self.grids.version
+        self.g = array('d', [math.inf]) * size
+        self.rhs = array('d', [math.inf]) * size
+        self.open_list.clear()
+        # keys must not change between calls, the heuristic table of the first search is kept
+        self.begin_heuristic()
+        self.rhs[self.start_index] = 0.0
+        self.push_vertex(self.start_index)
+        self.is_initialized = True
+        return
+    
+    def get_key(self, index: int) -> Tuple[float, float]:
+        g_rhs = min(self.g[index], self.rhs[index])
+        return (g_rhs + self.get_index_heuristic(index), g_rhs)
+    
+    def push_vertex(self, index: int) -> None:
+        # the key of a queued vertex is changed in place, it may increase
+        self.open_list.update(index, self.get_key(index))
+        return
+    
+    def update_vertex(self, index: int) -> None:
+        g, rhs = self.g, self.rhs
+        if index != self.start_index:
+            best_rhs = math.inf
+            if not self.padded_obstacle_map[index]:
+                obstacle_map = self.padded_obstacle_map
+                for offset, step_cost, _, _, _ in self.neighbors:
+                    nei_index = index + offset
+                    if obstacle_map[nei_index]:
+                        continue
+                    nei_rhs = g[nei_index] + step_cost
+                    if nei_rhs < best_rhs:
+                        best_rhs = nei_rhs
+            rhs[index] = best_rhs
+        if g[index] != rhs[index]:
+            self.push_vertex(index)
+        else:
+            self.open_list.remove(index)
+        return
+    
+    def apply_changes(self, changes: Optional[List[Tuple[int, int, int]]]) -> None:
+        grids = self.grids
+        if changes is None:
+            changes = grids.get_obstacle_changes(self.obstacle_version)
+        if changes is None:
+            # changes are not recorded, compare the whole map
+            padded_obstacle_map = np.frombuffer(bytes(self.padded_obstacle_map), dtype=np.uint8)
+            padded_obstacle_map = padded_obstacle_map.reshape((self.padded_size,) * 3)[1:-1, 1:-1, 1:-1]
+            changes = [tuple(ijk) for ijk in np.argwhere(padded_obstacle_map != (grids.obstacle_map != 0)).tolist()]
         
-        if dir_i == 0 and dir_j == 0 and dir_k != 0:
-            node_i, node_j, node_k = node.i, node.j, node.k    
-            for nxt_direction_col in self.direction_orthogonal_k_col:
-                col_i, col_j, col_k = node_i + nxt_direction_col[0], node_j + nxt_direction_col[1], node_k + nxt_direction_col[2]
-                if col_i < 0 or col_i >= map_size or col_j < 0 or col_j >= map_size or col_k < 0 or col_k >= map_size:
-                    continue
-                free_i, free_j, free_k = col_i, col_j, col_k + dir_k
-                if free_i < 0 or free_i >= map_size or free_j < 0 or free_j >= map_size or free_k < 0 or free_k >= map_size:    
+        obstacle_map = self.padded_obstacle_map
+        for i, j, k in changes:
+            index = self.get_padded_index(i, j, k)
+            is_obstacle = 1 if grids.obstacle_map[i, j, k] else 0
+            if obstacle_map[index] == is_obstacle:
+                continue
+            obstacle_map[index] = is_obstacle
+            self.update_vertex(index)
+            for offset, _, _, _, _ in self.neighbors:
+                self.update_vertex(index + offset)
+        self.obstacle_version = grids.version
+        return
+    
+    def compute_shortest_path(self) -> None:
+        g, rhs = self.g, self.rhs
+        open_list = self.open_list
+        goal_index = self.goal_index
+        neighbors = self.neighbors
+        has_expansion_check = self.has_expansion_check()
+        # queued vertices are the inconsistent ones, with their current keys
+        while open_list:
+            key, index = open_list.peek()
+            if key >= self.get_key(goal_index) and g[goal_index] == rhs[goal_index]:
+                break
+            open_list.pop()
+            if has_expansion_check:
+                self.count_pop()
+                if self.check_expansion(index):
+                    # the vertex stays queued for the next call
+                    open_list.push(index, key)
+                    break
+            self.expanded_number += 1
+            if g[index] > rhs[index]:
+                g[index] = rhs[index]
+            else:
+                g[index] = math.inf
+                self.update_vertex(index)
+            for offset, _, _, _, _ in neighbors:
+                self.update_vertex(index + offset)
+        return
+    
+    @traced_search
+    def replan(self, changes: Optional[List[Tuple[int, int, int]]] = None) -> bool:
+        """
+        Args:
+            changes (Optional[List[Tuple[int, int, int]]]): voxels changed since the last call,
+                read from the change log of the grids if None
+        Returns:
+            bool: True if the goal is reachable
+        """
+        self.expanded_number = 0
+        self.begin_budget()
+        if not self.is_initialized:
+            self.initialize()
+        elif changes is not None or self.obstacle_version != self.grids.version:
+            self.apply_changes(changes)
+        
+        # inconsistent vertices stay queued, the repair continues on a later call
+        if self.check_reachability and not self.is_reachable():
+            self.is_found = False
+            return False
+        self.compute_shortest_path()
+        # an interrupted repair is continued by the next call, g of the goal is not final yet
+        self.is_found = not self.is_budget_exceeded and self.g[self.goal_index] != math.inf
+        return self.is_found
+    
+    def search(self) -> bool:
+        return self.replan()
+    
+    def get_path_indices(self) -> List[int]:
+        """
+        Returns:
+            List[int]: padded indices from the goal to the start along the smallest g + step cost
+        """
+        if not self.is_found:
+            return []
+        g, obstacle_map = self.g, self.padded_obstacle_map
+        index = self.goal_index
+        path_indices = [index]
+        while index != self.start_index:
+            best_index, best_g = -1, math.inf
+            for offset, step_cost, _, _, _ in self.neighbors:
+                nei_index = index + offset
+                if obstacle_map[nei_index]:
                     continue
-                collusion_node = self.grids[col_i, col_j, col_k]
-                free_node = self.grids[free_i, free_j, free_k] 
-                
-                if collusion_node.is_obstacle == True and free_node.is_obstacle == False:
-                    return True
+                nei_g = g[nei_index] + step_cost
+                if nei_g < best_g:
+                    best_index, best_g = nei_index, nei_g
+            if best_index == -1:
+                return []
+            index = best_index
+            path_indices.append(index)
+            if len(path_indices) > len(g):
+                raise RuntimeError("AstarAlgorithmIncremental: path indices make a cycle")
+        return path_indices
+
+
+class AstarAlgorithmAnytime(AstarAlgorithmArray):
+    """
+    description:
+        anytime repairing A* (ARA*) on the padded flat indices of AstarAlgorithmArray.
+        the first path is found with the heuristic inflated by initial_weight, then the weight
+        is decreased by weight_step down to 1 and every iteration improves the path reusing
+        the g-costs of the previous ones. nodes improved after they are closed wait in
+        an inconsistent list for the next iteration instead of being expanded again.
+        with a budget (set_budget) the search stops when it runs out and keeps the best path,
+        suboptimality_bound is the proven ratio of its distance to the optimal one.
+    """
+    HAS_WINDOW_SEARCH: bool = False
+    HAS_BIDIRECTIONAL_SEARCH: bool = False
+    
+    def __init__(self, grids: Grids3D, initial_weight: float = 3.0, weight_step: float = 0.5) -> None:
+        if initial_weight < 1.0:
+            raise ValueError("AstarAlgorithmAnytime: initial_weight must be at least 1")
+        if weight_step <= 0.0:
+            raise ValueError("AstarAlgorithmAnytime: weight_step must be positive")
+        super().__init__(grids)
+        self.initial_weight: float = initial_weight
+        self.weight_step: float = weight_step
+        self.weight: float = initial_weight
+        self.suboptimality_bound: float = math.inf
+        # closed stamps of the iterations, an iteration closes nodes stamped with its own number
+        self.iteration_stamp: array = array('l', [0]) * (self.padded_size ** 3)
+        self.iteration: int = 0
+        self.inconsistent_indices: List[int] = []
+    
+    @traced_search
+    def search(self) -> bool:
+        self.suboptimality_bound = math.inf
+        if self.reject_unreachable():
             return False
-        return True
\ No newline at end of file
+        self.begin_search()
+        self.weight = self.initial_weight
+        self.inconsistent_indices = []
+        self.iteration += 1
+        self.push_open_list(self.weight * self.get_index_heuristic(self.start_index), self.start_index)
+        
+        while True:
+            self.improve_path()
+            self.suboptimality_bound = self.get_suboptimality_bound()
+            if self.is_budget_exceeded or self.weight == 1.0 or self.suboptimality_bound in (1.0, math.inf):
+                break
+            self.weight = max(1.0, self.weight - self.weight_step)
+            self.begin_iteration()
+        return self.search_state.get_g(self.goal_index) != math.inf
+    
+    def begin_iteration(self) -> None:
+        # open and inconsistent nodes are queued again with the new weight
+        state = self.search_state
+        g, generation, visited_stamp = state.g, state.generation, state.visited_stamp
+        indices = set(self.open_list.get_indices())
+        indices.update(self.inconsistent_indices)
+        self.iteration += 1
+        self.inconsistent_indices = []
+        self.open_list.clear()
+        for index in indices:
+            if visited_stamp[index] == generation:
+                self.push_open_list(g[index] + self.weight * self.get_index_heuristic(index), index)
+        return
+    
+    def improve_path(self) -> None:
+        state = self.search_state
+        iteration_stamp, iteration = self.iteration_stamp, self.iteration
+        open_list = self.open_list
+        expand = self.expand
+        goal_index = self.goal_index
+        has_expansion_check = self.has_expansion_check()
+        # the goal is not expanded, the iteration ends once no open node can improve it.
+        # nodes closed in this iteration are not queued again, they wait in the inconsistent list
+        while open_list:
+            f, cur_index = open_list.peek()
+            if state.get_g(goal_index) <= f:
+                break
+            open_list.pop()
+            if has_expansion_check:
+                self.count_pop()
+            if has_expansion_check and self.check_expansion(cur_index):
+                # the open list stays complete for the bound
+                open_list.push(cur_index, f)
+                return
+            iteration_stamp[cur_index] = iteration
+            expand(cur_index)
+        return
+    
+    def expand(self, cur_index: int) -> None:
+        state = self.search_state
+        generation = state.generation
+        g, parent, visited_stamp = state.g, state.parent, state.visited_stamp
+        iteration_stamp, iteration = self.iteration_stamp, self.iteration
+        obstacle_map = self.padded_obstacle_map
+        inconsistent_indices = self.inconsistent_indices
+        sqrt = math.sqrt
+        # successors are pushed together at the end of the expansion
+        successor_indices: List[int] = []
+        successor_fs: List[float] = []
+        heuristic_table, weight = self.goal_heuristic_table, self.weight
+        
+        padded_size = self.padded_size
+        node_gap_weight = self.grids.node_gap * self.weight
+        goal_ij, goal_k = divmod(self.goal_index, padded_size)
+        goal_i, goal_j = divmod(goal_ij, padded_size)
+        cur_ij, cur_k = divmod(cur_index, padded_size)
+        cur_i, cur_j = divmod(cur_ij, padded_size)
+        dist_i, dist_j, dist_k = goal_i - cur_i, goal_j - cur_j, goal_k - cur_k
+        cur_g = g[cur_index]
+        for offset, step_cost, di, dj, dk in self.neighbors:
+            nei_index = cur_index + offset
+            if obstacle_map[nei_index]:
+                continue
+            nxt_g = cur_g + step_cost
+            if visited_stamp[nei_index] == generation and nxt_g >= g[nei_index]:
+                continue
+            visited_stamp[nei_index] = generation
+            g[nei_index] = nxt_g
+            parent[nei_index] = cur_index
+            if iteration_stamp[nei_index] == iteration:
+                inconsistent_indices.append(nei_index)
+                continue
+            if heuristic_table is not None:
+                h = weight * heuristic_table[nei_index]
+            else:
+                hi, hj, hk = dist_i - di, dist_j - dj, dist_k - dk
+                h = node_gap_weight * sqrt(hi * hi + hj * hj + hk * hk)
+            successor_indices.append(nei_index)
+            successor_fs.append(nxt_g + h)
+        self.open_list.push_all(successor_indices, successor_fs)
+        return
+    
+    def get_suboptimality_bound(self) -> float:
+        """
+        description:
+            every path shorter than the current one leaves through an open or inconsistent node,
+            so min(g + h) over them is a lower bound of the optimal distance
+        Returns:
+            float: distance of the current path over that lower bound, inf if no path is found
+        """
+        state = self.search_state
+        goal_g = state.get_g(self.goal_index)
+        if goal_g == math.inf:
+            return math.inf
+        g = state.g
+        lower_bound = goal_g
+        for index in self.open_list.get_indices():
+            lower_bound = min(lower_bound, g[index] + self.get_index_heuristic(index))
+        for index in self.inconsistent_indices:
+            lower_bound = min(lower_bound, g[index] + self.get_index_heuristic(index))
+        bound = max(1.0, goal_g / lower_bound) if lower_bound > 0.0 else 1.0
+        if not self.is_budget_exceeded:
+            # a finished iteration is also bounded by its weight
+            bound = min(bound, self.weight)
+        return bound
+
+
+class LegStats:
+    def __init__(self, start_node: Node, goal_node: Node) -> None:
+        self.start_node: Node = start_node
+        self.goal_node: Node = goal_node
+        self.is_found: bool = False
+        # components the search can enter from the start and the component of the goal, set if not found
+        self.start_components: List[int] = []
+        self.goal_component: int = 0
+        self.path_node_number: int = 0
+        self.distance: float = 0.0
+        self.search_time: float = 0.0
+        self.is_budget_exceeded: bool = False
+        
+    def __str__(self) -> str:
+        start_node, goal_node = self.start_node, self.goal_node
+        return f"leg ({start_node.i},{start_node.j},{start_node.k}) -> ({goal_node.i},{goal_node.j},{goal_node.k}), " \
+               f"found = {self.is_found}, nodes = {self.path_node_number}, distance = {self.distance:.3f}, " \
+               f"time = {self.search_time:.4f}s, budget exceeded = {self.is_budget_exceeded}"
+
+
+class WaypointRouter:
+    """
+    description:
+        routes an ordered list of terminals (start, waypoints, goal) leg by leg
+        with a single pathfinder. the pathfinder is retargeted with set_terminals,
+        so the search state, the precomputed tables and the line of sight memo
+        are shared by all legs. legs that can not be reached are rejected
+        by the reachability index without a search.
+        the path is the concatenation of the found legs without repeated waypoints.
+        max_expansions and time_limit bound the search of every leg, heuristic replaces
+        the euclidean heuristic of the pathfinder. with window_margin every leg is searched
+        in a window around its terminals first (GridAlgorithm.search_windowed).
+    """
+    def __init__(self, grids: Grids3D, algorithm: Type[GridAlgorithm] = None, 
+                 max_expansions: Optional[int] = None, time_limit: Optional[float] = None, 
+                 heuristic: Optional[Heuristic] = None, window_margin: Optional[int] = None, 
+                 **algorithm_kwargs) -> None:
+        self.grids: Grids3D = grids
+        self.algorithm: Type[GridAlgorithm] = algorithm if algorithm is not None else JumpPointSearchTheta
+        self.algorithm_kwargs = algorithm_kwargs
+        self.max_expansions: Optional[int] = max_expansions
+        self.time_limit: Optional[float] = time_limit
+        self.heuristic: Optional[Heuristic] = heuristic
+        if window_margin is not None and not self.algorithm.HAS_WINDOW_SEARCH:
+            raise ValueError(f"WaypointRouter: {self.algorithm.__name__} has no windowed search")
+        self.window_margin: Optional[int] = window_margin
+        self.pathfinder: Optional[GridAlgorithm] = None
+        self.path_nodes: List[Node] = []
+        self.leg_stats: List[LegStats] = []
+    
+    def get_pathfinder(self, start_node: Node, goal_node: Node) -> GridAlgorithm:
+        if self.pathfinder is None:
+            # the constructor reads the terminals of the grids
+            self.grids.set_start_node(start_node)
+            self.grids.set_goal_node(goal_node)
+            self.pathfinder = self.algorithm(self.grids, **self.algorithm_kwargs)
+            self.pathfinder.set_budget(self.max_expansions, self.time_limit)
+            self.pathfinder.set_heuristic(self.heuristic)
+            self.pathfinder.set_window(self.window_margin)
+        else:
+            self.pathfinder.set_terminals(start_node, goal_node)
+        return self.pathfinder
+    
+    def route(self, terminals: List[Node]) -> bool:
+        """
+        Args:
+            terminals (List[Node]): start, waypoints and goal in order
+        Returns:
+            bool: True if every leg is found
+        """
+        self.path_nodes = []
+        self.leg_stats = []
+        for start_node, goal_node in zip(terminals, terminals[1:]):
+            leg_stats = LegStats(start_node, goal_node)
+            self.leg_stats.append(leg_stats)
+            pathfinder = self.get_pathfinder(start_node, goal_node)
+            
+            search_time = time.perf_counter()
+            leg_stats.is_found = pathfinder.search()
+            leg_stats.search_time = time.perf_counter() - search_time
+            leg_stats.is_budget_exceeded = pathfinder.is_budget_exceeded
+            if not leg_stats.is_found:
+                leg_stats.start_components, leg_stats.goal_component = pathfinder.get_terminal_components()
+                continue
+            
+            leg_nodes = pathfinder.get_path_nodes()
+            leg_stats.path_node_number = len(leg_nodes)
+            leg_stats.distance = GridAlgorithm.get_nodes_distance(leg_nodes)
+            # the first node of a leg is the last node of the previous leg
+            if self.path_nodes and self.path_nodes[-1] == leg_nodes[0]:
+                leg_nodes = leg_nodes[1:]
+            self.path_nodes.extend(leg_nodes)
+        return all(leg_stats.is_found for leg_stats in self.leg_stats)
+    
+    def get_path_nodes(self) -> List[Node]:
+        return self.path_nodes
+    
+    def get_path_distance(self) -> float:
+        return sum(leg_stats.distance for leg_stats in self.leg_stats)
@@ -0,0 +1,159 @@
+import os
+import hashlib
+import tempfile
+from typing import List, Optional, Tuple, Type
+import numpy as np
+
+from src.grids.grids3d import Grids3D, Node
+from src.pathfinding import GridAlgorithm, JumpPointSearchTheta, WaypointRouter
+from src.parallel_routing import ParallelRouter, RouteResult
+
+
+class RouteCache:
+    """
+    description:
+        routes on disk addressed by the content they depend on: a hash of the obstacle map,
+        the bounds and the resolution of the grids, the algorithm and the terminal sequence.
+        a changed map or terminal gives a new key, so stale routes are never served.
+        every route is one .npz file of its RouteResult arrays, the files are touched
+        when they are read and the least recently used are removed above max_bytes.
+    """
+    FINGERPRINT_CACHE_KEY: str = "route_cache_fingerprint"
+    # changes of the file layout or of the key invalidate old entries
+    FORMAT_VERSION: int = 1
+
+    def __init__(self, cache_dir: str = "route_cache", max_bytes: int = 256 << 20) -> None:
+        if max_bytes <= 0:
+            raise ValueError("RouteCache: max_bytes must be positive")
+        self.cache_dir: str = cache_dir
+        self.max_bytes: int = max_bytes
+        self.hit_number: int = 0
+        self.miss_number: int = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def get_grid_fingerprint(cls, grids: Grids3D) -> str:
+        """
+        description:
+            hash of the obstacle map, the bounds and the resolution,
+            cached on the grids for the current version
+        """
+        cached = grids.cache.get(cls.FINGERPRINT_CACHE_KEY)
+        if cached is not None and cached[0] == grids.version:
+            return cached[1]
+        corner_min, corner_max = grids.corner_min, grids.corner_max
+        digest = hashlib.sha256()
+        digest.update(np.array([grids.map_size], dtype=np.int64).tobytes())
+        digest.update(np.array([corner_min.X(), corner_min.Y(), corner_min.Z(),
+                                corner_max.X(), corner_max.Y(), corner_max.Z()], dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(grids.obstacle_map != 0).tobytes())
+        fingerprint = digest.hexdigest()
+        grids.cache[cls.FINGERPRINT_CACHE_KEY] = (grids.version, fingerprint)
+        return fingerprint
+
+    @classmethod
+    def get_key(cls, grids: Grids3D, algorithm: Type[GridAlgorithm], terminals: List[Tuple[int, int, int]]) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{cls.FORMAT_VERSION}:{algorithm.__module__}.{algorithm.__qualname__}:".encode())
+        digest.update(cls.get_grid_fingerprint(grids).encode())
+        digest.update(np.array(terminals, dtype=np.int32).reshape(-1, 3).tobytes())
+        return digest.hexdigest()
+
+    def get_file_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def load(self, key: str) -> Optional[RouteResult]:
+        file_path = self.get_file_path(key)
+        try:
+            with np.load(file_path) as data:
+                route_result = RouteResult(data["path_indices"], data["leg_found"], data["leg_distances"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            print(f"RouteCache.load: {file_path} is broken and removed")
+            self.remove(file_path)
+            return None
+        # the access time of the entry for the eviction
+        os.utime(file_path)
+        return route_result
+
+    def store(self, key: str, route_result: RouteResult) -> None:
+        # written to a temporary file first, readers never see a partial entry
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.savez(file, path_indices=route_result.path_indices.astype(np.int32),
+                         leg_found=route_result.leg_found.astype(bool),
+                         leg_distances=route_result.leg_distances.astype(np.float64))
+            os.replace(temp_path, self.get_file_path(key))
+        except OSError:
+            self.remove(temp_path)
+            raise
+        self.evict()
+        return
+
+    def evict(self) -> None:
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".npz"):
+                continue
+            file_path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_path))
+        total_bytes = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, file_path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            self.remove(file_path)
+            total_bytes -= size
+        return
+
+    def remove(self, file_path: str) -> None:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        return
+
+    def get_route(self, grids: Grids3D, terminals: List[Node],
+                  algorithm: Type[GridAlgorithm] = JumpPointSearchTheta) -> RouteResult:
+        """
+        description:
+            cached route of the terminals, routed with a WaypointRouter and stored on a miss
+        """
+        key = self.get_key(grids, algorithm, [(node.i, node.j, node.k) for node in terminals])
+        route_result = self.load(key)
+        if route_result is not None:
+            self.hit_number += 1
+            return route_result
+        self.miss_number += 1
+        router = WaypointRouter(grids, algorithm)
+        router.route(terminals)
+        route_result = RouteResult.from_router(router)
+        self.store(key, route_result)
+        return route_result
+
+    def get_routes(self, grids: Grids3D, terminals_list: List[List[Tuple[int, int, int]]],
+                   algorithm: Type[GridAlgorithm] = JumpPointSearchTheta,
+                   processes: Optional[int] = None) -> List[RouteResult]:
+        """
+        description:
+            cached routes of many terminal lists, only the misses are routed in a ParallelRouter
+            and stored. the keys are computed before routing, so the terminals of all lists
+            must already be free in the obstacle map
+        """
+        keys = [self.get_key(grids, algorithm, terminals) for terminals in terminals_list]
+        route_results: List[Optional[RouteResult]] = [self.load(key) for key in keys]
+        misses = [i for i, route_result in enumerate(route_results) if route_result is None]
+        self.hit_number += len(keys) - len(misses)
+        self.miss_number += len(misses)
+        
+        router = ParallelRouter(grids, algorithm, processes)
+        for i, route_result in zip(misses, router.route([terminals_list[i] for i in misses])):
+            route_results[i] = route_result
+            self.store(keys[i], route_result)
+        return route_results
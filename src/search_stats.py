@@ -0,0 +1,119 @@
+from typing import Optional, Callable
+from array import array
+import functools
+import time
+import numpy as np
+
+
+class SearchStats:
+    """
+    description:
+        counters of one search of a pathfinder, collected only if stats are enabled
+        on the pathfinder (GridAlgorithm.enable_stats), so a search without them pays nothing.
+        pushes are indices entering the open list, decreased keys of queued indices are
+        counted apart. pops are counted where search() pops the open list, stale pops are
+        pops of cells closed while queued (jump point scans) and the final pop of the goal. the expansion order is recorded
+        as search indices and returned as flat indices of the grids.
+    """
+    def __init__(self, record_expansions: bool = False) -> None:
+        self.record_expansions: bool = record_expansions
+        self.is_found: bool = False
+        self.expanded_number: int = 0
+        self.push_number: int = 0
+        self.decrease_key_number: int = 0
+        self.pop_number: int = 0
+        self.open_peak: int = 0
+        self.line_of_sight_call_number: int = 0
+        # line of sight results served from the memo and lines found free
+        self.line_of_sight_memo_hit_number: int = 0
+        self.line_of_sight_visible_number: int = 0
+        self.forced_neighbor_call_number: int = 0
+        # seconds spent in each phase
+        self.reachability_time: float = 0.0
+        self.search_time: float = 0.0
+        self.path_time: float = 0.0
+        self.expansion_order: array = array('i')
+        self.grid_expansion_order: Optional[np.ndarray] = None
+        # counters of the pathfinder when the search began
+        self.begin_push_number: int = 0
+        self.begin_decrease_key_number: int = 0
+        self.begin_line_of_sight: tuple = (0, 0, 0)
+        self.begin_forced_neighbor_call_number: int = 0
+        self.begin_time: float = 0.0
+
+    def get_stale_pop_number(self) -> int:
+        return self.pop_number - self.expanded_number
+
+    def get_line_of_sight_hit_rate(self) -> float:
+        # share of line of sight checks answered by the memo
+        if self.line_of_sight_call_number == 0:
+            return 0.0
+        return self.line_of_sight_memo_hit_number / self.line_of_sight_call_number
+
+    def get_line_of_sight_visible_rate(self) -> float:
+        if self.line_of_sight_call_number == 0:
+            return 0.0
+        return self.line_of_sight_visible_number / self.line_of_sight_call_number
+
+    def get_expansion_order(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: (N,) int32 flat grid indices of the expanded nodes in order,
+                empty if the expansions are not recorded
+        """
+        if self.grid_expansion_order is None:
+            return np.zeros(0, dtype=np.int32)
+        return self.grid_expansion_order
+
+    def begin(self, pathfinder) -> None:
+        self.begin_time = time.perf_counter()
+        self.begin_push_number = pathfinder.get_push_number()
+        self.begin_decrease_key_number = pathfinder.get_decrease_key_number()
+        self.begin_line_of_sight = pathfinder.line_of_sight.get_counters()
+        self.begin_forced_neighbor_call_number = pathfinder.get_forced_neighbor_call_number()
+        return
+
+    def finish(self, pathfinder, is_found: bool) -> None:
+        self.is_found = is_found
+        self.search_time = time.perf_counter() - self.begin_time - self.reachability_time
+        self.push_number = pathfinder.get_push_number() - self.begin_push_number
+        self.decrease_key_number = pathfinder.get_decrease_key_number() - self.begin_decrease_key_number
+        call_number, memo_hit_number, visible_number = pathfinder.line_of_sight.get_counters()
+        begin_call_number, begin_memo_hit_number, begin_visible_number = self.begin_line_of_sight
+        self.line_of_sight_call_number = call_number - begin_call_number
+        self.line_of_sight_memo_hit_number = memo_hit_number - begin_memo_hit_number
+        self.line_of_sight_visible_number = visible_number - begin_visible_number
+        self.forced_neighbor_call_number = \
+            pathfinder.get_forced_neighbor_call_number() - self.begin_forced_neighbor_call_number
+        if self.record_expansions:
+            search_indices = np.frombuffer(self.expansion_order, dtype=np.int32) \
+                if len(self.expansion_order) else np.zeros(0, dtype=np.int32)
+            self.grid_expansion_order = pathfinder.get_grid_indices(search_indices).astype(np.int32)
+        return
+
+    def __str__(self) -> str:
+        return f"found = {self.is_found}, expanded = {self.expanded_number}, pushes = {self.push_number}, " \
+               f"pops = {self.pop_number}, stale pops = {self.get_stale_pop_number()}, " \
+               f"open peak = {self.open_peak}, line of sight = {self.line_of_sight_call_number} " \
+               f"(memo hit rate = {self.get_line_of_sight_hit_rate():.3f}), " \
+               f"forced neighbor checks = {self.forced_neighbor_call_number}, " \
+               f"time = reachability {self.reachability_time:.4f}s / search {self.search_time:.4f}s / " \
+               f"path {self.path_time:.4f}s"
+
+
+def traced_search(search: Callable[..., bool]) -> Callable[..., bool]:
+    """
+    description:
+        decorator of search() methods, a new SearchStats is collected
+        for every call if the pathfinder has stats enabled
+    """
+    @functools.wraps(search)
+    def wrapper(self, *args, **kwargs) -> bool:
+        if not self.is_stats_enabled:
+            return search(self, *args, **kwargs)
+        self.stats = SearchStats(self.is_expansion_recorded)
+        self.stats.begin(self)
+        is_found = search(self, *args, **kwargs)
+        self.stats.finish(self, is_found)
+        return is_found
+    return wrapper
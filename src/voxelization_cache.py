@@ -0,0 +1,151 @@
+import os
+import hashlib
+import tempfile
+from typing import Dict, Optional
+import numpy as np
+
+from src.brep.brep_util import STPFileReader
+from src.grids.grids3d import Grids3D
+from src.grids_util import Tessellation, Voxelization
+
+
+class VoxelizationCache:
+    """
+    description:
+        tessellations and voxelizations of STEP files on disk, addressed by the content they depend on.
+        the tessellation key is a hash of the STEP file contents and of the solids being meshed,
+        the voxelization key adds the bounds and the resolution of the grids and the voxelizer settings.
+        a changed input gives a new key, so a stale obstacle map is never loaded, and new grids
+        voxelize the cached tessellation without reading the STEP file again.
+        every entry is one .npz file, the occupied voxels are stored as packed bits.
+    """
+    # changes of the file layout, of the mesh settings (init_brep_mesh)
+    # or of the voxelizer invalidate old entries
+    FORMAT_VERSION: int = 1
+
+    def __init__(self, cache_dir: str = "voxelization_cache") -> None:
+        self.cache_dir: str = cache_dir
+        self.hit_number: int = 0
+        self.miss_number: int = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def get_tessellation_key(cls, file_fingerprint: str, include_solids: bool) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{cls.FORMAT_VERSION}:tessellation:{int(include_solids)}:{file_fingerprint}".encode())
+        return digest.hexdigest()
+
+    @classmethod
+    def get_voxelization_key(cls, tessellation_key: str, grids: Grids3D, fill_interior: bool) -> str:
+        corner_min, corner_max = grids.corner_min, grids.corner_max
+        digest = hashlib.sha256()
+        digest.update(f"{cls.FORMAT_VERSION}:voxelization:{int(fill_interior)}:{tessellation_key}:".encode())
+        digest.update(np.array([grids.map_size], dtype=np.int64).tobytes())
+        digest.update(np.array([corner_min.X(), corner_min.Y(), corner_min.Z(),
+                                corner_max.X(), corner_max.Y(), corner_max.Z()], dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def get_file_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        file_path = self.get_file_path(key)
+        try:
+            with np.load(file_path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            print(f"VoxelizationCache.load: {file_path} is broken and removed")
+            self.remove(file_path)
+            return None
+        return arrays
+
+    def store(self, key: str, **arrays: np.ndarray) -> None:
+        # written to a temporary file first, readers never see a partial entry
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(temp_path, self.get_file_path(key))
+        except OSError:
+            self.remove(temp_path)
+            raise
+        return
+
+    def remove(self, file_path: str) -> None:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        return
+
+    def load_tessellation(self, key: str) -> Optional[Tessellation]:
+        arrays = self.load(key)
+        if arrays is None:
+            return None
+        try:
+            return Tessellation(arrays["vertices"], arrays["faces"], arrays["face_solids"])
+        except KeyError:
+            print(f"VoxelizationCache.load_tessellation: {self.get_file_path(key)} is broken and removed")
+            self.remove(self.get_file_path(key))
+            return None
+
+    def store_tessellation(self, key: str, tessellation: Tessellation) -> None:
+        self.store(key, vertices=tessellation.vertices.astype(np.float64),
+                   faces=tessellation.faces.astype(np.int64), face_solids=tessellation.face_solids.astype(np.int32))
+        return
+
+    def load_occupied_map(self, key: str, map_size: int) -> Optional[np.ndarray]:
+        arrays = self.load(key)
+        if arrays is None:
+            return None
+        packed_bits = arrays.get("occupied_bits")
+        if packed_bits is None or len(packed_bits) * 8 < map_size ** 3:
+            print(f"VoxelizationCache.load_occupied_map: {self.get_file_path(key)} is broken and removed")
+            self.remove(self.get_file_path(key))
+            return None
+        return np.unpackbits(packed_bits, count=map_size ** 3).astype(bool).reshape((map_size,) * 3)
+
+    def store_occupied_map(self, key: str, occupied_map: np.ndarray) -> None:
+        self.store(key, occupied_bits=np.packbits(occupied_map.reshape(-1)))
+        return
+
+    def get_tessellation(self, file_name: str, include_solids: bool = False) -> Tessellation:
+        """
+        description:
+            cached tessellation of a STEP file in ./brep_model, read and meshed on a miss
+        """
+        file_fingerprint = STPFileReader.get_file_fingerprint(STPFileReader.get_file_path(file_name))
+        return self.get_tessellation_by_key(self.get_tessellation_key(file_fingerprint, include_solids),
+                                            file_name, include_solids)
+
+    def get_tessellation_by_key(self, key: str, file_name: str, include_solids: bool) -> Tessellation:
+        tessellation = self.load_tessellation(key)
+        if tessellation is not None:
+            return tessellation
+        shape = STPFileReader.read_stp_file_by_occ(file_name, use_brep_cache=True)
+        tessellation = Tessellation.from_shape(shape, include_solids)
+        self.store_tessellation(key, tessellation)
+        return tessellation
+
+    def voxelize_step_file(self, grids: Grids3D, file_name: str, fill_interior: bool = False) -> None:
+        """
+        description:
+            Voxelization.voxelize of a STEP file in ./brep_model, the obstacle map of
+            the same file, grids and settings is loaded from the cache instead
+        """
+        file_fingerprint = STPFileReader.get_file_fingerprint(STPFileReader.get_file_path(file_name))
+        tessellation_key = self.get_tessellation_key(file_fingerprint, fill_interior)
+        key = self.get_voxelization_key(tessellation_key, grids, fill_interior)
+        occupied_map = self.load_occupied_map(key, grids.map_size)
+        if occupied_map is not None:
+            self.hit_number += 1
+        else:
+            self.miss_number += 1
+            tessellation = self.get_tessellation_by_key(tessellation_key, file_name, fill_interior)
+            occupied_map = Voxelization.get_occupied_map(grids, tessellation, fill_interior)
+            self.store_occupied_map(key, occupied_map)
+        grids.obstacle_map[occupied_map] = 1
+        grids.update_obstacle_map()
+        return
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from src.brep.brep_util import STPFileReader, ShapeToMeshConvertor
+
+
+class TestSTPFileReader(unittest.TestCase):
+    def test_file_fingerprint(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "model.step")
+            with open(file_path, "wb") as file:
+                file.write(b"ISO-10303-21;")
+            fingerprint = STPFileReader.get_file_fingerprint(file_path)
+            self.assertEqual(STPFileReader.get_file_fingerprint(file_path), fingerprint)
+            with open(file_path, "ab") as file:
+                file.write(b"END-ISO-10303-21;")
+            self.assertNotEqual(STPFileReader.get_file_fingerprint(file_path), fingerprint)
+
+    def test_brep_file_path(self):
+        self.assertEqual(STPFileReader.get_brep_file_path("cache", "abc"), os.path.join("cache", "abc.brep"))
+        self.assertEqual(STPFileReader.get_brep_file_path("cache", "abc", 2), os.path.join("cache", "abc.root2.brep"))
+        self.assertIsNone(STPFileReader.load_brep(os.path.join("cache", "missing.brep")))
+        self.assertRaises(FileNotFoundError, STPFileReader.read_stp_file_by_occ, "MISSING.step", True)
+
+    def test_save_text(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "cache", "abc.roots")
+            STPFileReader.save_text("3", file_path)
+            STPFileReader.save_text("4", file_path)
+            with open(file_path) as file:
+                self.assertEqual(file.read(), "4")
+            # no temporary file is left behind
+            self.assertEqual(os.listdir(os.path.dirname(file_path)), ["abc.roots"])
+
+
+class TestShapeToMeshConvertor(unittest.TestCase):
+    def setUp(self):
+        # a unit triangle and a triangle with 100 times its area
+        self.vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 5], [10, 0, 5], [0, 10, 5]], dtype=np.float64)
+        self.faces = np.array([[0, 1, 2], [3, 4, 5]])
+
+    def test_sample_triangle_mesh(self):
+        points = ShapeToMeshConvertor.sample_triangle_mesh(self.vertices, self.faces, 20000, seed=0)
+        self.assertEqual(points.shape, (20000, 3))
+        self.assertEqual(points.dtype, np.float32)
+        on_small = points[:, 2] == 0.0
+        self.assertTrue(np.all(on_small | (points[:, 2] == 5.0)))
+        self.assertAlmostEqual(float(on_small.mean()), 1 / 101, delta=0.003)
+        self.assertTrue(np.all(points[:, :2] >= 0.0))
+        self.assertTrue(np.all(points[on_small, 0] + points[on_small, 1] <= 1.0 + 1e-6))
+        self.assertTrue(np.all(points[~on_small, 0] + points[~on_small, 1] <= 10.0 + 1e-5))
+
+    def test_seed(self):
+        sample = ShapeToMeshConvertor.sample_triangle_mesh
+        np.testing.assert_array_equal(sample(self.vertices, self.faces, 100, seed=1), 
+                                      sample(self.vertices, self.faces, 100, seed=1))
+        self.assertFalse(np.array_equal(sample(self.vertices, self.faces, 100, seed=1), 
+                                        sample(self.vertices, self.faces, 100, seed=2)))
+
+    def test_no_area(self):
+        self.assertEqual(ShapeToMeshConvertor.sample_triangle_mesh(self.vertices, self.faces[:0], 10).shape, (0, 3))
+        degenerate_faces = np.array([[0, 1, 1]])
+        self.assertEqual(ShapeToMeshConvertor.sample_triangle_mesh(self.vertices, degenerate_faces, 10).shape, (0, 3))
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, ShapeToMeshConvertor.convert_to_point_clouds, None, 10, backend="open3d")
+
+
+if __name__ == '__main__':
+    unittest.main()
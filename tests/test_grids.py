@@ -1,9 +1,19 @@
 import os
 import unittest
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
 from OCC.Core.gp import gp_Pnt
 from OCC.Core.TopoDS import TopoDS_Shape
 
 from src.grids.grids3d import Box, Node, Grids3D
+from src.grids.jump_table import JumpTable
+from src.grids.line_of_sight import LineOfSight
+from src.grids.reachability import ReachabilityIndex
+from src.grids.heuristics import EuclideanHeuristic, OctileHeuristic, LandmarkHeuristic
+from src.grids.lazy_deletion_heap import LazyDeletionHeap
+from src.grids.grid_pyramid import GridPyramid
+from src.grids.distance_field import DistanceFieldCache
+from src.grids.triangle_voxelizer import TriangleVoxelizer
 
 
 class TestBox(unittest.TestCase):
@@ -239,6 +249,58 @@ class TestGrids3D(unittest.TestCase):
     def test_len(self):
         self.assertEqual(len(self.grid), 10)
 
+    def test_obstacle_map(self):
+        self.assertEqual(self.grid.obstacle_map.shape, (10, 10, 10))
+        self.assertEqual(self.grid.obstacle_map.dtype, np.uint8)
+        
+        self.grid[1, 2, 3].is_obstacle = True
+        self.assertEqual(self.grid.obstacle_map[1, 2, 3], 1)
+        self.grid.obstacle_map[4, 5, 6] = 1
+        self.assertTrue(self.grid[4, 5, 6].is_obstacle)
+        
+        obstacle_nodes = list(self.grid.iter_obstacle_nodes())
+        self.assertEqual(obstacle_nodes, [self.grid[1, 2, 3], self.grid[4, 5, 6]])
+
+    def test_node_view(self):
+        # node views are created lazily and reused
+        self.assertEqual(len(self.grid.nodes_map), 0)
+        node = self.grid[1, 2, 3]
+        self.assertIs(self.grid[1, 2, 3], node)
+        self.assertEqual(len(self.grid.nodes_map), 1)
+        self.assertEqual(self.grid.get_ijk(self.grid.get_index(1, 2, 3)), (1, 2, 3))
+        # attributes written through a view that is not referenced persist
+        self.grid[4, 4, 4].color = "red"
+        self.assertEqual(self.grid[4, 4, 4].color, "red")
+        
+        self.assertAlmostEqual(node.center_pnt.X(), -3.5)
+        self.assertAlmostEqual(node.center_pnt.Y(), -2.5)
+        self.assertAlmostEqual(node.center_pnt.Z(), -1.5)
+        
+        with self.assertRaises(IndexError):
+            self.grid[10, 0, 0]
+
+    def test_lazy_node_geometry(self):
+        node = self.grid[9, 0, 4]
+        self.assertIsNone(node._center_pnt)
+        self.assertIsNone(node._corner_min)
+        
+        self.assertAlmostEqual(node.gap, 1.0)
+        self.assertAlmostEqual(node.corner_min.X(), 4.0)
+        self.assertAlmostEqual(node.corner_max.Y(), -4.0)
+        self.assertAlmostEqual(node.center_pnt.Z(), -0.5)
+        self.assertIs(node.center_pnt, node.center_pnt)
+        self.assertIsInstance(node.get_box_shape(), TopoDS_Shape)
+
+    def test_start_goal_flags(self):
+        self.grid.set_start_node(1, 1, 1)
+        self.grid.set_start_node(2, 2, 2)
+        self.grid.set_goal_node(2, 2, 2)
+        
+        self.assertFalse(self.grid[1, 1, 1].is_start_node)
+        self.assertTrue(self.grid[2, 2, 2].is_start_node)
+        self.assertTrue(self.grid[2, 2, 2].is_goal_node)
+        self.assertEqual(self.grid.flag_map[2, 2, 2], Grids3D.START_FLAG | Grids3D.GOAL_FLAG)
+
     def test_save_grid_map(self):
         file_path = "test_grid_map.npy"
         self.grid.save_grid_map(file_path)
@@ -277,7 +339,480 @@ class TestGrids3D(unittest.TestCase):
 
         # clean up
         os.remove(file_path)
+
+
+class TestJumpTable(unittest.TestCase):
+    def setUp(self):
+        self.grids = Grids3D(gp_Pnt(0, 0, 0), gp_Pnt(10, 10, 10), 10)
+        # obstacle next to the line j = 5, k = 5 at i = 4
+        self.grids[4, 6, 5].is_obstacle = True
+        self.grids[7, 5, 5].is_obstacle = True
+
+    def test_orthogonal_distances(self):
+        jump_table = JumpTable.get_jump_table(self.grids)
+        x_pos = JumpTable.DIRECTIONS.index((1, 0, 0))
+        x_neg = JumpTable.DIRECTIONS.index((-1, 0, 0))
+        # (4, 5, 5) has a forced neighbor for +x
+        self.assertEqual(jump_table.distances[x_pos, 0, 5, 5], 4)
+        # wall at (7, 5, 5)
+        self.assertEqual(jump_table.distances[x_pos, 5, 5, 5], -1)
+        self.assertEqual(jump_table.distances[x_neg, 9, 5, 5], -1)
+        self.assertEqual(jump_table.distances[x_neg, 0, 0, 0], 0)
+
+    def test_diagonal_distances(self):
+        jump_table = JumpTable.get_jump_table(self.grids)
+        d = JumpTable.DIRECTIONS.index((1, 1, 0))
+        self.assertEqual(jump_table.distances[d, 3, 5, 5], 0)
+        self.assertEqual(jump_table.distances[d, 0, 0, 0], 1)
+        self.assertEqual(jump_table.distances[d, 9, 0, 0], 0)
+
+    def test_update(self):
+        jump_table = JumpTable.get_jump_table(self.grids)
+        self.grids[2, 5, 4].is_obstacle = True
+        self.grids[7, 5, 5].is_obstacle = False
+        self.assertIs(JumpTable.get_jump_table(self.grids), jump_table)
+        self.assertTrue(np.array_equal(jump_table.distances, JumpTable.build(self.grids).distances))
+
+    def test_load_or_build(self):
+        file_path = JumpTable.get_file_path("test_grid_map.npy")
+        jump_table = JumpTable.load_or_build(self.grids, file_path)
+        self.assertTrue(os.path.isfile(file_path))
+        loaded_jump_table = JumpTable.load(file_path, self.grids)
+        self.assertTrue(np.array_equal(loaded_jump_table.distances, jump_table.distances))
         
+        self.grids[1, 1, 1].is_obstacle = True
+        self.assertIsNone(JumpTable.load(file_path, self.grids))
+        os.remove(file_path)
+
+
+class TestLineOfSight(unittest.TestCase):
+    def setUp(self):
+        self.grids = Grids3D(gp_Pnt(0, 0, 0), gp_Pnt(40, 40, 40), 40)
+        self.grids[5, 5, 5].is_obstacle = True
+
+    def get_bresenham_indices(self, src, dst):
+        # incremental 3D Bresenham line, start voxel excluded
+        x1, y1, z1 = src
+        x2, y2, z2 = dst
+        dx, dy, dz = abs(x2 - x1), abs(y2 - y1), abs(z2 - z1)
+        xs, ys, zs = (1 if x2 > x1 else -1), (1 if y2 > y1 else -1), (1 if z2 > z1 else -1)
+        indices = []
+        if dx >= dy and dx >= dz:
+            p1, p2 = 2 * dy - dx, 2 * dz - dx
+            while x1 != x2:
+                x1 += xs
+                if p1 >= 0:
+                    y1 += ys
+                    p1 -= 2 * dx
+                if p2 >= 0:
+                    z1 += zs
+                    p2 -= 2 * dx
+                p1 += 2 * dy
+                p2 += 2 * dz
+                indices.append((x1, y1, z1))
+        elif dy >= dx and dy >= dz:
+            p1, p2 = 2 * dx - dy, 2 * dz - dy
+            while y1 != y2:
+                y1 += ys
+                if p1 >= 0:
+                    x1 += xs
+                    p1 -= 2 * dy
+                if p2 >= 0:
+                    z1 += zs
+                    p2 -= 2 * dy
+                p1 += 2 * dx
+                p2 += 2 * dz
+                indices.append((x1, y1, z1))
+        else:
+            p1, p2 = 2 * dy - dz, 2 * dx - dz
+            while z1 != z2:
+                z1 += zs
+                if p1 >= 0:
+                    y1 += ys
+                    p1 -= 2 * dz
+                if p2 >= 0:
+                    x1 += xs
+                    p2 -= 2 * dz
+                p1 += 2 * dy
+                p2 += 2 * dx
+                indices.append((x1, y1, z1))
+        return indices
+
+    def get_random_lines(self, size):
+        rng = np.random.default_rng(0)
+        return rng.integers(0, 40, (size, 3)), rng.integers(0, 40, (size, 3))
+
+    def test_get_line_indices(self):
+        for src, dst in zip(*self.get_random_lines(200)):
+            src, dst = tuple(src.tolist()), tuple(dst.tolist())
+            indices = [tuple(ijk) for ijk in LineOfSight.get_line_indices(src, dst).tolist()]
+            self.assertEqual(indices, self.get_bresenham_indices(src, dst))
+
+    def test_has_line_of_sight(self):
+        line_of_sight = LineOfSight.get_line_of_sight(self.grids)
+        self.assertFalse(line_of_sight.has_line_of_sight((0, 0, 0), (9, 9, 9)))
+        self.assertTrue(line_of_sight.has_line_of_sight((0, 0, 0), (9, 9, 0)))
+        self.assertTrue(line_of_sight.has_line_of_sight((3, 3, 3), (3, 3, 3)))
+
+    def test_batch_matches_single(self):
+        for x in range(0, 40, 3):
+            self.grids[x, 20, 20].is_obstacle = True
+            self.grids[20, x, 10].is_obstacle = True
+        srcs, dsts = self.get_random_lines(300)
+        visible = LineOfSight(self.grids).has_lines_of_sight(srcs, dsts)
+        line_of_sight = LineOfSight(self.grids)
+        for src, dst, is_visible in zip(srcs.tolist(), dsts.tolist(), visible.tolist()):
+            self.assertEqual(line_of_sight.has_line_of_sight(tuple(src), tuple(dst)), is_visible)
+
+    def test_memo_follows_grids_version(self):
+        line_of_sight = LineOfSight.get_line_of_sight(self.grids)
+        self.assertTrue(line_of_sight.has_line_of_sight((0, 0, 0), (30, 0, 0)))
+        self.assertEqual(len(line_of_sight.memo), 1)
+        self.grids[20, 0, 0].is_obstacle = True
+        self.assertIs(LineOfSight.get_line_of_sight(self.grids), line_of_sight)
+        self.assertFalse(line_of_sight.has_line_of_sight((0, 0, 0), (30, 0, 0)))
+
+
+class TestReachabilityIndex(unittest.TestCase):
+    def setUp(self):
+        # wall on i = 5 splits the map in two
+        self.grids = Grids3D(gp_Pnt(0, 0, 0), gp_Pnt(10, 10, 10), 10)
+        self.grids.obstacle_map[5, :, :] = 1
+        self.grids.update_obstacle_map()
+
+    def assert_same_partition(self, components, other_components):
+        self.assertTrue(np.array_equal(components != 0, other_components != 0))
+        free = components != 0
+        pairs = set(zip(components[free].tolist(), other_components[free].tolist()))
+        self.assertEqual(len(pairs), len(set(c for c, _ in pairs)))
+        self.assertEqual(len(pairs), len(set(c for _, c in pairs)))
+
+    def test_build(self):
+        reachability_index = ReachabilityIndex.get_reachability_index(self.grids)
+        self.assertEqual(reachability_index.get_component(5, 0, 0), 0)
+        self.assertNotEqual(reachability_index.get_component(0, 0, 0), reachability_index.get_component(9, 0, 0))
+        self.assertEqual(reachability_index.get_component_size(reachability_index.get_component(0, 0, 0)), 500)
+        self.assertFalse(reachability_index.is_reachable((0, 0, 0), (9, 9, 9)))
+        self.assertTrue(reachability_index.is_reachable((0, 0, 0), (4, 9, 9)))
+        # the search leaves an obstacle start through its free neighbors
+        self.assertTrue(reachability_index.is_reachable((5, 0, 0), (9, 9, 9)))
+        self.assertFalse(reachability_index.is_reachable((0, 0, 0), (5, 0, 0)))
+
+    def test_update(self):
+        reachability_index = ReachabilityIndex.get_reachability_index(self.grids)
+        self.grids[5, 3, 3].is_obstacle = False
+        self.assertIs(ReachabilityIndex.get_reachability_index(self.grids), reachability_index)
+        self.assertTrue(reachability_index.is_reachable((0, 0, 0), (9, 9, 9)))
+        self.assert_same_partition(reachability_index.components, ReachabilityIndex.build(self.grids).components)
+
+        self.grids[5, 3, 3].is_obstacle = True
+        self.grids[2, 2, 2].is_obstacle = True
+        ReachabilityIndex.get_reachability_index(self.grids)
+        self.assertFalse(reachability_index.is_reachable((0, 0, 0), (9, 9, 9)))
+        self.assert_same_partition(reachability_index.components, ReachabilityIndex.build(self.grids).components)
+
+    def test_random_updates(self):
+        rng = np.random.default_rng(0)
+        grids = Grids3D(gp_Pnt(0, 0, 0), gp_Pnt(8, 8, 8), 8)
+        grids.obstacle_map[...] = rng.random((8, 8, 8)) < 0.5
+        grids.update_obstacle_map()
+        reachability_index = ReachabilityIndex.get_reachability_index(grids)
+        for _ in range(20):
+            for i, j, k in rng.integers(0, 8, (5, 3)).tolist():
+                grids[i, j, k].is_obstacle = bool(rng.random() < 0.5)
+            self.assertIs(ReachabilityIndex.get_reachability_index(grids), reachability_index)
+            self.assert_same_partition(reachability_index.components, ReachabilityIndex.build(grids).components)
+
+
+
+class TestHeuristics(unittest.TestCase):
+    def setUp(self):
+        self.grids = Grids3D(gp_Pnt(0, 0, 0), gp_Pnt(12, 12, 12), 12)
+        # wall on i = 6 with a hole at (6, 10, 10)
+        self.grids.obstacle_map[6, :, :] = 1
+        self.grids.obstacle_map[6, 10, 10] = 0
+        self.grids.update_obstacle_map()
+
+    def get_grid_distances(self, grids, target):
+        # 26-connected dijkstra reference on the free voxels
+        free_indices = np.flatnonzero(grids.obstacle_map.reshape(-1) == 0)
+        graph = LandmarkHeuristic.get_graph(grids, free_indices)
+        source = int(np.searchsorted(free_indices, grids.get_index(*target)))
+        distances = np.full(grids.map_size ** 3, np.inf)
+        distances[free_indices] = dijkstra(graph, directed=False, indices=source)
+        return distances.reshape(grids.obstacle_map.shape)
+
+    def test_euclidean(self):
+        table = EuclideanHeuristic().get_table(self.grids, (1, 2, 3))
+        self.assertAlmostEqual(table[4, 6, 3], 5.0)
+        self.assertAlmostEqual(EuclideanHeuristic().get_distance(self.grids, (4, 6, 3), (1, 2, 3)), 5.0)
+
+    def test_octile(self):
+        heuristic = OctileHeuristic()
+        table = heuristic.get_table(self.grids, (0, 0, 0))
+        self.assertAlmostEqual(table[3, 2, 1], 1 + np.sqrt(2) + np.sqrt(3))
+        self.assertAlmostEqual(heuristic.get_distance(self.grids, (3, 2, 1), (0, 0, 0)), table[3, 2, 1])
+        # exact without obstacles, a lower bound with them
+        free_grids = Grids3D(gp_Pnt(0, 0, 0), gp_Pnt(12, 12, 12), 12)
+        self.assertTrue(np.allclose(heuristic.get_table(free_grids, (2, 5, 7)), 
+                                    self.get_grid_distances(free_grids, (2, 5, 7))))
+        distances = self.get_grid_distances(self.grids, (2, 5, 7))
+        free = np.isfinite(distances)
+        self.assertTrue(np.all(heuristic.get_table(self.grids, (2, 5, 7))[free] <= distances[free] + 1e-9))
+
+    def test_landmark(self):
+        landmark_heuristic = LandmarkHeuristic.get_landmark_heuristic(self.grids)
+        self.assertEqual(len(landmark_heuristic.landmarks), LandmarkHeuristic.LANDMARK_NUMBER)
+        for target in [(1, 1, 1), (10, 2, 3), (6, 10, 10)]:
+            distances = self.get_grid_distances(self.grids, target)
+            free = np.isfinite(distances)
+            table = landmark_heuristic.get_table(self.grids, target)
+            self.assertTrue(np.all(table[free] <= distances[free] + 1e-9))
+        # tighter than the euclidean distance across the wall
+        self.assertGreater(landmark_heuristic.get_table(self.grids, (10, 1, 1))[1, 1, 1],
+                           EuclideanHeuristic().get_table(self.grids, (10, 1, 1))[1, 1, 1])
+
+    def test_landmark_update(self):
+        landmark_heuristic = LandmarkHeuristic.get_landmark_heuristic(self.grids)
+        # new obstacles keep the bound
+        self.grids[2, 2, 2].is_obstacle = True
+        self.assertIs(LandmarkHeuristic.get_landmark_heuristic(self.grids), landmark_heuristic)
+        # freed voxels rebuild it
+        self.grids[6, 1, 1].is_obstacle = False
+        rebuilt_heuristic = LandmarkHeuristic.get_landmark_heuristic(self.grids)
+        self.assertIsNot(rebuilt_heuristic, landmark_heuristic)
+        distances = self.get_grid_distances(self.grids, (10, 1, 1))
+        free = np.isfinite(distances)
+        table = landmark_heuristic.get_table(self.grids, (10, 1, 1))
+        self.assertTrue(np.all(table[free] <= distances[free] + 1e-9))
+
+    def test_landmark_carving(self):
+        # a terminal carved into a block can not shorten a path, the distances are updated
+        self.grids.obstacle_map[1:5, 1:5, 1:5] = 1
+        self.grids.update_obstacle_map()
+        landmark_heuristic = LandmarkHeuristic.get_landmark_heuristic(self.grids)
+        self.assertEqual(landmark_heuristic.distances.dtype, np.float32)
+        for ijk in [(1, 3, 3), (2, 3, 3)]:
+            self.grids[ijk].is_obstacle = False
+            self.assertIs(LandmarkHeuristic.get_landmark_heuristic(self.grids), landmark_heuristic)
+        for target in [(2, 3, 3), (10, 2, 3)]:
+            distances = self.get_grid_distances(self.grids, target)
+            free = np.isfinite(distances)
+            table = landmark_heuristic.get_table(self.grids, target)
+            self.assertTrue(np.all(table[free] <= distances[free] + 1e-9))
+
+    def test_landmark_size(self):
+        max_bytes = LandmarkHeuristic.MAX_BYTES
+        try:
+            LandmarkHeuristic.MAX_BYTES = 3 * 12 ** 3 * 4
+            self.assertEqual(len(LandmarkHeuristic.build(self.grids).landmarks), 3)
+            LandmarkHeuristic.MAX_BYTES = 12 ** 3
+            with self.assertRaises(ValueError):
+                LandmarkHeuristic.build(self.grids)
+        finally:
+            LandmarkHeuristic.MAX_BYTES = max_bytes
+
+    def test_load_or_build(self):
+        file_path = LandmarkHeuristic.get_file_path("test_grid_map.npy")
+        landmark_heuristic = LandmarkHeuristic.load_or_build(self.grids, file_path)
+        self.assertTrue(os.path.isfile(file_path))
+        loaded_heuristic = LandmarkHeuristic.load(file_path, self.grids)
+        self.assertTrue(np.array_equal(loaded_heuristic.distances, landmark_heuristic.distances))
         
+        self.grids[1, 1, 1].is_obstacle = True
+        self.assertIsNone(LandmarkHeuristic.load(file_path, self.grids))
+        os.remove(file_path)
+
+
+class TestLazyDeletionHeap(unittest.TestCase):
+    def test_pop_order(self):
+        heap = LazyDeletionHeap(10)
+        for index, key in [(3, 5.0), (7, 1.0), (2, 3.0), (9, 1.0)]:
+            self.assertTrue(heap.push(index, key))
+        self.assertEqual(len(heap), 4)
+        self.assertEqual(heap.peek(), (1.0, 7))
+        # ties in push order
+        self.assertEqual([heap.pop() for _ in range(4)], [7, 9, 2, 3])
+        self.assertEqual(len(heap), 0)
+        self.assertRaises(IndexError, heap.pop)
+
+    def test_decrease_key(self):
+        heap = LazyDeletionHeap(10)
+        heap.push(1, 4.0)
+        heap.push(2, 2.0)
+        self.assertFalse(heap.push(1, 6.0))
+        self.assertTrue(heap.push(1, 1.0))
+        self.assertEqual(len(heap), 2)
+        self.assertEqual(heap.get_key(1), 1.0)
+        self.assertEqual(heap.keys.typecode, 'd')
+        self.assertEqual((heap.push_number, heap.decrease_key_number), (2, 1))
+        # the outdated entry of index 1 is never returned
+        self.assertEqual([heap.pop(), heap.pop()], [1, 2])
+        self.assertFalse(heap)
+        self.assertIsNone(heap.get_key(1))
+
+    def test_update_and_remove(self):
+        heap = LazyDeletionHeap(10, has_tuple_keys=True)
+        heap.push_all([4, 5, 6], [(1.0, 1.0), (2.0, 0.0), (3.0, 0.0)])
+        heap.update(4, (5.0, 0.0))
+        heap.remove(5)
+        self.assertFalse(heap.contains(5))
+        self.assertEqual(sorted(heap.get_indices()), [4, 6])
+        self.assertEqual([heap.pop(), heap.pop()], [6, 4])
+
+    def test_rebuild_and_clear(self):
+        heap = LazyDeletionHeap(1000)
+        for step in range(10):
+            heap.push_all(list(range(100)), [100.0 - step - index for index in range(100)])
+        # outdated entries are dropped by rebuilds
+        self.assertEqual(len(heap), 100)
+        self.assertLessEqual(len(heap.entries), 2 * len(heap) + LazyDeletionHeap.REBUILD_SLACK)
+        self.assertEqual(heap.pop(), 99)
+        heap.clear()
+        self.assertEqual(len(heap), 0)
+        self.assertFalse(any(heap.contains(index) for index in range(100)))
+        heap.push(5, 2.0)
+        self.assertEqual(heap.pop(), 5)
+
+
+class TestGridPyramid(unittest.TestCase):
+    def setUp(self):
+        self.grids = Grids3D(corner_min=gp_Pnt(0, 0, 0), corner_max=gp_Pnt(10, 10, 10), map_size=10)
+        self.grids.obstacle_map[5, :, :] = 1
+        self.grids.obstacle_map[5, 8, 8] = 0
+        self.grids.update_obstacle_map()
+
+    def test_max_pool(self):
+        obstacle_map = np.zeros((5, 5, 5), dtype=bool)
+        obstacle_map[1, 2, 3] = obstacle_map[4, 4, 4] = True
+        pooled_map = GridPyramid.max_pool(obstacle_map)
+        self.assertEqual(pooled_map.shape, (3, 3, 3))
+        self.assertEqual(set(zip(*np.nonzero(pooled_map))), {(0, 1, 1), (2, 2, 2)})
+
+    def test_cached_by_version(self):
+        grid_pyramid = GridPyramid.get_grid_pyramid(self.grids)
+        self.assertEqual(grid_pyramid.level_number, GridPyramid.LEVEL_NUMBER)
+        self.assertEqual([obstacle_map.shape[0] for obstacle_map in grid_pyramid.obstacle_maps], [10, 5, 3, 2])
+        self.assertIs(GridPyramid.get_grid_pyramid(self.grids), grid_pyramid)
+        self.grids[0, 0, 0].is_obstacle = True
+        self.assertIsNot(GridPyramid.get_grid_pyramid(self.grids), grid_pyramid)
+
+    def test_level_path(self):
+        grid_pyramid = GridPyramid.get_grid_pyramid(self.grids)
+        # the hole of the wall is closed on level 1
+        self.assertIsNone(grid_pyramid.get_level_path(1, (1, 1, 1), (9, 1, 1)))
+        self.assertEqual(grid_pyramid.get_level_path(1, (1, 1, 1), (3, 1, 1)), [(0, 0, 0), (1, 0, 0)])
+        corridor = grid_pyramid.get_corridor(1, [(0, 0, 0), (1, 0, 0)], 0)
+        self.assertEqual(corridor.shape, (10, 10, 10))
+        self.assertEqual(int(corridor.sum()), 16)
+        self.assertIsNotNone(grid_pyramid.get_level_path(0, (1, 1, 1), (3, 1, 1), corridor))
+        self.assertIsNone(grid_pyramid.get_level_path(0, (1, 1, 1), (9, 9, 9), corridor))
+
+
+class TestDistanceFieldCache(unittest.TestCase):
+    def setUp(self):
+        self.grids = Grids3D(corner_min=gp_Pnt(0, 0, 0), corner_max=gp_Pnt(10, 10, 10), map_size=10)
+        self.grids.obstacle_map[5, :, :] = 1
+        self.grids.obstacle_map[5, 8, 8] = 0
+        self.grids.update_obstacle_map()
+
+    def test_same_distances_as_dijkstra(self):
+        free_indices = np.flatnonzero(self.grids.obstacle_map.reshape(-1) == 0)
+        graph = LandmarkHeuristic.get_graph(self.grids, free_indices)
+        distances = dijkstra(graph, directed=False, indices=0)
+        distance_field = DistanceFieldCache.get_distance_field_cache(self.grids).get_distance_field(self.grids, (0, 0, 0))
+        np.testing.assert_allclose(distance_field.distances[free_indices], distances)
+        self.assertTrue(np.isinf(distance_field.get_distance(self.grids.get_index(5, 0, 0))))
+
+    def test_path_indices(self):
+        distance_field = DistanceFieldCache.get_distance_field_cache(self.grids).get_distance_field(self.grids, (1, 1, 1))
+        goal_index = self.grids.get_index(9, 1, 1)
+        path_indices = distance_field.get_path_indices(goal_index)
+        self.assertEqual(path_indices[0], goal_index)
+        self.assertEqual(path_indices[-1], self.grids.get_index(1, 1, 1))
+        self.assertIn(self.grids.get_index(5, 8, 8), path_indices)
+        ijks = [self.grids.get_ijk(index) for index in path_indices]
+        length = sum(self.grids.node_gap * np.linalg.norm(np.subtract(a, b)) for a, b in zip(ijks, ijks[1:]))
+        self.assertAlmostEqual(length, distance_field.get_distance(goal_index))
+        self.assertEqual(distance_field.get_path_indices(self.grids.get_index(5, 0, 0)), [])
+
+    def test_eviction_and_version(self):
+        distance_field_cache = DistanceFieldCache.get_distance_field_cache(self.grids)
+        self.assertIs(DistanceFieldCache.get_distance_field_cache(self.grids), distance_field_cache)
+        field_bytes = distance_field_cache.get_distance_field(self.grids, (0, 0, 0)).nbytes
+        DistanceFieldCache.get_distance_field_cache(self.grids, 2 * field_bytes)
+        for source in [(1, 0, 0), (2, 0, 0), (1, 0, 0)]:
+            distance_field_cache.get_distance_field(self.grids, source)
+        self.assertEqual(list(distance_field_cache.fields), [self.grids.get_index(2, 0, 0), self.grids.get_index(1, 0, 0)])
+        self.assertEqual((distance_field_cache.hit_number, distance_field_cache.miss_number), (1, 3))
+        self.grids[0, 0, 9].is_obstacle = True
+        self.assertIsNone(distance_field_cache.get_cached_distance_field(self.grids, (1, 0, 0)))
+        self.assertEqual(distance_field_cache.nbytes, 0)
+        self.assertRaises(ValueError, DistanceFieldCache, 0)
+
+
+class TestTriangleVoxelizer(unittest.TestCase):
+    def setUp(self):
+        self.grids = Grids3D(corner_min=gp_Pnt(-8, -8, -8), corner_max=gp_Pnt(8, 8, 8), map_size=16)
+        rng = np.random.default_rng(0)
+        self.vertices = rng.uniform(-10, 10, (30, 3))
+        self.faces = rng.integers(0, 30, (20, 3))
+
+    def test_same_as_testing_every_voxel(self):
+        chunk_size = TriangleVoxelizer.CHUNK_SIZE
+        TriangleVoxelizer.CHUNK_SIZE = 1000
+        try:
+            surface_map = TriangleVoxelizer.get_surface_map(self.grids, self.vertices, self.faces)
+        finally:
+            TriangleVoxelizer.CHUNK_SIZE = chunk_size
+        centers = np.stack(np.indices((16, 16, 16)), axis=-1).reshape(-1, 3) + 0.5
+        expected_map = np.zeros(16 ** 3, dtype=bool)
+        for triangle in (self.vertices[self.faces] + 8) / self.grids.node_gap:
+            expected_map |= TriangleVoxelizer.get_overlap(triangle[None, :, :] - centers[:, None, :])
+        np.testing.assert_array_equal(surface_map, expected_map.reshape(16, 16, 16))
+
+    def test_sampled_points_are_covered(self):
+        surface_map = TriangleVoxelizer.get_surface_map(self.grids, self.vertices, self.faces)
+        rng = np.random.default_rng(1)
+        weights = rng.dirichlet(np.ones(3), 5000)
+        points = np.einsum("sv,fvd->fsd", weights, self.vertices[self.faces]).reshape(-1, 3)
+        ijks = np.floor((points + 8) / self.grids.node_gap).astype(np.int64)
+        ijks = ijks[np.all((ijks >= 0) & (ijks < 16), axis=1)]
+        self.assertTrue(surface_map[ijks[:, 0], ijks[:, 1], ijks[:, 2]].all())
+
+    def test_thin_panel(self):
+        # a panel through the voxels i = 7 marks one layer without holes
+        vertices = np.array([[-0.5, -8, -8], [-0.5, 8, -8], [-0.5, 8, 8], [-0.5, -8, 8]])
+        faces = np.array([[0, 1, 2], [0, 2, 3]])
+        surface_map = TriangleVoxelizer.get_surface_map(self.grids, vertices, faces)
+        self.assertTrue(surface_map[7].all())
+        self.assertEqual(int(surface_map.sum()), 16 * 16)
+        self.assertFalse(TriangleVoxelizer.get_surface_map(self.grids, vertices, faces[:0]).any())
+
+    def get_cube_mesh(self, lower: float, upper: float):
+        vertices = np.array([[x, y, z] for x in (lower, upper) for y in (lower, upper) for z in (lower, upper)])
+        faces = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+                          [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]])
+        return vertices, faces
+
+    def test_solid_map(self):
+        vertices, faces = self.get_cube_mesh(-4.5, 4.5)
+        surface_map = TriangleVoxelizer.get_surface_map(self.grids, vertices, faces)
+        self.assertFalse(surface_map[8, 8, 8])
+        solid_map = TriangleVoxelizer.get_solid_map(surface_map)
+        np.testing.assert_array_equal(np.nonzero(solid_map.any(axis=(1, 2)))[0], np.arange(3, 13))
+        self.assertEqual(int(solid_map.sum()), 10 ** 3)
+        # a missing face opens the interior
+        open_map = TriangleVoxelizer.get_surface_map(self.grids, vertices, faces[2:])
+        np.testing.assert_array_equal(TriangleVoxelizer.get_solid_map(open_map), open_map)
+
+    def test_solid_map_at_border(self):
+        # the interior of a cube cut by the map border is open
+        vertices, faces = self.get_cube_mesh(4.5, 12.0)
+        surface_map = TriangleVoxelizer.get_surface_map(self.grids, vertices, faces)
+        np.testing.assert_array_equal(TriangleVoxelizer.get_solid_map(surface_map), surface_map)
+        self.assertFalse(TriangleVoxelizer.get_solid_map(np.zeros((4, 4, 4), dtype=bool)).any())
+
+
 if __name__ == '__main__':
     unittest.main()
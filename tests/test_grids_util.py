@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+import numpy as np
+from OCC.Core.gp import gp_Pnt
+
+from src.grids.grids3d import Grids3D
+from src.grids_util import Tessellation, Voxelization
+from src.voxelization_cache import VoxelizationCache
+
+
+def get_cube_tessellation(lower: float, upper: float) -> Tessellation:
+    # the surface of a cube, repeated as its only solid
+    vertices = np.array([[x, y, z] for x in (lower, upper) for y in (lower, upper) for z in (lower, upper)])
+    faces = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5], [0, 4, 5], [0, 5, 1],
+                      [2, 3, 7], [2, 7, 6], [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]])
+    face_solids = np.array([-1] * 12 + [0] * 12, dtype=np.int32)
+    return Tessellation(vertices, np.concatenate([faces, faces]), face_solids)
+
+
+class TestVoxelization(unittest.TestCase):
+    def test_voxelize_tessellation(self):
+        grids = Grids3D(corner_min=gp_Pnt(-8, -8, -8), corner_max=gp_Pnt(8, 8, 8), map_size=16)
+        tessellation = get_cube_tessellation(-4.5, 4.5)
+        self.assertEqual(tessellation.solid_number, 1)
+        surface_map = Voxelization.get_occupied_map(grids, tessellation)
+        self.assertEqual(int(surface_map.sum()), 10 ** 3 - 8 ** 3)
+        Voxelization.voxelize_tessellation(grids, tessellation, fill_interior=True)
+        self.assertEqual(int(grids.obstacle_map.sum()), 10 ** 3)
+        self.assertEqual(grids.version, 1)
+
+
+class TestVoxelizationCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.voxelization_cache = VoxelizationCache(self.temp_dir.name)
+        self.grids = Grids3D(corner_min=gp_Pnt(-8, -8, -8), corner_max=gp_Pnt(8, 8, 8), map_size=16)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_key(self):
+        tessellation_key = VoxelizationCache.get_tessellation_key("step", False)
+        self.assertNotEqual(tessellation_key, VoxelizationCache.get_tessellation_key("step", True))
+        self.assertNotEqual(tessellation_key, VoxelizationCache.get_tessellation_key("changed step", False))
+        key = VoxelizationCache.get_voxelization_key(tessellation_key, self.grids, False)
+        self.assertEqual(key, VoxelizationCache.get_voxelization_key(tessellation_key, self.grids, False))
+        self.assertNotEqual(key, VoxelizationCache.get_voxelization_key(tessellation_key, self.grids, True))
+        for grids in [Grids3D(corner_min=gp_Pnt(-8, -8, -8), corner_max=gp_Pnt(8, 8, 8), map_size=32),
+                      Grids3D(corner_min=gp_Pnt(-8, -8, -9), corner_max=gp_Pnt(8, 8, 7), map_size=16)]:
+            self.assertNotEqual(key, VoxelizationCache.get_voxelization_key(tessellation_key, grids, False))
+
+    def test_tessellation(self):
+        tessellation = get_cube_tessellation(-4.5, 4.5)
+        self.assertIsNone(self.voxelization_cache.load_tessellation("tessellation"))
+        self.voxelization_cache.store_tessellation("tessellation", tessellation)
+        cached_tessellation = VoxelizationCache(self.temp_dir.name).load_tessellation("tessellation")
+        np.testing.assert_array_equal(cached_tessellation.vertices, tessellation.vertices)
+        np.testing.assert_array_equal(cached_tessellation.faces, tessellation.faces)
+        np.testing.assert_array_equal(cached_tessellation.face_solids, tessellation.face_solids)
+        # the cached tessellation is voxelized without the STEP file
+        cached_tessellation = self.voxelization_cache.get_tessellation_by_key("tessellation", "MISSING.step", True)
+        self.assertEqual(cached_tessellation.solid_number, 1)
+
+    def test_occupied_map(self):
+        occupied_map = Voxelization.get_occupied_map(self.grids, get_cube_tessellation(-4.5, 4.5), True)
+        self.voxelization_cache.store_occupied_map("voxelization", occupied_map)
+        np.testing.assert_array_equal(self.voxelization_cache.load_occupied_map("voxelization", 16), occupied_map)
+        # an entry of a smaller map is broken
+        self.assertIsNone(self.voxelization_cache.load_occupied_map("voxelization", 32))
+        self.assertIsNone(self.voxelization_cache.load_occupied_map("voxelization", 16))
+
+    def test_broken_entry(self):
+        with open(self.voxelization_cache.get_file_path("broken"), "wb") as file:
+            file.write(b"not a npz file")
+        self.assertIsNone(self.voxelization_cache.load_tessellation("broken"))
+        self.assertIsNone(self.voxelization_cache.load("broken"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,872 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from OCC.Core.gp import gp_Pnt
+
+from src.grids.grids3d import Grids3D
+from src.grids.search_state import SearchState
+from src.grids.heuristics import OctileHeuristic, LandmarkHeuristic
+from src.pathfinding import AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearch, JumpPointSearchTheta, JumpPointSearchPlus, \
+    AstarAlgorithmIncremental, AstarAlgorithmAnytime, AstarAlgorithmHierarchical, DistanceFieldSearch, WaypointRouter
+from src.parallel_routing import SharedGrids, ParallelRouter
+from src.route_cache import RouteCache
+from src.grids.distance_field import DistanceFieldCache
+
+
+def get_cabinet_grids() -> Grids3D:
+    grids = Grids3D(corner_min=gp_Pnt(-200, -200, -200),
+                    corner_max=gp_Pnt(200, 200, 200),
+                    map_size=30)
+    grids.load_grid_map("cabinet_grid_map.npy")
+    return grids
+
+
+def get_wall_grids(map_size: int = 10) -> Grids3D:
+    # wall on i = 5 with a hole at (5, 8, 8)
+    grids = Grids3D(corner_min=gp_Pnt(0, 0, 0),
+                    corner_max=gp_Pnt(map_size, map_size, map_size),
+                    map_size=map_size)
+    grids.obstacle_map[5, :, :] = 1
+    grids.obstacle_map[5, 8, 8] = 0
+    grids.update_obstacle_map()
+    return grids
+
+
+class TestSearchState(unittest.TestCase):
+    def test_begin(self):
+        state = SearchState(8)
+        state.begin()
+        state.set_g(3, 1.5, 2)
+        state.close(3)
+        self.assertTrue(state.is_visited(3))
+        self.assertTrue(state.is_closed(3))
+        self.assertEqual(state.get_g(3), 1.5)
+        self.assertEqual(state.get_parent(3), 2)
+
+        state.begin()
+        self.assertFalse(state.is_visited(3))
+        self.assertFalse(state.is_closed(3))
+        self.assertEqual(state.get_g(3), float('inf'))
+        self.assertEqual(state.get_parent(3), -1)
+
+    def test_get_path_indices(self):
+        state = SearchState(8)
+        state.begin()
+        state.set_g(0, 0.0, -1)
+        state.set_g(4, 1.0, 0)
+        state.set_parent(7, 4)
+        self.assertEqual(state.get_path_indices(7), [7, 4, 0])
+        self.assertEqual(state.get_g(7), float('inf'))
+        self.assertEqual(state.get_path_indices(5), [])
+
+
+class TestGridAlgorithm(unittest.TestCase):
+    def setUp(self):
+        self.grids = get_wall_grids()
+
+    def assert_valid_path(self, path_nodes, start, goal):
+        self.assertEqual((path_nodes[0].i, path_nodes[0].j, path_nodes[0].k), start)
+        self.assertEqual((path_nodes[-1].i, path_nodes[-1].j, path_nodes[-1].k), goal)
+        for node in path_nodes:
+            self.assertFalse(node.is_obstacle)
+
+    def test_search(self):
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearch, JumpPointSearchTheta, JumpPointSearchPlus]:
+            self.grids.set_start_node(1, 1, 1)
+            self.grids.set_goal_node(9, 1, 1)
+            pathfinder = algorithm(self.grids)
+            self.assertTrue(pathfinder.search(), algorithm.__name__)
+            self.assert_valid_path(pathfinder.get_path_nodes(), (1, 1, 1), (9, 1, 1))
+
+    def test_no_node_views_while_searching(self):
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+        for algorithm in [AstarAlgorithmOp, JumpPointSearch, JumpPointSearchTheta]:
+            # the start and goal views only
+            view_number = len(self.grids.nodes_map)
+            pathfinder = algorithm(self.grids)
+            self.assertTrue(pathfinder.search(), algorithm.__name__)
+            self.assertEqual(len(self.grids.nodes_map), view_number, algorithm.__name__)
+
+    def test_astar_distance(self):
+        self.grids.set_start_node(1, 8, 8)
+        self.grids.set_goal_node(9, 8, 8)
+        pathfinder = AstarAlgorithmOp(self.grids)
+        self.assertTrue(pathfinder.search())
+        self.assertAlmostEqual(pathfinder.get_path_distance(), 8.0)
+        self.assertEqual(len(pathfinder.get_smoothed_path_nodes()), 2)
+
+    def test_visible_number(self):
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+        pathfinder = AstarAlgorithmOp(self.grids)
+        # the line from (0, 8, 8) is blocked from (5, 8, 8) on
+        self.grids[5, 8, 8].is_obstacle = True
+        path_ijk = np.array([(i, 8, 8) for i in range(10)], dtype=np.int64)
+        self.assertEqual(pathfinder.get_visible_number(path_ijk, 0, 1), 4)
+        # batches of 1, 2 and 4 lines, the lines past the first blocked one are not memoized
+        self.assertEqual(len(pathfinder.line_of_sight.memo), 5)
+
+    def test_no_path(self):
+        self.grids[5, 8, 8].is_obstacle = True
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+        pathfinder = AstarAlgorithmOp(self.grids)
+        self.assertFalse(pathfinder.search())
+        self.assertEqual(pathfinder.get_path_nodes(), [])
+
+    def test_unreachable_goal(self):
+        self.grids[5, 8, 8].is_obstacle = True
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearch, JumpPointSearchTheta, JumpPointSearchPlus]:
+            pathfinder = algorithm(self.grids)
+            self.assertFalse(pathfinder.is_reachable())
+            self.assertFalse(pathfinder.search(), algorithm.__name__)
+            # rejected before the first expansion
+            self.assertFalse(pathfinder.search_state.is_closed(pathfinder.start_index))
+            self.assertEqual(pathfinder.get_path_nodes(), [])
+        start_components, goal_component = pathfinder.get_terminal_components()
+        self.assertNotIn(goal_component, start_components)
+
+    def test_independent_search_states(self):
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+        pathfinder1 = AstarAlgorithmOp(self.grids)
+        self.grids.set_start_node(0, 0, 0)
+        self.grids.set_goal_node(4, 4, 4)
+        pathfinder2 = AstarAlgorithmOp(self.grids)
+
+        self.assertTrue(pathfinder1.search())
+        self.assertTrue(pathfinder2.search())
+        self.assert_valid_path(pathfinder1.get_path_nodes(), (1, 1, 1), (9, 1, 1))
+        self.assert_valid_path(pathfinder2.get_path_nodes(), (0, 0, 0), (4, 4, 4))
+
+    def test_search_state_reuse(self):
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+        pathfinder = AstarAlgorithmOp(self.grids)
+        search_state = pathfinder.search_state
+        del pathfinder
+        self.assertIs(self.grids.acquire_search_state(), search_state)
+
+
+class TestAstarAlgorithmArray(unittest.TestCase):
+    def get_path(self, pathfinder):
+        return [(node.i, node.j, node.k) for node in pathfinder.get_path_nodes()]
+
+    def test_same_path_as_astar(self):
+        grids = get_wall_grids()
+        for start, goal in [((1, 1, 1), (9, 1, 1)), ((0, 9, 0), (9, 0, 9)), ((4, 4, 4), (4, 4, 4))]:
+            grids.set_start_node(*start)
+            grids.set_goal_node(*goal)
+            astar, astar_array = AstarAlgorithmOp(grids), AstarAlgorithmArray(grids)
+            self.assertTrue(astar.search())
+            self.assertTrue(astar_array.search())
+            self.assertEqual(self.get_path(astar_array), self.get_path(astar))
+            self.assertAlmostEqual(astar_array.get_path_distance(), astar.get_path_distance())
+
+    def test_map_border(self):
+        grids = get_wall_grids()
+        grids[5, 8, 8].is_obstacle = True
+        grids.set_start_node(0, 0, 0)
+        grids.set_goal_node(9, 9, 9)
+        self.assertFalse(AstarAlgorithmArray(grids).search())
+
+    @unittest.skipUnless(os.path.isfile("cabinet_grid_map.npy"), "cabinet_grid_map.npy is required")
+    def test_same_path_as_astar_on_cabinet(self):
+        grids = get_cabinet_grids()
+        grids.set_start_node(10, 25, 25)
+        grids.set_goal_node(15, 10, 29)
+        astar, astar_array = AstarAlgorithmOp(grids), AstarAlgorithmArray(grids)
+        self.assertTrue(astar.search())
+        self.assertTrue(astar_array.search())
+        self.assertEqual(self.get_path(astar_array), self.get_path(astar))
+
+
+class TestJumpPointSearchPlus(unittest.TestCase):
+    def test_path_is_straight_runs(self):
+        grids = get_wall_grids()
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(9, 2, 1)
+        pathfinder = JumpPointSearchPlus(grids)
+        self.assertTrue(pathfinder.search())
+        path_nodes = pathfinder.get_path_nodes()
+        for src_node, dst_node in zip(path_nodes, path_nodes[1:]):
+            di, dj, dk = dst_node.i - src_node.i, dst_node.j - src_node.j, dst_node.k - src_node.k
+            steps = max(abs(di), abs(dj), abs(dk))
+            for d in (di, dj, dk):
+                self.assertIn(abs(d), (0, steps))
+            for s in range(1, steps + 1):
+                self.assertFalse(grids[src_node.i + di // steps * s, 
+                                       src_node.j + dj // steps * s, 
+                                       src_node.k + dk // steps * s].is_obstacle)
+
+    def test_obstacle_change(self):
+        grids = get_wall_grids()
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(9, 1, 1)
+        self.assertTrue(JumpPointSearchPlus(grids).search())
+        grids[5, 8, 8].is_obstacle = True
+        self.assertFalse(JumpPointSearchPlus(grids).search())
+
+    @unittest.skipUnless(os.path.isfile("cabinet_grid_map.npy"), "cabinet_grid_map.npy is required")
+    def test_cabinet(self):
+        grids = get_cabinet_grids()
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(28, 28, 28)
+        astar, jps_plus = AstarAlgorithmArray(grids), JumpPointSearchPlus(grids)
+        self.assertTrue(astar.search())
+        self.assertTrue(jps_plus.search())
+        self.assertGreaterEqual(jps_plus.get_path_distance() + 1e-6, astar.get_path_distance())
+
+
+class TestBidirectionalSearch(unittest.TestCase):
+    def get_closed_number(self, pathfinder):
+        closed_number = 0
+        for state in [pathfinder.search_state, pathfinder.reverse_algorithm.search_state]:
+            closed_number += sum(1 for stamp in state.closed_stamp if stamp == state.generation)
+        return closed_number
+
+    def test_search(self):
+        grids = get_wall_grids()
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(9, 1, 1)
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearch, JumpPointSearchTheta, JumpPointSearchPlus]:
+            pathfinder = algorithm(grids, bidirectional=True)
+            self.assertTrue(pathfinder.search(), algorithm.__name__)
+            path_nodes = pathfinder.get_path_nodes()
+            self.assertEqual((path_nodes[0].i, path_nodes[0].j, path_nodes[0].k), (1, 1, 1))
+            self.assertEqual((path_nodes[-1].i, path_nodes[-1].j, path_nodes[-1].k), (9, 1, 1))
+
+    def test_same_distance_as_astar(self):
+        grids = get_wall_grids()
+        for start, goal in [((1, 1, 1), (9, 1, 1)), ((0, 9, 0), (9, 0, 9)), ((4, 4, 4), (4, 4, 4))]:
+            grids.set_start_node(*start)
+            grids.set_goal_node(*goal)
+            astar = AstarAlgorithmOp(grids)
+            self.assertTrue(astar.search())
+            for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray]:
+                pathfinder = algorithm(grids, bidirectional=True)
+                self.assertTrue(pathfinder.search())
+                self.assertAlmostEqual(pathfinder.get_path_distance(), astar.get_path_distance())
+
+    def test_no_path(self):
+        grids = get_wall_grids()
+        grids[5, 8, 8].is_obstacle = True
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(9, 1, 1)
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearchPlus]:
+            pathfinder = algorithm(grids, bidirectional=True)
+            self.assertFalse(pathfinder.search())
+            self.assertEqual(pathfinder.get_path_nodes(), [])
+
+    def test_not_supported(self):
+        grids = get_wall_grids()
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(9, 1, 1)
+        for algorithm in [AstarAlgorithmHierarchical, DistanceFieldSearch, AstarAlgorithmIncremental, AstarAlgorithmAnytime]:
+            self.assertRaises(ValueError, algorithm(grids).set_bidirectional, True)
+        pathfinder = AstarAlgorithmArray(grids)
+        pathfinder.set_bidirectional(True)
+        self.assertTrue(pathfinder.search())
+
+    def test_fewer_expanded_nodes(self):
+        grids = Grids3D(corner_min=gp_Pnt(0, 0, 0), corner_max=gp_Pnt(20, 20, 20), map_size=20)
+        # the goal sits in a pocket open away from the start
+        grids.obstacle_map[12:19, 12:19, 12:19] = 1
+        grids.obstacle_map[13:18, 13:18, 13:18] = 0
+        grids.obstacle_map[15, 15, 18] = 0
+        grids.update_obstacle_map()
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(15, 15, 15)
+        astar, bidirectional_astar = AstarAlgorithmArray(grids), AstarAlgorithmArray(grids, bidirectional=True)
+        self.assertTrue(astar.search())
+        self.assertTrue(bidirectional_astar.search())
+        self.assertAlmostEqual(bidirectional_astar.get_path_distance(), astar.get_path_distance())
+        astar_closed_number = sum(1 for stamp in astar.search_state.closed_stamp 
+                                  if stamp == astar.search_state.generation)
+        self.assertLess(self.get_closed_number(bidirectional_astar), astar_closed_number)
+
+    @unittest.skipUnless(os.path.isfile("cabinet_grid_map.npy"), "cabinet_grid_map.npy is required")
+    def test_cabinet(self):
+        grids = get_cabinet_grids()
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(28, 28, 28)
+        astar, bidirectional_astar = AstarAlgorithmArray(grids), AstarAlgorithmArray(grids, bidirectional=True)
+        self.assertTrue(astar.search())
+        self.assertTrue(bidirectional_astar.search())
+        self.assertAlmostEqual(bidirectional_astar.get_path_distance(), astar.get_path_distance())
+
+
+class TestAstarAlgorithmIncremental(unittest.TestCase):
+    def setUp(self):
+        self.grids = get_wall_grids()
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+
+    def assert_same_distance_as_astar(self, pathfinder):
+        astar = AstarAlgorithmArray(self.grids)
+        is_found = astar.search()
+        self.assertEqual(pathfinder.search(), is_found)
+        if is_found:
+            self.assertAlmostEqual(pathfinder.get_path_distance(), astar.get_path_distance())
+        else:
+            self.assertEqual(pathfinder.get_path_nodes(), [])
+
+    def test_search(self):
+        pathfinder = AstarAlgorithmIncremental(self.grids)
+        self.assert_same_distance_as_astar(pathfinder)
+        path_nodes = pathfinder.get_path_nodes()
+        self.assertEqual((path_nodes[0].i, path_nodes[0].j, path_nodes[0].k), (1, 1, 1))
+        self.assertEqual((path_nodes[-1].i, path_nodes[-1].j, path_nodes[-1].k), (9, 1, 1))
+
+    def test_replan(self):
+        pathfinder = AstarAlgorithmIncremental(self.grids)
+        self.assert_same_distance_as_astar(pathfinder)
+        first_expanded_number = pathfinder.expanded_number
+        # a new hole near the start shortens the path
+        self.grids[5, 1, 2].is_obstacle = False
+        self.assert_same_distance_as_astar(pathfinder)
+        self.assertLess(pathfinder.expanded_number, first_expanded_number)
+        # closing it again restores the old path
+        self.grids[5, 1, 2].is_obstacle = True
+        self.assert_same_distance_as_astar(pathfinder)
+        self.assertLess(pathfinder.expanded_number, first_expanded_number)
+
+    def test_unrecorded_changes(self):
+        pathfinder = AstarAlgorithmIncremental(self.grids)
+        self.assertTrue(pathfinder.search())
+        self.grids.obstacle_map[5, 1, 2] = 0
+        self.grids.update_obstacle_map()
+        self.assert_same_distance_as_astar(pathfinder)
+
+    def test_no_path(self):
+        pathfinder = AstarAlgorithmIncremental(self.grids)
+        self.assertTrue(pathfinder.search())
+        self.grids[5, 8, 8].is_obstacle = True
+        self.assert_same_distance_as_astar(pathfinder)
+        self.grids[5, 8, 8].is_obstacle = False
+        self.assert_same_distance_as_astar(pathfinder)
+
+    def test_random_changes(self):
+        rng = np.random.default_rng(0)
+        grids = Grids3D(corner_min=gp_Pnt(0, 0, 0), corner_max=gp_Pnt(12, 12, 12), map_size=12)
+        grids.obstacle_map[...] = rng.random((12, 12, 12)) < 0.3
+        grids.obstacle_map[0, 0, 0] = grids.obstacle_map[11, 11, 11] = 0
+        grids.update_obstacle_map()
+        grids.set_start_node(0, 0, 0)
+        grids.set_goal_node(11, 11, 11)
+        self.grids = grids
+        pathfinder = AstarAlgorithmIncremental(grids)
+        for _ in range(10):
+            self.assert_same_distance_as_astar(pathfinder)
+            for i, j, k in rng.integers(1, 11, (4, 3)).tolist():
+                grids[i, j, k].is_obstacle = bool(rng.random() < 0.5)
+
+
+class TestSearchBudget(unittest.TestCase):
+    def setUp(self):
+        self.grids = get_wall_grids()
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+
+    def test_max_expansions(self):
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearch, JumpPointSearchTheta, JumpPointSearchPlus]:
+            pathfinder = algorithm(self.grids)
+            pathfinder.set_budget(max_expansions=1)
+            self.assertFalse(pathfinder.search(), algorithm.__name__)
+            self.assertTrue(pathfinder.is_budget_exceeded)
+            pathfinder.set_budget()
+            self.assertTrue(pathfinder.search(), algorithm.__name__)
+            self.assertFalse(pathfinder.is_budget_exceeded)
+
+    def test_bidirectional_max_expansions(self):
+        pathfinder = AstarAlgorithmArray(self.grids, bidirectional=True)
+        pathfinder.set_budget(max_expansions=1)
+        self.assertFalse(pathfinder.search())
+        self.assertTrue(pathfinder.is_budget_exceeded)
+
+    def test_time_limit(self):
+        pathfinder = AstarAlgorithmArray(self.grids)
+        pathfinder.set_budget(time_limit=0.0)
+        pathfinder.BUDGET_CLOCK_INTERVAL = 1
+        self.assertFalse(pathfinder.search())
+        self.assertTrue(pathfinder.is_budget_exceeded)
+
+    def test_invalid_budget(self):
+        pathfinder = AstarAlgorithmArray(self.grids)
+        with self.assertRaises(ValueError):
+            pathfinder.set_budget(max_expansions=-1)
+
+    def test_router_budget(self):
+        router = WaypointRouter(self.grids, AstarAlgorithmArray, max_expansions=1)
+        self.assertFalse(router.route([self.grids[1, 1, 1], self.grids[9, 1, 1]]))
+        self.assertTrue(router.leg_stats[0].is_budget_exceeded)
+
+
+class TestSearchStats(unittest.TestCase):
+    def setUp(self):
+        self.grids = get_wall_grids()
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(9, 1, 1)
+
+    def test_disabled(self):
+        pathfinder = AstarAlgorithmArray(self.grids)
+        self.assertTrue(pathfinder.search())
+        self.assertIsNone(pathfinder.stats)
+
+    def test_counts(self):
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearch, JumpPointSearchTheta, JumpPointSearchPlus]:
+            for bidirectional in [False, True]:
+                pathfinder = algorithm(self.grids, bidirectional=bidirectional)
+                pathfinder.enable_stats()
+                self.assertTrue(pathfinder.search())
+                stats = pathfinder.stats
+                self.assertTrue(stats.is_found)
+                self.assertGreater(stats.expanded_number, 0, algorithm.__name__)
+                self.assertGreaterEqual(stats.pop_number, stats.expanded_number)
+                self.assertGreaterEqual(stats.push_number, stats.pop_number)
+                self.assertGreaterEqual(stats.open_peak, 1)
+                self.assertGreaterEqual(stats.get_stale_pop_number(), 0)
+
+    def test_astar_counts(self):
+        pathfinder = AstarAlgorithmArray(self.grids)
+        pathfinder.enable_stats()
+        self.assertTrue(pathfinder.search())
+        stats = pathfinder.stats
+        # every push is popped or left in the open list
+        self.assertEqual(stats.push_number, stats.pop_number + len(pathfinder.open_list))
+        # decreased keys replace queued entries, only the goal pop is not expanded
+        self.assertEqual(stats.get_stale_pop_number(), 1)
+        self.assertEqual(stats.forced_neighbor_call_number, 0)
+
+    def test_jump_point_search_counts(self):
+        pathfinder = JumpPointSearchTheta(self.grids)
+        pathfinder.enable_stats()
+        self.assertTrue(pathfinder.search())
+        stats = pathfinder.stats
+        self.assertGreater(stats.forced_neighbor_call_number, 0)
+        self.assertGreater(stats.line_of_sight_call_number, 0)
+        self.assertLessEqual(stats.line_of_sight_memo_hit_number, stats.line_of_sight_call_number)
+        self.assertTrue(0.0 <= stats.get_line_of_sight_hit_rate() <= 1.0)
+
+    def test_expansion_order(self):
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray]:
+            pathfinder = algorithm(self.grids)
+            pathfinder.enable_stats(record_expansions=True)
+            self.assertTrue(pathfinder.search())
+            expansion_order = pathfinder.stats.get_expansion_order()
+            self.assertEqual(expansion_order.dtype, np.int32)
+            self.assertEqual(len(expansion_order), pathfinder.stats.expanded_number)
+            # flat indices of the grids in both index spaces, the start is expanded first
+            self.assertEqual(int(expansion_order[0]), self.grids[1, 1, 1].index)
+            self.assertFalse(self.grids.obstacle_map.reshape(-1)[expansion_order].any())
+
+    def test_path_time(self):
+        pathfinder = JumpPointSearchTheta(self.grids)
+        pathfinder.enable_stats()
+        self.assertTrue(pathfinder.search())
+        pathfinder.get_smoothed_path_nodes()
+        self.assertGreater(pathfinder.stats.path_time, 0.0)
+
+
+class TestAstarAlgorithmAnytime(unittest.TestCase):
+    def get_random_grids(self, seed: int) -> Grids3D:
+        rng = np.random.default_rng(seed)
+        grids = Grids3D(corner_min=gp_Pnt(0, 0, 0), corner_max=gp_Pnt(16, 16, 16), map_size=16)
+        grids.obstacle_map[...] = rng.random((16, 16, 16)) < 0.3
+        grids.obstacle_map[0, 0, 0] = grids.obstacle_map[15, 15, 15] = 0
+        grids.update_obstacle_map()
+        grids.set_start_node(0, 0, 0)
+        grids.set_goal_node(15, 15, 15)
+        return grids
+
+    def test_same_distance_as_astar(self):
+        for seed in range(5):
+            grids = self.get_random_grids(seed)
+            astar = AstarAlgorithmArray(grids)
+            pathfinder = AstarAlgorithmAnytime(grids)
+            self.assertEqual(pathfinder.search(), astar.search())
+            if astar.get_path_indices():
+                self.assertAlmostEqual(pathfinder.get_path_distance(), astar.get_path_distance())
+                self.assertEqual(pathfinder.suboptimality_bound, 1.0)
+
+    def test_budget_bound(self):
+        for seed in range(5):
+            grids = self.get_random_grids(seed)
+            astar = AstarAlgorithmArray(grids)
+            if not astar.search():
+                continue
+            pathfinder = AstarAlgorithmAnytime(grids, initial_weight=5.0)
+            for max_expansions in [10, 50, 200]:
+                pathfinder.set_budget(max_expansions=max_expansions)
+                if not pathfinder.search():
+                    self.assertEqual(pathfinder.get_path_nodes(), [])
+                    continue
+                self.assertLessEqual(pathfinder.get_path_distance(),
+                                     pathfinder.suboptimality_bound * astar.get_path_distance() + 1e-9)
+                path_nodes = pathfinder.get_path_nodes()
+                self.assertEqual((path_nodes[0].i, path_nodes[0].j, path_nodes[0].k), (0, 0, 0))
+                self.assertEqual((path_nodes[-1].i, path_nodes[-1].j, path_nodes[-1].k), (15, 15, 15))
+
+    def test_invalid_weight(self):
+        grids = self.get_random_grids(0)
+        with self.assertRaises(ValueError):
+            AstarAlgorithmAnytime(grids, initial_weight=0.5)
+
+
+class TestHeuristicProvider(unittest.TestCase):
+    def setUp(self):
+        self.grids = get_wall_grids(12)
+        self.grids.set_start_node(1, 1, 1)
+        self.grids.set_goal_node(10, 1, 1)
+
+    def test_same_distance_as_astar(self):
+        astar = AstarAlgorithmOp(self.grids)
+        self.assertTrue(astar.search())
+        heuristics = [OctileHeuristic(), LandmarkHeuristic.get_landmark_heuristic(self.grids)]
+        for heuristic in heuristics:
+            for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, AstarAlgorithmAnytime, AstarAlgorithmIncremental]:
+                pathfinder = algorithm(self.grids)
+                pathfinder.set_heuristic(heuristic)
+                self.assertTrue(pathfinder.search())
+                self.assertAlmostEqual(pathfinder.get_path_distance(), astar.get_path_distance())
+            for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray]:
+                pathfinder = algorithm(self.grids, bidirectional=True)
+                pathfinder.set_heuristic(heuristic)
+                self.assertTrue(pathfinder.search())
+                self.assertAlmostEqual(pathfinder.get_path_distance(), astar.get_path_distance())
+
+    def test_jump_point_search(self):
+        for algorithm in [JumpPointSearch, JumpPointSearchTheta, JumpPointSearchPlus]:
+            pathfinder = algorithm(self.grids)
+            pathfinder.set_heuristic(OctileHeuristic())
+            self.assertTrue(pathfinder.search())
+            path_nodes = pathfinder.get_path_nodes()
+            self.assertEqual((path_nodes[-1].i, path_nodes[-1].j, path_nodes[-1].k), (10, 1, 1))
+
+    def test_fewer_expanded_nodes(self):
+        expanded_numbers = []
+        for heuristic in [None, LandmarkHeuristic.get_landmark_heuristic(self.grids)]:
+            pathfinder = AstarAlgorithmArray(self.grids)
+            pathfinder.set_heuristic(heuristic)
+            pathfinder.enable_stats()
+            self.assertTrue(pathfinder.search())
+            expanded_numbers.append(pathfinder.stats.expanded_number)
+        self.assertLess(expanded_numbers[1], expanded_numbers[0])
+
+    def test_router(self):
+        router = WaypointRouter(self.grids, AstarAlgorithmArray, heuristic=OctileHeuristic())
+        self.assertTrue(router.route([self.grids[1, 1, 1], self.grids[3, 8, 2], self.grids[10, 1, 1]]))
+        self.assertIsInstance(router.pathfinder.heuristic, OctileHeuristic)
+
+
+class TestWindowedSearch(unittest.TestCase):
+    def get_random_grids(self, seed: int) -> Grids3D:
+        rng = np.random.default_rng(seed)
+        grids = Grids3D(corner_min=gp_Pnt(0, 0, 0), corner_max=gp_Pnt(24, 24, 24), map_size=24)
+        grids.obstacle_map[...] = rng.random((24, 24, 24)) < 0.25
+        start = tuple(int(n) for n in rng.integers(4, 20, 3))
+        goal = tuple(int(n) for n in np.clip(np.array(start) + rng.integers(-4, 5, 3), 0, 23))
+        grids.obstacle_map[start] = grids.obstacle_map[goal] = 0
+        grids.update_obstacle_map()
+        grids.set_start_node(*start)
+        grids.set_goal_node(*goal)
+        return grids
+
+    def test_same_distance_as_full_search(self):
+        for seed in range(5):
+            grids = self.get_random_grids(seed)
+            for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearch, JumpPointSearchTheta]:
+                pathfinder = algorithm(grids)
+                windowed_pathfinder = algorithm(grids)
+                windowed_pathfinder.set_window(1)
+                self.assertEqual(windowed_pathfinder.search(), pathfinder.search())
+                if pathfinder.get_path_indices():
+                    self.assertAlmostEqual(windowed_pathfinder.get_path_distance(), pathfinder.get_path_distance())
+
+    def test_window_growth(self):
+        # the hole of the wall is far outside the first window
+        grids = get_wall_grids(12)
+        grids.set_start_node(3, 1, 1)
+        grids.set_goal_node(7, 1, 1)
+        astar = AstarAlgorithmOp(grids)
+        self.assertTrue(astar.search())
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray]:
+            pathfinder = algorithm(grids)
+            pathfinder.set_window(0)
+            pathfinder.enable_stats()
+            self.assertTrue(pathfinder.search())
+            self.assertGreater(pathfinder.window_number, 1)
+            self.assertAlmostEqual(pathfinder.get_path_distance(), astar.get_path_distance())
+            # the whole map is searched again without a window
+            self.assertEqual(pathfinder.window_upper, (11, 11, 11))
+        self.assertEqual(pathfinder.padded_obstacle_map, AstarAlgorithmArray(grids).padded_obstacle_map)
+
+    def test_fewer_scanned_cells(self):
+        # jumps on an empty map scan up to its border
+        grids = Grids3D(corner_min=gp_Pnt(0, 0, 0), corner_max=gp_Pnt(24, 24, 24), map_size=24)
+        grids.set_start_node(10, 10, 10)
+        grids.set_goal_node(12, 13, 11)
+        closed_numbers = []
+        for margin in [None, 1]:
+            pathfinder = JumpPointSearch(grids)
+            pathfinder.set_window(margin)
+            self.assertTrue(pathfinder.search())
+            closed_numbers.append(sum(stamp == pathfinder.search_state.generation 
+                                      for stamp in pathfinder.search_state.closed_stamp))
+        self.assertLess(closed_numbers[1], closed_numbers[0])
+
+    def test_invalid_window(self):
+        grids = self.get_random_grids(0)
+        self.assertRaises(ValueError, AstarAlgorithmArray(grids).set_window, -1)
+        self.assertRaises(ValueError, AstarAlgorithmArray(grids).set_window, 2, 1.0)
+        self.assertRaises(ValueError, JumpPointSearchPlus(grids).set_window, 2)
+        self.assertRaises(ValueError, WaypointRouter, grids, AstarAlgorithmAnytime, window_margin=2)
+
+    def test_router(self):
+        grids = get_wall_grids()
+        terminals = [grids[1, 1, 1], grids[3, 8, 2], grids[9, 1, 1], grids[9, 9, 9]]
+        router = WaypointRouter(grids, AstarAlgorithmArray)
+        self.assertTrue(router.route(terminals))
+        windowed_router = WaypointRouter(grids, AstarAlgorithmArray, window_margin=1)
+        self.assertTrue(windowed_router.route(terminals))
+        self.assertAlmostEqual(windowed_router.get_path_distance(), router.get_path_distance())
+
+
+class TestAstarAlgorithmHierarchical(unittest.TestCase):
+    def get_random_grids(self, seed: int) -> Grids3D:
+        rng = np.random.default_rng(seed)
+        grids = Grids3D(corner_min=gp_Pnt(0, 0, 0), corner_max=gp_Pnt(32, 32, 32), map_size=32)
+        grids.obstacle_map[...] = rng.random((32, 32, 32)) < 0.2
+        start, goal = (tuple(int(n) for n in rng.integers(0, 32, 3)) for _ in range(2))
+        grids.obstacle_map[start] = grids.obstacle_map[goal] = 0
+        grids.update_obstacle_map()
+        grids.set_start_node(*start)
+        grids.set_goal_node(*goal)
+        return grids
+
+    def assert_valid_path(self, grids, pathfinder):
+        ijks = [(node.i, node.j, node.k) for node in pathfinder.get_path_nodes()]
+        self.assertEqual(ijks[0], (grids.start_node.i, grids.start_node.j, grids.start_node.k))
+        self.assertEqual(ijks[-1], (grids.goal_node.i, grids.goal_node.j, grids.goal_node.k))
+        for ijk, next_ijk in zip(ijks, ijks[1:]):
+            self.assertFalse(grids.obstacle_map[next_ijk])
+            self.assertLessEqual(max(abs(a - b) for a, b in zip(ijk, next_ijk)), 1)
+
+    def test_near_optimal_path(self):
+        for seed in range(5):
+            grids = self.get_random_grids(seed)
+            astar, hierarchical = AstarAlgorithmArray(grids), AstarAlgorithmHierarchical(grids)
+            is_found = astar.search()
+            self.assertEqual(hierarchical.search(), is_found)
+            if is_found:
+                self.assert_valid_path(grids, hierarchical)
+                self.assertLessEqual(hierarchical.get_path_distance(), 1.5 * astar.get_path_distance() + 1e-9)
+
+    def test_narrow_passage(self):
+        # the hole of the wall is closed on every coarse level
+        grids = get_wall_grids(16)
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(14, 1, 1)
+        astar, hierarchical = AstarAlgorithmArray(grids), AstarAlgorithmHierarchical(grids)
+        self.assertTrue(astar.search())
+        self.assertTrue(hierarchical.search())
+        self.assert_valid_path(grids, hierarchical)
+        self.assertAlmostEqual(hierarchical.get_path_distance(), astar.get_path_distance())
+        # the mask of the corridors is reset
+        self.assertEqual(hierarchical.padded_obstacle_map, astar.padded_obstacle_map)
+
+    def test_invalid_parameters(self):
+        grids = get_wall_grids()
+        grids.set_start_node(1, 1, 1)
+        grids.set_goal_node(9, 1, 1)
+        self.assertRaises(ValueError, AstarAlgorithmHierarchical, grids, -1)
+        self.assertRaises(ValueError, AstarAlgorithmHierarchical, grids, 2, -1)
+        self.assertRaises(ValueError, AstarAlgorithmHierarchical(grids).set_window, 1)
+
+    def test_router(self):
+        grids = get_wall_grids()
+        terminals = [grids[1, 1, 1], grids[3, 8, 2], grids[9, 1, 1], grids[9, 9, 9]]
+        router = WaypointRouter(grids, AstarAlgorithmHierarchical)
+        self.assertTrue(router.route(terminals))
+
+
+class TestDistanceFieldSearch(unittest.TestCase):
+    def test_same_distance_as_astar(self):
+        grids = get_wall_grids()
+        for start, goal in [((1, 1, 1), (9, 1, 1)), ((0, 9, 0), (9, 0, 9)), ((4, 4, 4), (4, 4, 4)), ((1, 1, 1), (9, 9, 9))]:
+            grids.set_start_node(*start)
+            grids.set_goal_node(*goal)
+            astar, distance_field_search = AstarAlgorithmArray(grids), DistanceFieldSearch(grids)
+            self.assertTrue(astar.search())
+            self.assertTrue(distance_field_search.search())
+            self.assertAlmostEqual(distance_field_search.get_path_distance(), astar.get_path_distance())
+            path_nodes = distance_field_search.get_path_nodes()
+            self.assertEqual((path_nodes[0].i, path_nodes[0].j, path_nodes[0].k), start)
+            self.assertEqual((path_nodes[-1].i, path_nodes[-1].j, path_nodes[-1].k), goal)
+
+    def test_one_field_per_terminal(self):
+        # three routes from and to the connector at (1, 1, 1)
+        grids = get_wall_grids()
+        distance_field_cache = DistanceFieldCache.get_distance_field_cache(grids)
+        for start, goal in [((1, 1, 1), (9, 1, 1)), ((1, 1, 1), (9, 9, 9)), ((3, 8, 2), (1, 1, 1))]:
+            grids.set_start_node(*start)
+            grids.set_goal_node(*goal)
+            self.assertTrue(DistanceFieldSearch(grids).search())
+        self.assertEqual(distance_field_cache.miss_number, 1)
+        self.assertEqual(len(distance_field_cache.fields), 1)
+
+    def test_unreachable(self):
+        grids = get_wall_grids()
+        grids[5, 8, 8].is_obstacle = True
+        grids.set_start_node(0, 0, 0)
+        grids.set_goal_node(9, 9, 9)
+        distance_field_search = DistanceFieldSearch(grids)
+        self.assertFalse(distance_field_search.search())
+        self.assertEqual(distance_field_search.get_path_indices(), [])
+
+    def test_router(self):
+        grids = get_wall_grids()
+        terminals = [grids[1, 1, 1], grids[3, 8, 2], grids[9, 1, 1], grids[9, 9, 9]]
+        router = WaypointRouter(grids, AstarAlgorithmArray)
+        self.assertTrue(router.route(terminals))
+        distance_field_router = WaypointRouter(grids, DistanceFieldSearch)
+        self.assertTrue(distance_field_router.route(terminals))
+        self.assertAlmostEqual(distance_field_router.get_path_distance(), router.get_path_distance())
+
+
+class TestWaypointRouter(unittest.TestCase):
+    def setUp(self):
+        self.grids = get_wall_grids()
+        self.terminals = [self.grids[1, 1, 1], self.grids[3, 8, 2], self.grids[9, 1, 1], self.grids[9, 9, 9]]
+
+    def test_route(self):
+        for algorithm in [AstarAlgorithmOp, AstarAlgorithmArray, JumpPointSearchTheta, JumpPointSearchPlus]:
+            router = WaypointRouter(self.grids, algorithm)
+            self.assertTrue(router.route(self.terminals), algorithm.__name__)
+            path_nodes = router.get_path_nodes()
+            self.assertEqual(path_nodes[0], self.terminals[0])
+            self.assertEqual(path_nodes[-1], self.terminals[-1])
+            for terminal in self.terminals:
+                self.assertEqual(path_nodes.count(terminal), 1)
+            for src_node, dst_node in zip(path_nodes, path_nodes[1:]):
+                self.assertNotEqual(src_node, dst_node)
+            self.assertEqual(len(router.leg_stats), 3)
+
+    def test_same_legs_as_single_searches(self):
+        router = WaypointRouter(self.grids, AstarAlgorithmArray)
+        self.assertTrue(router.route(self.terminals))
+        search_state = router.pathfinder.search_state
+        for leg_stats, start_node, goal_node in zip(router.leg_stats, self.terminals, self.terminals[1:]):
+            self.grids.set_start_node(start_node)
+            self.grids.set_goal_node(goal_node)
+            pathfinder = AstarAlgorithmArray(self.grids)
+            self.assertTrue(pathfinder.search())
+            self.assertAlmostEqual(leg_stats.distance, pathfinder.get_path_distance())
+            self.assertEqual(leg_stats.path_node_number, len(pathfinder.get_path_nodes()))
+        self.assertIs(router.pathfinder.search_state, search_state)
+
+    def test_unreachable_leg(self):
+        self.grids[5, 8, 8].is_obstacle = True
+        router = WaypointRouter(self.grids, AstarAlgorithmOp)
+        self.assertFalse(router.route(self.terminals))
+        self.assertEqual([leg_stats.is_found for leg_stats in router.leg_stats], [True, False, True])
+        self.assertNotIn(router.leg_stats[1].goal_component, router.leg_stats[1].start_components)
+        self.assertEqual(router.get_path_nodes()[-1], self.terminals[-1])
+
+
+class TestParallelRouter(unittest.TestCase):
+    def setUp(self):
+        self.grids = get_wall_grids()
+        self.terminals_list = [[(1, 1, 1), (3, 8, 2), (9, 1, 1)], 
+                               [(0, 0, 0), (9, 9, 9)], 
+                               [(2, 2, 2), (2, 2, 7), (8, 8, 8), (9, 0, 9)]]
+
+    def test_shared_grids(self):
+        with SharedGrids(self.grids) as shared_grids:
+            grids, attached_memory = SharedGrids.attach(shared_grids.spec)
+            self.assertTrue(np.array_equal(grids.obstacle_map, self.grids.obstacle_map))
+            self.assertFalse(grids.obstacle_map.flags.writeable)
+            self.assertAlmostEqual(grids.node_gap, self.grids.node_gap)
+            del grids
+            attached_memory.close()
+
+    def test_same_paths_as_waypoint_router(self):
+        parallel_router = ParallelRouter(self.grids, AstarAlgorithmArray, processes=2)
+        route_results = parallel_router.route(self.terminals_list)
+        self.assertEqual(len(route_results), len(self.terminals_list))
+        for terminals, route_result in zip(self.terminals_list, route_results):
+            router = WaypointRouter(self.grids, AstarAlgorithmArray)
+            self.assertEqual(router.route([self.grids[ijk] for ijk in terminals]), route_result.is_found())
+            self.assertEqual(parallel_router.get_path_nodes(route_result), router.get_path_nodes())
+            self.assertAlmostEqual(float(route_result.leg_distances.sum()), router.get_path_distance())
+
+
+class TestRouteCache(unittest.TestCase):
+    def setUp(self):
+        self.grids = get_wall_grids()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.route_cache = RouteCache(self.temp_dir.name)
+        self.terminals = [self.grids[1, 1, 1], self.grids[3, 8, 2], self.grids[9, 1, 1]]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hit(self):
+        route_result = self.route_cache.get_route(self.grids, self.terminals, AstarAlgorithmArray)
+        self.assertEqual((self.route_cache.hit_number, self.route_cache.miss_number), (0, 1))
+        cached_result = RouteCache(self.temp_dir.name).get_route(self.grids, self.terminals, AstarAlgorithmArray)
+        self.assertTrue(np.array_equal(cached_result.path_indices, route_result.path_indices))
+        self.assertTrue(np.array_equal(cached_result.leg_distances, route_result.leg_distances))
+        
+        router = WaypointRouter(self.grids, AstarAlgorithmArray)
+        router.route(self.terminals)
+        self.assertEqual(cached_result.get_path_nodes(self.grids), router.get_path_nodes())
+
+    def test_get_routes(self):
+        terminals_list = [[(1, 1, 1), (3, 8, 2), (9, 1, 1)], [(1, 8, 8), (9, 8, 8)]]
+        self.route_cache.get_route(self.grids, [self.grids[ijk] for ijk in terminals_list[0]], AstarAlgorithmArray)
+        route_results = self.route_cache.get_routes(self.grids, terminals_list, AstarAlgorithmArray, processes=2)
+        self.assertEqual((self.route_cache.hit_number, self.route_cache.miss_number), (1, 2))
+        for terminals, route_result in zip(terminals_list, route_results):
+            router = WaypointRouter(self.grids, AstarAlgorithmArray)
+            router.route([self.grids[ijk] for ijk in terminals])
+            self.assertEqual(route_result.get_path_nodes(self.grids), router.get_path_nodes())
+        self.route_cache.get_routes(self.grids, terminals_list, AstarAlgorithmArray, processes=2)
+        self.assertEqual((self.route_cache.hit_number, self.route_cache.miss_number), (3, 2))
+
+    def test_key(self):
+        key = RouteCache.get_key(self.grids, AstarAlgorithmArray, [(1, 1, 1), (9, 1, 1)])
+        self.assertNotEqual(key, RouteCache.get_key(self.grids, JumpPointSearchTheta, [(1, 1, 1), (9, 1, 1)]))
+        self.assertNotEqual(key, RouteCache.get_key(self.grids, AstarAlgorithmArray, [(1, 1, 1), (9, 1, 2)]))
+        self.grids[2, 2, 2].is_obstacle = True
+        self.assertNotEqual(key, RouteCache.get_key(self.grids, AstarAlgorithmArray, [(1, 1, 1), (9, 1, 1)]))
+        self.grids[2, 2, 2].is_obstacle = False
+        self.assertEqual(key, RouteCache.get_key(self.grids, AstarAlgorithmArray, [(1, 1, 1), (9, 1, 1)]))
+
+    def test_not_found(self):
+        self.grids[5, 8, 8].is_obstacle = True
+        route_result = self.route_cache.get_route(self.grids, self.terminals, AstarAlgorithmArray)
+        self.assertFalse(route_result.is_found())
+        cached_result = self.route_cache.get_route(self.grids, self.terminals, AstarAlgorithmArray)
+        self.assertEqual(self.route_cache.hit_number, 1)
+        self.assertEqual(cached_result.leg_found.tolist(), route_result.leg_found.tolist())
+
+    def test_eviction(self):
+        route_cache = RouteCache(self.temp_dir.name, max_bytes=1)
+        route_cache.get_route(self.grids, self.terminals, AstarAlgorithmArray)
+        self.assertEqual([name for name in os.listdir(self.temp_dir.name) if name.endswith(".npz")], [])
+
+    def test_broken_entry(self):
+        key = RouteCache.get_key(self.grids, AstarAlgorithmArray, [(node.i, node.j, node.k) for node in self.terminals])
+        with open(self.route_cache.get_file_path(key), "wb") as file:
+            file.write(b"broken")
+        self.route_cache.get_route(self.grids, self.terminals, AstarAlgorithmArray)
+        self.assertEqual(self.route_cache.miss_number, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()